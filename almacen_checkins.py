@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: almacen_checkins.py
+# DESCRIPCIÓN: Almacén columnar binario para los ficheros <Ciudad>Gowalla.txt.
+#              Se construye una única vez a partir del texto y después se abre
+#              con memory mapping, sin volver a parsear ninguna línea.
+# USO: python almacen_checkins.py DatasetsGowalla/ManchesterGowalla.txt [...]
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+# Versión del formato en disco: si cambia, los almacenes antiguos se reconstruyen
+VERSION_FORMATO = 3
+
+# Extensión del directorio que contiene el almacén de cada fichero de texto
+EXTENSION_ALMACEN = ".almacen"
+
+# Columnas del almacén y su tipo binario. 'localizacion' guarda el id interno
+# (índice en ids_localizacion.npy), no el location_id original de Gowalla.
+# Latitud y longitud en float32 (resolución < 1 m): quien compara o agrupa
+# coordenadas lo hace sobre estos valores pasados a float64, que es exacto.
+COLUMNAS = {
+    'usuario': np.int32,
+    'timestamp': np.int64,
+    'latitud': np.float32,
+    'longitud': np.float32,
+    'localizacion': np.int32,
+}
+
+# =============================================================================
+# FUNCIÓN: ruta_almacen
+# =============================================================================
+def ruta_almacen(fichero: str) -> str:
+    """
+    Devuelve la ruta del directorio del almacén asociado a un fichero de texto.
+
+    Ejemplo: DatasetsGowalla/ElPasoGowalla.txt -> DatasetsGowalla/ElPasoGowalla.almacen
+    """
+    return os.path.splitext(fichero)[0] + EXTENSION_ALMACEN
+
+
+def _huella_origen(fichero: str) -> dict:
+    """Tamaño y fecha de modificación del fichero de texto original."""
+    info = os.stat(fichero)
+    return {'tamano': info.st_size, 'mtime': info.st_mtime}
+
+# =============================================================================
+# FUNCIÓN: construir_almacen
+# =============================================================================
+def construir_almacen(fichero: str, destino: str = None) -> str:
+    """
+    Convierte un fichero de check-ins separado por tabuladores en un almacén
+    columnar (un .npy por columna más meta.json).
+
+    Los timestamps se guardan como segundos epoch (int64) y los location_id se
+    internan: cada uno recibe un entero consecutivo y la tabla de traducción se
+    guarda en ids_localizacion.npy.
+
+    Parámetros:
+    -----------
+    fichero : str
+        Ruta del fichero <Ciudad>Gowalla.txt
+    destino : str, opcional
+        Directorio del almacén (por defecto, ruta_almacen(fichero))
+
+    Retorna:
+    --------
+    str
+        Ruta del directorio del almacén generado
+    """
+    import pandas as pd
+
+    destino = destino or ruta_almacen(fichero)
+    huella = _huella_origen(fichero)
+
+    datos = pd.read_csv(fichero, delimiter='\t', header=None,
+                        names=['usuario', 'fecha', 'latitud', 'longitud', 'localizacion'],
+                        dtype={'usuario': np.int64, 'fecha': str, 'latitud': np.float64,
+                               'longitud': np.float64, 'localizacion': np.int64})
+    datos = datos.dropna()
+
+    # "2010-10-18T03:24:02Z" -> datetime64[s] (sin la Z final) -> segundos epoch
+    fechas = datos['fecha'].str.slice(0, 19).to_numpy(dtype='U19')
+    timestamps = fechas.astype('datetime64[s]').astype(np.int64)
+
+    # Internado de localizaciones: ids originales ordenados + índice de cada fila
+    ids_localizacion, localizacion = np.unique(datos['localizacion'].to_numpy(), return_inverse=True)
+
+    columnas = {
+        'usuario': datos['usuario'].to_numpy(),
+        'timestamp': timestamps,
+        'latitud': datos['latitud'].to_numpy(),
+        'longitud': datos['longitud'].to_numpy(),
+        'localizacion': localizacion,
+    }
+
+    # Se escribe en un directorio temporal y se renombra al final para que un
+    # lector nunca vea un almacén a medio construir
+    temporal = destino + ".tmp"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    for nombre, tipo in COLUMNAS.items():
+        np.save(os.path.join(temporal, nombre + ".npy"),
+                np.ascontiguousarray(columnas[nombre], dtype=tipo))
+    np.save(os.path.join(temporal, "ids_localizacion.npy"), ids_localizacion.astype(np.int64))
+
+    meta = {
+        'version': VERSION_FORMATO,
+        'origen': os.path.abspath(fichero),
+        'filas': int(len(timestamps)),
+        'localizaciones': int(len(ids_localizacion)),
+        **huella,
+    }
+    with open(os.path.join(temporal, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(destino, ignore_errors=True)
+    os.rename(temporal, destino)
+    return destino
+
+# =============================================================================
+# FUNCIONES: ficheros de los índices dentro del almacén
+# =============================================================================
+def guardar_array(ruta: str, array) -> None:
+    """
+    Guarda un .npy de un índice escribiendo a un temporal y renombrándolo:
+    otro proceso nunca abre un fichero a medio escribir.
+    """
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        np.save(f, array)
+    os.replace(temporal, ruta)
+
+
+def guardar_meta(ruta: str, meta: dict) -> None:
+    """
+    Guarda (con el mismo renombrado) la meta de un índice. Se escribe la
+    última: sin ella el índice se considera incompleto y se reconstruye.
+    """
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(temporal, ruta)
+
+
+def borrar_meta(ruta: str) -> None:
+    """Quita la meta de un índice antes de reescribirlo (queda incompleto hasta el final)."""
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+# =============================================================================
+# CLASE: AlmacenCheckins
+# =============================================================================
+class AlmacenCheckins:
+    """
+    Vista de solo lectura de un almacén columnar. Cada columna es un array
+    numpy abierto con mmap_mode='r': solo se lee de disco lo que se usa.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with open(os.path.join(ruta, "meta.json")) as f:
+            self.meta = json.load(f)
+        for nombre in COLUMNAS:
+            setattr(self, nombre, np.load(os.path.join(ruta, nombre + ".npy"), mmap_mode='r'))
+        self.ids_localizacion = np.load(os.path.join(ruta, "ids_localizacion.npy"), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return self.meta['filas']
+
+    def localizaciones_originales(self) -> np.ndarray:
+        """Traduce la columna interna 'localizacion' a los location_id de Gowalla."""
+        return self.ids_localizacion[self.localizacion]
+
+    def fechas_texto(self, filas=slice(None)) -> np.ndarray:
+        """Timestamps en el formato original del dataset (2010-10-18T03:24:02Z)."""
+        fechas = np.datetime_as_string(np.asarray(self.timestamp[filas]).astype('datetime64[s]'))
+        return np.char.add(fechas, 'Z')
+
+    def a_dataframe(self, columnas: list = None, filas=slice(None)):
+        """
+        Construye un DataFrame con los mismos nombres de columna que usan
+        generate_maps.py / generate_individual_maps.py tras pd.read_csv.
+        'filas' (slice o array de índices) limita las filas que se leen.
+        """
+        import pandas as pd
+
+        todas = {
+            'user_id': lambda: self.usuario[filas],
+            'timestamp': lambda: self.fechas_texto(filas),
+            'latitude': lambda: self.latitud[filas],
+            'longitude': lambda: self.longitud[filas],
+            'poi_id': lambda: self.ids_localizacion[self.localizacion[filas]],
+        }
+        columnas = columnas or list(todas)
+        return pd.DataFrame({c: np.asarray(todas[c]()) for c in columnas})
+
+# =============================================================================
+# FUNCIONES DE ACCESO
+# =============================================================================
+def almacen_actualizado(fichero: str, ruta: str = None) -> bool:
+    """Indica si existe un almacén construido a partir de la versión actual del fichero."""
+    ruta = ruta or ruta_almacen(fichero)
+    try:
+        with open(os.path.join(ruta, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    huella = _huella_origen(fichero)
+    return (meta.get('version') == VERSION_FORMATO
+            and meta.get('tamano') == huella['tamano']
+            and meta.get('mtime') == huella['mtime'])
+
+
+def es_almacen(ruta: str) -> bool:
+    """True si la ruta es un directorio de almacén (y no un fichero de texto)."""
+    return os.path.isdir(ruta) and os.path.exists(os.path.join(ruta, "meta.json"))
+
+
+def abrir_almacen(ruta: str, construir: bool = False) -> AlmacenCheckins:
+    """
+    Abre un almacén. 'ruta' puede ser el propio directorio del almacén o el
+    fichero de texto original; en ese caso, si construir=True y el almacén no
+    existe o está desactualizado, se (re)construye antes de abrirlo.
+    """
+    if es_almacen(ruta):
+        return AlmacenCheckins(ruta)
+    if construir and not almacen_actualizado(ruta):
+        construir_almacen(ruta)
+    return AlmacenCheckins(ruta_almacen(ruta))
+
+# =============================================================================
+# PUNTO DE ENTRADA: ingesta de uno o varios ficheros de texto
+# =============================================================================
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python almacen_checkins.py <Ciudad>Gowalla.txt [...]")
+        sys.exit(1)
+
+    for fichero in sys.argv[1:]:
+        if almacen_actualizado(fichero):
+            print(f"[OK] {ruta_almacen(fichero)} ya está actualizado")
+            continue
+        destino = construir_almacen(fichero)
+        almacen = AlmacenCheckins(destino)
+        print(f"[OK] {fichero} -> {destino} ({len(almacen)} filas, "
+              f"{almacen.meta['localizaciones']} localizaciones)")
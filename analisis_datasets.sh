@@ -16,6 +16,17 @@ ARCHIVO_ZIP="DatasetsGowalla.zip"
 PROJECT_DIR="ProyectoFUSO"
 HTML_DIR="$PROJECT_DIR/templates/html_files"
 
+# 1 = estadísticas de todas las ciudades en una sola pasada paralela
+#     (estadisticas_ciudades.py); 0 = pipelines cut|sort|uniq + estadísticas.py
+ESTADISTICAS_PARALELAS=1
+
+# 1 = regenerar todos los mapas aunque estén en la caché (cache_mapas.py)
+FORZAR_MAPAS=0
+OPCION_FORZAR=""
+if [ "$FORZAR_MAPAS" = "1" ]; then
+    OPCION_FORZAR="--force"
+fi
+
 echo "=== ANÁLISIS DE DATASETS GOWALLA ==="
 echo "Fecha: $(date)"
 echo "Usuario: $(whoami)"
@@ -87,6 +98,26 @@ else
 fi
 echo ""
 
+# =============================================================================
+# PASO 3B: CONSTRUIR ALMACENES COLUMNARES (UNA SOLA VEZ)
+# =============================================================================
+echo "Paso 3b: Construyendo almacenes columnares..."
+echo "---------------------------------------------"
+
+# Convierte cada <Ciudad>Gowalla.txt en <Ciudad>Gowalla.almacen/ (binario + mmap).
+# Si el almacén ya está al día con el fichero de texto no se vuelve a construir.
+if [ -f "almacen_checkins.py" ]; then
+    python3 almacen_checkins.py "$PATH_GOWALLA_FILES"*Gowalla.txt
+    
+    # Pirámide de densidad por ciudad para los mapas de calor (/api/density)
+    if [ -f "teselas_densidad.py" ]; then
+        python3 teselas_densidad.py "$PATH_GOWALLA_FILES"*Gowalla.txt
+    fi
+else
+    echo "  AVISO: No se encuentra almacen_checkins.py, se usará el texto original"
+fi
+echo ""
+
 # =============================================================================
 # PASO 4: INICIALIZAR ARCHIVO ALL_LOCATIONS.txt
 # =============================================================================
@@ -97,6 +128,20 @@ echo "--------------------------------------------"
 echo "Archivo ALL_LOCATIONS.txt creado/vaciado"
 echo ""
 
+# =============================================================================
+# PASO 4B: ESTADÍSTICAS DE TODAS LAS CIUDADES EN PARALELO
+# =============================================================================
+if [ "$ESTADISTICAS_PARALELAS" = "1" ] && [ -f "estadisticas_ciudades.py" ]; then
+    echo "Paso 4b: Calculando estadísticas de todas las ciudades en paralelo..."
+    echo "--------------------------------------------------------------------"
+
+    # Una sola lectura por fichero; resultado en texto (pantalla) y en JSON
+    python3 estadisticas_ciudades.py "$PATH_GOWALLA_FILES"*Gowalla.txt --json estadisticas_ciudades.json
+    echo ""
+else
+    ESTADISTICAS_PARALELAS=0
+fi
+
 # =============================================================================
 # PASO 5: PROCESAR CADA CIUDAD
 # =============================================================================
@@ -138,40 +183,45 @@ for ciudad in "${ciudades[@]}"; do
     echo "  - Columnas 1,2,5 → $archivo_filtrado"
     cut -f1,2,5 "$archivo_original" > "$archivo_filtrado"
     
-    # -------------------------------------------------------------------------
-    # TAREA B: Mostrar estadísticas con comandos Bash
-    # -------------------------------------------------------------------------
-    echo ""
-    echo "B. Estadísticas con comandos Bash:"
-    echo "  ---------------------------------"
+    if [ "$ESTADISTICAS_PARALELAS" = "1" ]; then
+        echo ""
+        echo "B/C. Estadísticas ya calculadas en el paso 4b (estadisticas_ciudades.json)"
+    else
+        # -------------------------------------------------------------------------
+        # TAREA B: Mostrar estadísticas con comandos Bash
+        # -------------------------------------------------------------------------
+        echo ""
+        echo "B. Estadísticas con comandos Bash:"
+        echo "  ---------------------------------"
     
-    # Número de usuarios distintos (columna 1)
-    usuarios_distintos=$(cut -f1 "$archivo_original" | sort | uniq | wc -l)
-    echo "  Número de usuarios distintos: $usuarios_distintos"
+        # Número de usuarios distintos (columna 1)
+        usuarios_distintos=$(cut -f1 "$archivo_original" | sort | uniq | wc -l)
+        echo "  Número de usuarios distintos: $usuarios_distintos"
     
-    # Número de lugares distintos (columna 5)
-    lugares_distintos=$(cut -f5 "$archivo_original" | sort | uniq | wc -l)
-    echo "  Número de lugares distintos: $lugares_distintos"
+        # Número de lugares distintos (columna 5)
+        lugares_distintos=$(cut -f5 "$archivo_original" | sort | uniq | wc -l)
+        echo "  Número de lugares distintos: $lugares_distintos"
     
-    # Número de filas completas (todas las líneas)
-    filas_completas=$(wc -l < "$archivo_original")
-    echo "  Número de filas completas: $filas_completas"
+        # Número de filas completas (todas las líneas)
+        filas_completas=$(wc -l < "$archivo_original")
+        echo "  Número de filas completas: $filas_completas"
     
-    # Número de check-ins en julio 2010 (columna 2 empieza con "2010-07")
-    checkins_julio=$(cut -f2 "$archivo_original" | grep -c '^2010-07')
-    echo "  Número de check-ins en 2010-07: $checkins_julio"
+        # Número de check-ins en julio 2010 (columna 2 empieza con "2010-07")
+        checkins_julio=$(cut -f2 "$archivo_original" | grep -c '^2010-07')
+        echo "  Número de check-ins en 2010-07: $checkins_julio"
     
-    # Número de check-ins en agosto 2010 (columna 2 empieza con "2010-08")
-    checkins_agosto=$(cut -f2 "$archivo_original" | grep -c '^2010-08')
-    echo "  Número de check-ins en 2010-08: $checkins_agosto"
+        # Número de check-ins en agosto 2010 (columna 2 empieza con "2010-08")
+        checkins_agosto=$(cut -f2 "$archivo_original" | grep -c '^2010-08')
+        echo "  Número de check-ins en 2010-08: $checkins_agosto"
     
-    # -------------------------------------------------------------------------
-    # TAREA C: Llamar al script Python para comparar estadísticas
-    # -------------------------------------------------------------------------
-    echo ""
-    echo "C. Comparando con script Python (estadísticas.py):"
-    echo "  ------------------------------------------------"
-    python3 estadisticas.py "$archivo_original"
+        # -------------------------------------------------------------------------
+        # TAREA C: Llamar al script Python para comparar estadísticas
+        # -------------------------------------------------------------------------
+        echo ""
+        echo "C. Comparando con script Python (estadísticas.py):"
+        echo "  ------------------------------------------------"
+        python3 estadisticas.py "$archivo_original"
+    fi
     
     # -------------------------------------------------------------------------
     # TAREA D: Generar mapa de la ciudad con generate_maps.py
@@ -185,10 +235,15 @@ for ciudad in "${ciudades[@]}"; do
     
     # Verificar que generate_maps.py existe
     if [ -f "generate_maps.py" ]; then
+        # El fichero filtrado no tiene coordenadas: el mapa se genera a partir
+        # del original (o de su almacén), con un marcador por localización
+        # creado en el navegador
         python3 generate_maps.py \
-            --input_file "$archivo_filtrado" \
+            --input_file "$archivo_original" \
             --city_name "$ciudad" \
-            --output_html "$html_salida"
+            --output_html "$html_salida" \
+            --fast \
+            --by_location $OPCION_FORZAR
         
         if [ -f "$html_salida" ]; then
             echo "  Mapa generado: $html_salida"
@@ -222,7 +277,7 @@ for ciudad in "${ciudades[@]}"; do
                 --user_id "$usuario_con_visitas" \
                 --city_name "$ciudad" \
                 --input_file "$archivo_original" \
-                --output_html "$html_individual"
+                --output_html "$html_individual" $OPCION_FORZAR
             
             if [ -f "$html_individual" ]; then
                 echo "  Mapa individual generado: $html_individual"
@@ -261,26 +316,26 @@ for ciudad in "${ciudades[@]}"; do
             echo "  G. Generando mapas para los top 5 usuarios..."
             echo "    -------------------------------------------"
             
+            # Una sola ejecución: lee los check-ins una vez y genera los
+            # mapas de todos los usuarios del top en un pool de procesos
+            python3 generate_individual_maps.py \
+                --top_file "$archivo_top5" \
+                --city_name "$ciudad" \
+                --input_file "$archivo_original" \
+                --output_dir "$HTML_DIR" \
+                --output_name "top_user_{user_id}_{city_name}.html" $OPCION_FORZAR
+            
             contador=0
             while read -r linea; do
                 if [ -n "$linea" ]; then
                     usuario_top=$(echo "$linea" | awk '{print $1}')
                     contador=$((contador + 1))
-                    
-                    echo "    $contador. Procesando usuario: $usuario_top"
-                    
                     html_top="${HTML_DIR}/top_user_${usuario_top}_${ciudad}.html"
                     
-                    python3 generate_individual_maps.py \
-                        --user_id "$usuario_top" \
-                        --city_name "$ciudad" \
-                        --input_file "$archivo_original" \
-                        --output_html "$html_top"
-                    
                     if [ -f "$html_top" ]; then
-                        echo "      Mapa generado: $html_top"
+                        echo "    $contador. Mapa generado: $html_top"
                     else
-                        echo "      Error generando mapa"
+                        echo "    $contador. Error generando mapa del usuario $usuario_top"
                     fi
                 fi
             done < "$archivo_top5"
@@ -19,6 +19,13 @@ VENV_DIR="venv"
 FLASK_APP="main.py"
 FLASK_PORT="5000"
 
+# Servidor: "desarrollo" (python main.py, servidor de Flask con debug) o
+# "produccion" (gunicorn, ver gunicorn_config.py): un worker con varios hilos
+# mientras /train asíncrono esté activo; con TRAIN_ASYNC=0, varios workers
+# Ejemplo: MODO_SERVIDOR=produccion THREADS=16 ./apartado_despliege_BashClaudia_Gonzalo.sh
+#          MODO_SERVIDOR=produccion TRAIN_ASYNC=0 WORKERS=4 THREADS=8 ./apartado_despliege_BashClaudia_Gonzalo.sh
+MODO_SERVIDOR="${MODO_SERVIDOR:-desarrollo}"
+
 # =============================================================================
 # PASO 1: VERIFICACIONES INICIALES
 # =============================================================================
@@ -356,10 +363,17 @@ echo ""
 # PASO 9: INICIAR LA APLICACIÓN FLASK
 # =============================================================================
 
+if [ "$MODO_SERVIDOR" = "produccion" ]; then
+    COMANDO_SERVIDOR="gunicorn -c gunicorn_config.py app:app"
+else
+    COMANDO_SERVIDOR="python $FLASK_APP"
+fi
+
 echo "Paso 8: Iniciando la aplicación Flask..."
 echo "---------------------------------------"
 echo "Directorio actual: $(pwd)"
-echo "Comando: python $FLASK_APP"
+echo "Modo: $MODO_SERVIDOR"
+echo "Comando: $COMANDO_SERVIDOR"
 echo ""
 echo "IMPORTANTE:"
 echo "==========="
@@ -367,6 +381,14 @@ echo "1. La aplicación se ejecutará en primer plano"
 echo "2. Para detenerla, presiona Ctrl+C"
 echo "3. Los logs se mostrarán en esta terminal"
 echo "4. Puede tardar unos segundos en iniciarse"
+if [ "$MODO_SERVIDOR" = "produccion" ]; then
+    if [ "${TRAIN_ASYNC:-1}" = "1" ]; then
+        echo "5. Workers: 1 x ${THREADS:-8} hilos (TRAIN_ASYNC=1); se precargan los índices antes de arrancarlo"
+    else
+        echo "5. Workers: ${WORKERS:-$(nproc)} x ${THREADS:-4} hilos; se precargan los índices antes de arrancarlos"
+    fi
+    echo "6. Reinicio ordenado de los workers: kill -HUP <pid del proceso maestro de gunicorn>"
+fi
 echo ""
 echo "INICIANDO APLICACIÓN FLASK..."
 echo "=============================="
@@ -383,7 +405,16 @@ fi
 # debug=True para desarrollo (se desactiva en producción)
 # port=5000 según el enunciado
 
-python "$FLASK_APP"
+if [ "$MODO_SERVIDOR" = "produccion" ]; then
+    # Producción: gunicorn con la aplicación precargada (sin reloader ni debugger)
+    if ! command -v gunicorn &> /dev/null; then
+        echo "Instalando gunicorn..."
+        pip install gunicorn
+    fi
+    PUERTO="$FLASK_PORT" gunicorn -c gunicorn_config.py app:app
+else
+    python "$FLASK_APP"
+fi
 
 # =============================================================================
 # NOTAS FINALES (se mostrarán si la aplicación se detiene)
@@ -397,7 +428,7 @@ echo ""
 echo "Para reiniciar la aplicación:"
 echo "1. Asegúrate de estar en el directorio $PROJECT_DIR"
 echo "2. Activa el entorno virtual: source ../$VENV_DIR/bin/activate"
-echo "3. Ejecuta: python $FLASK_APP"
+echo "3. Ejecuta: $COMANDO_SERVIDOR"
 echo ""
 echo "Para pruebas adicionales:"
 echo "- Revisa los archivos generados en: static/"
@@ -1,20 +1,74 @@
 # app.py
 # 
-from flask import Flask, request, render_template, send_from_directory
+from flask import Flask, request, render_template, render_template_string, jsonify, Response
 from src.model import train_and_evaluate, get_dataset_statistics, perform_eda, generate_synthetic_dataset, \
     compare_execution
 import os
 import glob
+import shutil
 from src.model import DATASETS
 from src.model import MODELS
 import time
 from memory_profiler import memory_usage
 import gc
+import itertools
+import random
+import threading
+import numpy as np
+from joblib import Parallel, delayed
+from indice_espacial import abrir_indice_espacial, ZOOM_MINIMO, ZOOM_MAXIMO
+from indice_temporal import a_epoch
+from teselas_densidad import abrir_piramide
+from compresion_estatica import servir_fichero, url_versionada
+from cola_trabajos import ColaTrabajos, ColaLlena
+from cache_resultados import CacheResultados, clave_resultado, hiperparametros_modelo
+from metricas_servicio import instrumentar, exportar_metricas, registro as metrics, TIPO_CONTENIDO
 
 main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '')
 
 app = Flask(__name__)
+instrumentar(app)  # per-route wall/CPU time, peak RSS delta and GC collections, served on /metrics
 HTML_DIR = 'templates/html_files'  # Store the HTML MAPS
+CHECKINS_DIR = 'DatasetsGowalla'  # <City>Gowalla.txt files (and their check-in stores)
+
+# Viewport API: below this zoom level check-ins are aggregated in grid cells
+POINTS_MIN_ZOOM = 14
+DEFAULT_PAGE_SIZE = 5000
+MAX_PAGE_SIZE = 50000
+
+# Asynchronous /train jobs: worker processes and pending jobs before answering 503.
+# Jobs live in this process, so TRAIN_ASYNC=0 disables them when the server runs
+# several processes (see gunicorn_config.py)
+TRAIN_ASYNC = os.environ.get('TRAIN_ASYNC', '1') == '1'
+TRAIN_WORKERS = os.cpu_count() or 1
+TRAIN_QUEUE_SIZE = 4 * TRAIN_WORKERS
+TRAIN_RETRY_AFTER = 5  # seconds
+train_jobs = ColaTrabajos(TRAIN_WORKERS, TRAIN_QUEUE_SIZE)
+
+# Training results already computed, by full parameter key (LRU, bounded).
+# Each key has its own plot, deleted when its entry is evicted
+TRAIN_CACHE_SIZE = 256
+train_results = CacheResultados(TRAIN_CACHE_SIZE, borrar_desalojadas=True)
+STATIC_DIR = os.path.join(main_path, 'static')
+
+# /sweep: parallel fits (one per core) and largest grid accepted in one request
+SWEEP_JOBS = os.cpu_count() or 1
+SWEEP_MAX_POINTS = 100
+SWEEP_TEMPLATE = """<!doctype html>
+<title>Sweep {{ dataset }}</title>
+<h1>Sweep: {{ dataset }} ({{ points|length }} fits, {{ '%.2f'|format(seconds) }} s)</h1>
+<table border="1" cellpadding="4">
+<tr><th>Model</th><th>Train size</th><th>Test size</th><th>Seed</th><th>Accuracy</th><th>Error</th><th>Plot</th></tr>
+{% for p in points %}<tr><td>{{ p.model }}</td><td>{{ p.train_size }}</td><td>{{ p.test_size }}</td><td>{{ p.seed }}</td>
+{% if p.exception %}<td colspan="3">{{ p.exception }}</td>{% else %}<td>{{ '%.4f'|format(p.accuracy) }}</td>
+<td>{{ '%.4f'|format(p.error) }}</td><td><a href="{{ p.img_url }}">{{ p.img_url }}</a></td>{% endif %}</tr>
+{% endfor %}</table>
+"""
+
+# Spatial indexes and density pyramids are built (or opened) once per city
+# and shared by all requests
+_city_structures = {}
+_city_structures_lock = threading.Lock()
 
 
 @app.route('/')
@@ -24,35 +78,229 @@ def index():
     """
     services = {
         'Train and Evaluate': '/train',
+        'Training Job Status': '/train/status/<job_id>',
+        'Train/Test Split Sweep': '/sweep?dataset=<dataset>&models=<m1,m2>&train_sizes=0.1,...,0.9',
         'Dataset Statistics': '/statistics/<dataset>',
         'Exploratory Data Analysis': '/eda/<dataset>',
         'Clean Images': '/clean_images',
         'Generate Synthetic Dataset': '/generate_synthetic',
         'Compare Execution': '/compare_execution',
-        'Show HTML Files': '/show_html_files'
+        'Show HTML Files': '/show_html_files',
+        'Metrics (Prometheus)': '/metrics',
+        'Check-ins in Viewport (GeoJSON)': '/api/checkins/<city>?bbox=lon_min,lat_min,lon_max,lat_max&zoom=<z>',
+        'Check-in Density (Heatmap)': '/api/density/<city>?bbox=lon_min,lat_min,lon_max,lat_max&zoom=<z>'
     }
     return render_template('index.html', services=services)
 
 
+def _train_request(form):
+    """Training parameters of a /train form and the name of its result image."""
+    dataset_name = form['dataset']
+    model_name = form['model']
+    tr_size = form['train_size']
+    ts_size = form['test_size']
+    result_name = dataset_name + "Tr" + tr_size + "Tst" + ts_size + ".png"
+    return dataset_name, model_name, float(tr_size), float(ts_size), result_name
+
+
+def _train_key(dataset_name, model_name, train_size, test_size, seed=None):
+    """
+    Result cache key: dataset, split sizes, model, its hyper-parameters and
+    the random seed (the model's random_state unless a seed is given).
+    """
+    params = hiperparametros_modelo(MODELS.get(model_name))
+    return clave_resultado(dataset_name, model_name, train_size, test_size,
+                           semilla=params.get('random_state') if seed is None else seed, hiperparametros=params)
+
+
+def _static_url(name, prefix='/static/'):
+    """
+    URL of a file of static/ with its content version (?v=...), which
+    servir_fichero marks as immutable. Without the file, the plain URL.
+    """
+    try:
+        return url_versionada(STATIC_DIR, name, prefix)
+    except OSError:
+        return prefix + name
+
+
+def _train_image(dataset_name, model_name, train_size, test_size, key):
+    """
+    Result image of one cache key: the /train name plus the model and a prefix
+    of the key, so fits with another model, seed or hyper-parameters never
+    overwrite a plot that a cached result points to.
+    """
+    return f"{dataset_name}{model_name}Tr{train_size}Tst{test_size}_{key[:12]}.png"
+
+
 @app.route('/train', methods=['POST', 'GET'])
 def train():
     if request.method == 'POST':
-        dataset_name = request.form['dataset']
-        model_name = request.form['model']
-        tr_size = request.form['train_size']
-        train_size = float(tr_size)
-        ts_size = request.form['test_size']
-        test_size = float(ts_size)
-
-        result_name = dataset_name + "Tr" + tr_size + "Tst" + ts_size + ".png"
-        accuracy, error = train_and_evaluate(dataset_name, model_name, train_size, test_size, result_name)
-
-        img_url = '../static/' + result_name
+        dataset_name, model_name, train_size, test_size, result_name = _train_request(request.form)
+        key = _train_key(dataset_name, model_name, train_size, test_size)
+        image_name = _train_image(dataset_name, model_name, train_size, test_size, key)
+        image_path = os.path.join(STATIC_DIR, image_name)
+        # cache=0 always trains (the new result still replaces the cached one)
+        use_cache = request.values.get('cache') not in ('0', 'false', 'no')
+        cached = train_results.obtener(key) if use_cache else None
+
+        # Asynchronous mode: enqueue the training and answer at once with the job id
+        if request.values.get('async') in ('1', 'true', 'yes'):
+            if not TRAIN_ASYNC:
+                return jsonify({'error': 'Asynchronous training is disabled on this server (TRAIN_ASYNC=0)'}), 400
+            if cached is not None:
+                return jsonify({'status': 'done', 'cached': True, 'dataset': dataset_name, 'model': model_name,
+                                'train_size': train_size, 'test_size': test_size,
+                                'accuracy': float(cached['accuracy']), 'error': float(cached['error']),
+                                'img_url': _static_url(image_name)})
+            try:
+                # The result is cached as soon as the job finishes, whether or not anyone polls it
+                job_id = train_jobs.enviar(train_and_evaluate, dataset_name, model_name, train_size, test_size,
+                                           image_name,
+                                           datos={'dataset': dataset_name, 'model': model_name,
+                                                  'train_size': train_size, 'test_size': test_size,
+                                                  'img_url': '/static/' + image_name},
+                                           al_terminar=lambda result: train_results.guardar(key, *result, image_path))
+            except ColaLlena as e:
+                response = jsonify({'error': str(e), **train_jobs.resumen()})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(TRAIN_RETRY_AFTER)
+                return response
+            response = jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f'/train/status/{job_id}'})
+            response.status_code = 202
+            response.headers['Location'] = f'/train/status/{job_id}'
+            return response
+
+        if cached is not None:
+            accuracy, error = cached['accuracy'], cached['error']
+        else:
+            accuracy, error = train_and_evaluate(dataset_name, model_name, train_size, test_size, image_name)
+            train_results.guardar(key, accuracy, error, image_path)
+        # Clients that build the classic <dataset>Tr<tr>Tst<ts>.png name still find the plot
+        if os.path.isfile(image_path):
+            shutil.copyfile(image_path, os.path.join(STATIC_DIR, result_name))
+
+        img_url = _static_url(image_name, '../static/')
         return render_template('result.html', accuracy=accuracy, error=error, img_url=img_url,
                                dataset=dataset_name, model=model_name, train_size=train_size, test_size=test_size)
     return render_template('train.html', datasets=DATASETS.keys(), models=MODELS.keys())
 
 
+@app.route('/train/status/<job_id>', methods=['GET'])
+def train_status(job_id):
+    """
+    Report the status of an asynchronous training job: queued, running,
+    done (with accuracy, error and image URL) or failed.
+    """
+    status = train_jobs.estado(job_id)
+    if status is None:
+        return jsonify({'error': f'Unknown job: {job_id}'}), 404
+    result = status.pop('result', None)
+    if result is not None:
+        status['accuracy'], status['error'] = (float(v) for v in result)
+        status['img_url'] = _static_url(os.path.basename(status['img_url']))
+    return jsonify(status)
+
+
+def _sweep_points(values):
+    """
+    Grid of a /sweep request as a list of (model, train_size, test_size, seed).
+    Either explicit 'points' ([{model, train_size, test_size, seed}, ...]) or
+    the product of 'models' x splits x 'seeds', where the splits pair
+    'train_sizes' with 'test_sizes' (default 1 - train_size). List values may
+    be JSON lists or comma-separated strings.
+    """
+    def as_list(name, default=None):
+        value = values.get(name, default)
+        if isinstance(value, str):
+            value = [v.strip() for v in value.split(',') if v.strip()]
+        return list(value) if value is not None else []
+
+    if values.get('points'):
+        return [(p['model'], float(p['train_size']), float(p['test_size']),
+                 None if p.get('seed') is None else int(p['seed'])) for p in values['points']]
+
+    train_sizes = [float(v) for v in as_list('train_sizes')]
+    test_sizes = [float(v) for v in as_list('test_sizes')] or [round(1 - v, 10) for v in train_sizes]
+    if len(train_sizes) != len(test_sizes):
+        raise ValueError('train_sizes and test_sizes must have the same length')
+    seeds = [int(v) for v in as_list('seeds')] or [None]
+    return [(model, tr, ts, seed) for model, (tr, ts), seed
+            in itertools.product(as_list('models'), zip(train_sizes, test_sizes), seeds)]
+
+
+def _sweep_fit(dataset_name, model_name, train_size, test_size, seed, result_name):
+    """One fit of a sweep (runs in a joblib worker). Failures are returned, not raised."""
+    start = time.time()
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    try:
+        accuracy, error = train_and_evaluate(dataset_name, model_name, train_size, test_size, result_name)
+    except Exception as e:
+        return {'exception': f'{type(e).__name__}: {e}', 'seconds': time.time() - start}
+    return {'accuracy': float(accuracy), 'error': float(error), 'seconds': time.time() - start}
+
+
+@app.route('/sweep', methods=['POST', 'GET'])
+def sweep():
+    """
+    Train a whole grid of (model, train_size, test_size, seed) on one dataset
+    in a single request. Fits not already in the result cache run in
+    parallel across cores; the answer lists every accuracy, error and plot
+    URL (JSON, or an HTML table with format=html).
+    """
+    values = request.get_json(silent=True) or request.values.to_dict()
+    dataset_name = values.get('dataset')
+    try:
+        points = _sweep_points(values)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid sweep request: {e}'}), 400
+    if dataset_name not in DATASETS:
+        return jsonify({'error': f'Unknown dataset: {dataset_name}'}), 400
+    if not points or len(points) > SWEEP_MAX_POINTS:
+        return jsonify({'error': f'A sweep needs between 1 and {SWEEP_MAX_POINTS} points'}), 400
+    unknown = sorted({model for model, _, _, _ in points if model not in MODELS})
+    invalid = [(tr, ts) for _, tr, ts, _ in points if not (0 < tr < 1 and 0 < ts < 1 and tr + ts <= 1 + 1e-9)]
+    if unknown or invalid:
+        return jsonify({'error': f'Invalid sweep request: unknown models {unknown}, invalid splits {invalid}'}), 400
+
+    start = time.time()
+    results, pending = [], []
+    for model_name, train_size, test_size, seed in points:
+        # One image per point (its cache key), so parallel fits do not collide
+        key = _train_key(dataset_name, model_name, train_size, test_size, seed)
+        result_name = _train_image(dataset_name, model_name, train_size, test_size, key)
+        result = {'model': model_name, 'train_size': train_size, 'test_size': test_size, 'seed': seed}
+        cached = train_results.obtener(key)
+        if cached is not None:
+            result.update(accuracy=float(cached['accuracy']), error=float(cached['error']), cached=True,
+                          img_url=_static_url(result_name))
+        else:
+            result.update(cached=False, img_url='/static/' + result_name)
+            pending.append((result, key, result_name))
+        results.append(result)
+
+    if pending:
+        fits = Parallel(n_jobs=min(SWEEP_JOBS, len(pending)))(
+            delayed(_sweep_fit)(dataset_name, result['model'], result['train_size'], result['test_size'],
+                                result['seed'], result_name)
+            for result, _, result_name in pending)
+        for (result, key, result_name), fit in zip(pending, fits):
+            result.update(fit)
+            if 'exception' not in fit:
+                train_results.guardar(key, fit['accuracy'], fit['error'], os.path.join(STATIC_DIR, result_name))
+                result['img_url'] = _static_url(result_name)
+            else:
+                del result['img_url']
+
+    summary = {'dataset': dataset_name, 'points': results, 'fits': len(pending),
+               'failed': sum('exception' in r for r in results), 'seconds': time.time() - start}
+    if values.get('format') == 'html':
+        return render_template_string(SWEEP_TEMPLATE, **summary)
+    return jsonify(summary)
+
+
 @app.route('/statistics/<dataset>', methods=['GET'])
 def statistics(dataset):
     """
@@ -82,12 +330,14 @@ def eda(dataset):
 @app.route('/clean_images', methods=['GET'])
 def clean_images():
     """
-    Clean the static directory by removing all PNG images.
+    Clean the static directory by removing all PNG images (and the cached
+    training results that pointed to them).
     """
 
-    files = glob.glob(os.path.join(main_path, 'static', '*.png'))
+    files = glob.glob(os.path.join(STATIC_DIR, '*.png'))
     for f in files:
         os.remove(f)
+    train_results.limpiar()
     return render_template('clean.html', num_files=len(files))
 
 
@@ -133,22 +383,200 @@ def compare_execution_route():
 @app.route('/show_html_files', methods=['GET'])
 def show_html_files():
     """
-    List available HTML files for viewing.
+    List available HTML files for viewing. 'urls' maps each file to its
+    versioned /view_html_file link (?v=...), which clients may cache forever.
     """
     files = glob.glob(os.path.join(main_path, HTML_DIR, '*.html'))
 
     print("Files")
     print(files)
     filenames = [os.path.basename(f) for f in files]
-    return render_template('list_html_files.html', files=filenames)
+    urls = {name: url_versionada(os.path.join(main_path, HTML_DIR), name, '/view_html_file/') for name in filenames}
+    return render_template('list_html_files.html', files=filenames, urls=urls)
+
+
+def _open_city_structure(kind, opener, city):
+    """
+    Return the structure of a city (spatial index, density pyramid...),
+    opening or building it on first use. Returns None if there is no
+    check-in file for the city.
+    """
+    with _city_structures_lock:
+        if (kind, city) not in _city_structures:
+            path = os.path.join(main_path, CHECKINS_DIR, city + 'Gowalla.txt')
+            if not os.path.isfile(path):
+                return None
+            _city_structures[(kind, city)] = opener(path)
+        return _city_structures[(kind, city)]
+
+
+def get_spatial_index(city):
+    """Spatial grid index of a city (see indice_espacial.py)."""
+    return _open_city_structure('spatial', abrir_indice_espacial, city)
+
+
+def get_density_pyramid(city):
+    """Density tile pyramid of a city (see teselas_densidad.py)."""
+    return _open_city_structure('density', abrir_piramide, city)
+
+
+def preload_state(cities=True):
+    """
+    Load the heavy shared state before the server forks its workers (see
+    gunicorn_config.py). Importing this module already loads src.model and
+    its libraries; this adds, optionally, the spatial index and density
+    pyramid of every city. Workers then share those pages copy-on-write
+    instead of loading them per process. A city that fails is logged and
+    skipped.
+    """
+    if cities:
+        for path in sorted(glob.glob(os.path.join(main_path, CHECKINS_DIR, '*Gowalla.txt'))):
+            city = os.path.basename(path)[:-len('Gowalla.txt')]
+            try:
+                get_spatial_index(city)
+                get_density_pyramid(city)
+            except Exception as e:
+                app.logger.warning('City %s not preloaded: %s', city, e)
+
+
+@app.route('/api/checkins/<city>', methods=['GET'])
+def checkins_viewport(city):
+    """
+    Return the check-ins inside a map viewport, one page at a time.
+
+    Query parameters: bbox=lon_min,lat_min,lon_max,lat_max (required), zoom,
+    start/end (time window, e.g. 2010-07-01), mode=auto|points|cells,
+    format=geojson|binary, offset and limit. Below POINTS_MIN_ZOOM the
+    auto mode returns aggregated grid cells instead of single check-ins.
+    """
+    try:
+        bbox = tuple(float(v) for v in request.args['bbox'].split(','))
+        if len(bbox) != 4:
+            raise ValueError('bbox needs 4 values')
+        zoom = int(request.args.get('zoom', POINTS_MIN_ZOOM))
+        if not ZOOM_MINIMO <= zoom <= ZOOM_MAXIMO:
+            raise ValueError(f'zoom must be between {ZOOM_MINIMO} and {ZOOM_MAXIMO}')
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get('limit', DEFAULT_PAGE_SIZE))))
+        # Time window as epoch seconds, so a malformed date is a 400 and not a 500
+        start, end = (None if request.args.get(name) is None else a_epoch(request.args[name])
+                      for name in ('start', 'end'))
+        mode = request.args.get('mode', 'auto')
+        output_format = request.args.get('format', 'geojson')
+        if mode not in ('auto', 'points', 'cells') or output_format not in ('geojson', 'binary'):
+            raise ValueError('invalid mode or format')
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f'Invalid viewport request: {e}'}), 400
+
+    index = get_spatial_index(city)
+    if index is None:
+        return jsonify({'error': f'Unknown city: {city}'}), 404
+
+    if mode == 'cells' or (mode == 'auto' and zoom < POINTS_MIN_ZOOM):
+        cells = index.agregar(bbox, zoom, start, end)
+        total = len(cells['conteos'])
+        page = slice(offset, offset + limit)
+        kind = 'cells'
+        records = np.rec.fromarrays([cells['latitud'][page], cells['longitud'][page], cells['conteos'][page]],
+                                    names='lat,lon,count')
+    else:
+        rows = index.filas(bbox, start, end)
+        total = len(rows)
+        rows = rows[offset:offset + limit]
+        store = index.almacen
+        kind = 'points'
+        records = np.rec.fromarrays([store.latitud[rows], store.longitud[rows], store.usuario[rows],
+                                     store.timestamp[rows], store.ids_localizacion[store.localizacion[rows]]],
+                                    names='lat,lon,user,time,poi')
+
+    next_offset = offset + limit if offset + limit < total else None
+    if output_format == 'binary':
+        # Little-endian records; the field layout is sent in X-Fields
+        response = Response(records.tobytes(), mimetype='application/octet-stream')
+        response.headers['X-Fields'] = ','.join(f'{name}:{records.dtype[name].str}' for name in records.dtype.names)
+    else:
+        columns = {name: records[name].tolist() for name in records.dtype.names}
+        if kind == 'points':
+            # Same timestamp format as the dataset (2010-10-18T03:24:02Z)
+            columns['time'] = store.fechas_texto(rows).tolist()
+        properties = [name for name in records.dtype.names if name not in ('lat', 'lon')]
+        features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                     'properties': {name: columns[name][i] for name in properties}}
+                    for i, (lat, lon) in enumerate(zip(columns['lat'], columns['lon']))]
+        response = jsonify({'type': 'FeatureCollection', 'kind': kind, 'total': total, 'offset': offset,
+                            'next_offset': next_offset, 'features': features})
+    response.headers['X-Total-Count'] = str(total)
+    if next_offset is not None:
+        response.headers['X-Next-Offset'] = str(next_offset)
+    return response
+
+
+@app.route('/api/density/<city>', methods=['GET'])
+def density_tile(city):
+    """
+    Return the check-in density of a map viewport from the precomputed pyramid.
+
+    Query parameters: bbox=lon_min,lat_min,lon_max,lat_max (required), zoom and
+    format=heat|grid|binary. 'heat' returns [lat, lon, count] cell centers
+    (Leaflet.heat style), 'grid' the count matrix (rows go north from lat0,
+    columns go east from lon0) and 'binary' the raw uint32 matrix.
+    """
+    try:
+        bbox = tuple(float(v) for v in request.args['bbox'].split(','))
+        if len(bbox) != 4:
+            raise ValueError('bbox needs 4 values')
+        zoom = int(request.args.get('zoom', POINTS_MIN_ZOOM - 1))
+        if not ZOOM_MINIMO <= zoom <= ZOOM_MAXIMO:
+            raise ValueError(f'zoom must be between {ZOOM_MINIMO} and {ZOOM_MAXIMO}')
+        output_format = request.args.get('format', 'heat')
+        if output_format not in ('heat', 'grid', 'binary'):
+            raise ValueError('invalid format')
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f'Invalid density request: {e}'}), 400
+
+    pyramid = get_density_pyramid(city)
+    if pyramid is None:
+        return jsonify({'error': f'Unknown city: {city}'}), 404
+
+    tile = pyramid.tesela(bbox, zoom)
+    header = {'zoom': tile['zoom'], 'cell_size': tile['tam_celda'], 'lat0': tile['lat0'], 'lon0': tile['lon0'],
+              'shape': list(tile['conteos'].shape)}
+    if output_format == 'binary':
+        response = Response(np.ascontiguousarray(tile['conteos'], dtype='<u4').tobytes(),
+                            mimetype='application/octet-stream')
+        for name, value in header.items():
+            response.headers['X-' + name.replace('_', '-').title()] = ','.join(map(str, value)) \
+                if isinstance(value, list) else str(value)
+        return response
+    if output_format == 'grid':
+        return jsonify({**header, 'counts': tile['conteos'].tolist()})
+    return jsonify({**header, 'points': pyramid.puntos_calor(bbox, zoom).tolist()})
 
 
 @app.route('/view_html_file/<filename>', methods=['GET'])
 def view_html_file(filename):
     """
-    Display the selected HTML file.
+    Display the selected HTML file (precompressed, with ETag and 304 support).
     """
-    return send_from_directory(HTML_DIR, filename)
+    return servir_fichero(os.path.join(main_path, HTML_DIR), filename)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Request and process metrics in the Prometheus text format, plus the state
+    of the training queue and of the result cache.
+    """
+    for name, value in train_jobs.resumen().items():
+        metrics.fijar('train_queue_' + name, 'Asynchronous training queue.', value)
+    for name, value in train_results.resumen().items():
+        metrics.fijar('train_result_cache_' + name, 'Training result cache.', value)
+    rss = memory_usage(-1, interval=0)[0] * 1024 * 1024  # MiB -> bytes
+    return Response(exportar_metricas(rss), content_type=TIPO_CONTENIDO)
+
+
+# Result PNGs in static/ get the same strong ETags and conditional GETs
+app.view_functions['static'] = lambda filename: servir_fichero(app.static_folder, filename)
 
 
 if __name__ == '__main__':
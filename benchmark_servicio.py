@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: benchmark_servicio.py
+# DESCRIPCIÓN: Generador de carga y medición de latencias del servicio Flask.
+#              Lanza peticiones a todas las rutas de app.py en dos modos:
+#              - cerrado: N usuarios que hacen una petición tras otra
+#              - abierto: llegadas a ritmo fijo (peticiones/segundo), midiendo la
+#                latencia desde el instante programado para que la cola de
+#                espera cuente (sin "omisión coordinada")
+#              Por ruta calcula rendimiento, tasa de error, percentiles
+#              p50/p95/p99 e histograma de latencias, lo guarda en JSON y
+#              compara dos ejecuciones para detectar regresiones.
+# USO: python benchmark_servicio.py --local --modo cerrado --usuarios 4 --duracion 30 --salida base.json
+#      python benchmark_servicio.py --url http://localhost:5000 --modo abierto --tasa 5 --salida nuevo.json
+#      python benchmark_servicio.py --comparar base.json nuevo.json [--umbral 0.10]
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import argparse
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from peticiones_request import URL_BASE, crear_sesion
+
+# Límites superiores (ms) de los cubos del histograma de latencias
+CUBOS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+# Tiempo máximo de espera de cada petición (segundos)
+TIMEOUT = 120
+
+# Peticiones en curso como máximo en el modo abierto
+MAX_EN_VUELO = 64
+
+# =============================================================================
+# FUNCIÓN: escenarios
+# =============================================================================
+def escenarios(dataset: str = "iris", modelo: str = "RandomForest", mapa: str = None) -> dict:
+    """
+    Petición de cada ruta de app.py: nombre -> (método, ruta, datos del formulario).
+    /train se mide por separado sin caché de resultados (cache=0: siempre
+    entrena) y con ella (tras la primera petición, siempre acierta). Usan
+    tamaños distintos para que los entrenamientos de la primera no
+    reescriban la imagen del resultado cacheado de la segunda.
+    /view_html_file solo se incluye si se indica un mapa existente.
+    """
+    rutas = {
+        'train': ('POST', '/train', {'dataset': dataset, 'model': modelo, 'train_size': '0.8', 'test_size': '0.2',
+                                     'cache': '0'}),
+        'train_cached': ('POST', '/train', {'dataset': dataset, 'model': modelo, 'train_size': '0.75',
+                                            'test_size': '0.25'}),
+        'statistics': ('GET', f'/statistics/{dataset}', None),
+        'eda': ('GET', f'/eda/{dataset}', None),
+        'generate_synthetic': ('POST', '/generate_synthetic', {'n_rows': '1000', 'n_cols': '10', 'n_classes': '2',
+                                                               'model': modelo, 'train_size': '0.8',
+                                                               'test_size': '0.2'}),
+        'compare_execution': ('GET', '/compare_execution', None),
+    }
+    if mapa:
+        rutas['view_html_file'] = ('GET', f'/view_html_file/{mapa}', None)
+    return rutas
+
+# =============================================================================
+# CLASE: Muestras
+# =============================================================================
+class Muestras:
+    """Latencias y errores por ruta, acumulados desde varios hilos."""
+
+    def __init__(self):
+        self._cerrojo = threading.Lock()
+        self.latencias = {}
+        self.errores = {}
+
+    def anotar(self, ruta: str, latencia: float, error: bool):
+        with self._cerrojo:
+            self.latencias.setdefault(ruta, []).append(latencia)
+            self.errores[ruta] = self.errores.get(ruta, 0) + int(error)
+
+
+def medir(sesion, url_base: str, nombre: str, peticion: tuple, muestras: Muestras, programado: float = None):
+    """
+    Hace una petición y anota su latencia (desde 'programado' si se indica).
+    Es error cualquier excepción o código HTTP >= 400.
+    """
+    metodo, ruta, datos = peticion
+    inicio = time.perf_counter() if programado is None else programado
+    try:
+        respuesta = sesion.request(metodo, url_base + ruta, data=datos, timeout=TIMEOUT)
+        respuesta.content  # La latencia incluye la descarga del cuerpo
+        error = respuesta.status_code >= 400
+    except Exception:
+        error = True
+    muestras.anotar(nombre, time.perf_counter() - inicio, error)
+
+# =============================================================================
+# FUNCIONES: modos de carga
+# =============================================================================
+def carga_cerrada(url_base: str, rutas: dict, usuarios: int, duracion: float, pausa: float = 0.0) -> Muestras:
+    """
+    'usuarios' hilos que, durante 'duracion' segundos, hacen una petición,
+    esperan la respuesta (y 'pausa' segundos) y hacen la siguiente. Las rutas
+    se reparten por turnos.
+    """
+    muestras = Muestras()
+    sesion = crear_sesion(usuarios, reintentos=0)  # sin reintentos: un fallo es un error medido
+    turno = itertools.cycle(list(rutas.items()))
+    cerrojo = threading.Lock()
+    fin = time.perf_counter() + duracion
+
+    def usuario():
+        while time.perf_counter() < fin:
+            with cerrojo:
+                nombre, peticion = next(turno)
+            medir(sesion, url_base, nombre, peticion, muestras)
+            if pausa:
+                time.sleep(pausa)
+
+    hilos = [threading.Thread(target=usuario) for _ in range(usuarios)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return muestras
+
+
+def carga_abierta(url_base: str, rutas: dict, tasa: float, duracion: float,
+                  max_en_vuelo: int = MAX_EN_VUELO) -> Muestras:
+    """
+    Lanza 'tasa' peticiones por segundo durante 'duracion' segundos, con
+    independencia de lo que tarde el servidor en responder. Si hay más de
+    'max_en_vuelo' en curso las siguientes esperan, y esa espera cuenta en su
+    latencia porque se mide desde el instante en que debían salir.
+    """
+    muestras = Muestras()
+    sesion = crear_sesion(max_en_vuelo, reintentos=0)
+    turno = itertools.cycle(list(rutas.items()))
+    inicio = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_en_vuelo) as pool:
+        for i in itertools.count():
+            programado = inicio + i / tasa
+            if programado - inicio >= duracion:
+                break
+            espera = programado - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            nombre, peticion = next(turno)
+            pool.submit(medir, sesion, url_base, nombre, peticion, muestras, programado)
+    return muestras
+
+# =============================================================================
+# FUNCIÓN: resumir
+# =============================================================================
+def resumir_latencias(latencias: list, errores: int, duracion: float) -> dict:
+    """Rendimiento, tasa de error, percentiles e histograma (en ms) de un conjunto de peticiones."""
+    ms = np.asarray(latencias, dtype=np.float64) * 1000
+    limites = np.asarray(CUBOS_MS + (np.inf,))
+    cubos = np.bincount(np.searchsorted(limites, ms, side='left'), minlength=len(limites))
+    return {
+        'peticiones': int(len(ms)),
+        'errores': int(errores),
+        'tasa_error': errores / len(ms) if len(ms) else 0.0,
+        'rendimiento_rps': len(ms) / duracion if duracion else 0.0,
+        'latencia_ms': {
+            'media': float(ms.mean()) if len(ms) else None,
+            **{f'p{p}': float(np.percentile(ms, p)) if len(ms) else None for p in (50, 95, 99)},
+            'max': float(ms.max()) if len(ms) else None,
+        },
+        'histograma_ms': {(f'<={int(limite)}' if np.isfinite(limite) else f'>{CUBOS_MS[-1]}'): int(n)
+                          for limite, n in zip(limites, cubos)},
+    }
+
+
+def resumir(muestras: Muestras, duracion: float, parametros: dict) -> dict:
+    """Resultado completo de una ejecución: parámetros, cada ruta y el total."""
+    todas = list(itertools.chain.from_iterable(muestras.latencias.values()))
+    return {
+        'parametros': parametros,
+        'duracion_s': duracion,
+        'rutas': {ruta: resumir_latencias(latencias, muestras.errores[ruta], duracion)
+                  for ruta, latencias in sorted(muestras.latencias.items())},
+        'total': resumir_latencias(todas, sum(muestras.errores.values()), duracion),
+    }
+
+# =============================================================================
+# FUNCIÓN: comparar
+# =============================================================================
+def comparar(base: dict, nuevo: dict, umbral: float = 0.10) -> list:
+    """
+    Compara dos ejecuciones ruta a ruta e imprime los cambios. Devuelve las
+    regresiones: percentiles que suben, rendimiento que baja más de 'umbral'
+    (relativo) o tasa de error que sube más de 'umbral' puntos.
+    """
+    regresiones = []
+    distintos = [clave for clave in ('modo', 'usuarios', 'tasa', 'duracion')
+                 if base['parametros'].get(clave) != nuevo['parametros'].get(clave)]
+    if distintos:
+        print(f"[AVISO] Las ejecuciones usan distinta carga ({', '.join(distintos)}): "
+              f"el rendimiento no es comparable")
+    print(f"{'Ruta':<20} {'Métrica':<16} {'Base':>12} {'Nuevo':>12} {'Cambio':>9}")
+    for ruta in sorted(set(base['rutas']) | set(nuevo['rutas'])):
+        if ruta not in base['rutas'] or ruta not in nuevo['rutas']:
+            print(f"{ruta:<20} solo en {'la nueva' if ruta in nuevo['rutas'] else 'la base'}")
+            continue
+        antes, despues = base['rutas'][ruta], nuevo['rutas'][ruta]
+        metricas = [(f'{p} (ms)', antes['latencia_ms'][p], despues['latencia_ms'][p], 1) for p in ('p50', 'p95', 'p99')]
+        metricas.append(('rendimiento/s', antes['rendimiento_rps'], despues['rendimiento_rps'], -1))
+        for nombre, valor_antes, valor_despues, sentido in metricas:
+            if not valor_antes or valor_despues is None:
+                continue
+            cambio = (valor_despues - valor_antes) / valor_antes
+            marca = " <-- REGRESIÓN" if cambio * sentido > umbral else ""
+            print(f"{ruta:<20} {nombre:<16} {valor_antes:>12.2f} {valor_despues:>12.2f} {cambio:>+8.1%}{marca}")
+            if marca:
+                regresiones.append((ruta, nombre, cambio))
+        cambio_error = despues['tasa_error'] - antes['tasa_error']
+        marca = " <-- REGRESIÓN" if cambio_error > umbral else ""
+        print(f"{ruta:<20} {'tasa de error':<16} {antes['tasa_error']:>12.2%} {despues['tasa_error']:>12.2%} "
+              f"{cambio_error:>+8.1%}{marca}")
+        if marca:
+            regresiones.append((ruta, 'tasa de error', cambio_error))
+    return regresiones
+
+# =============================================================================
+# FUNCIÓN: servidor_local
+# =============================================================================
+def servidor_local():
+    """Arranca app.py en este proceso (servidor multihilo en un puerto libre) y devuelve (url, servidor)."""
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # sin una línea por petición
+    servidor = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_port}", servidor
+
+# =============================================================================
+# PUNTO DE ENTRADA
+# =============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga y latencias del servicio Flask.")
+    parser.add_argument("--url", default=URL_BASE, help="URL base del servicio")
+    parser.add_argument("--local", action="store_true", help="Arrancar app.py en este proceso en lugar de usar --url")
+    parser.add_argument("--modo", choices=("cerrado", "abierto"), default="cerrado")
+    parser.add_argument("--usuarios", type=int, default=4, help="Usuarios simultáneos (modo cerrado)")
+    parser.add_argument("--pausa", type=float, default=0.0, help="Espera entre peticiones de un usuario (modo cerrado)")
+    parser.add_argument("--tasa", type=float, default=2.0, help="Peticiones por segundo (modo abierto)")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--rutas", default=None, help="Rutas a probar separadas por comas (por defecto, todas)")
+    parser.add_argument("--dataset", default="iris")
+    parser.add_argument("--modelo", default="RandomForest")
+    parser.add_argument("--mapa", default=None, help="Fichero de templates/html_files para /view_html_file")
+    parser.add_argument("--salida", default=None, help="Guardar el resultado en este JSON")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"), help="Comparar dos resultados JSON")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Cambio que se considera regresión (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0]) as f_base, open(args.comparar[1]) as f_nuevo:
+            regresiones = comparar(json.load(f_base), json.load(f_nuevo), args.umbral)
+        print(f"\n{len(regresiones)} regresiones por encima del {args.umbral:.0%}")
+        sys.exit(1 if regresiones else 0)
+
+    rutas = escenarios(args.dataset, args.modelo, args.mapa)
+    if args.rutas:
+        desconocidas = set(args.rutas.split(",")) - set(rutas)
+        if desconocidas:
+            parser.error(f"Rutas desconocidas: {', '.join(sorted(desconocidas))} (disponibles: {', '.join(rutas)})")
+        rutas = {nombre: rutas[nombre] for nombre in args.rutas.split(",")}
+
+    url, servidor = servidor_local() if args.local else (args.url.rstrip("/"), None)
+    print(f"[INFO] Carga {args.modo} contra {url} durante {args.duracion:.0f} s: {', '.join(rutas)}")
+    inicio = time.perf_counter()
+    if args.modo == "cerrado":
+        muestras = carga_cerrada(url, rutas, args.usuarios, args.duracion, args.pausa)
+    else:
+        muestras = carga_abierta(url, rutas, args.tasa, args.duracion)
+    duracion = time.perf_counter() - inicio
+    if servidor is not None:
+        servidor.shutdown()
+
+    parametros = {clave: valor for clave, valor in vars(args).items() if clave not in ("comparar", "salida")}
+    resultado = resumir(muestras, duracion, {**parametros, 'url': url})
+    print(f"{'Ruta':<20} {'Peticiones':>10} {'Errores':>8} {'Pet/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for ruta, datos in [*resultado['rutas'].items(), ('TOTAL', resultado['total'])]:
+        latencia = datos['latencia_ms']
+        print(f"{ruta:<20} {datos['peticiones']:>10} {datos['errores']:>8} {datos['rendimiento_rps']:>8.2f} "
+              + " ".join(f"{latencia[p]:>9.1f}" if latencia[p] is not None else f"{'-':>9}"
+                         for p in ('p50', 'p95', 'p99')))
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultado, f, indent=2)
+        print(f"[OK] Resultado guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
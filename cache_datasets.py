@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: cache_datasets.py
+# DESCRIPCIÓN: Caché de datasets compartida por todos los procesos de la
+#              máquina. Cada dataset del registro DATASETS de src/model.py se
+#              carga una sola vez, se convierte a arrays numpy contiguos (X, y)
+#              y se guarda como .npy en memoria compartida (/dev/shm si existe).
+#              Las tablas (DataFrame) se guardan columna a columna, cada una con
+#              su tipo, y se reconstruyen con sus nombres al abrirlas. Cada
+#              proceso abre los .npy con mmap de solo lectura, de modo que todos
+#              los workers comparten las mismas páginas físicas en lugar de
+#              cargar y copiar el dataset en cada petición. El tamaño total está
+#              acotado y se desalojan los datasets usados hace más tiempo (LRU).
+# USO: Los cambios de src/model.py para usarlo están en src_model_modifications.py
+#      python cache_datasets.py [iris wine ...] [--limpiar]
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import argparse
+import fnmatch
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# Directorio compartido: tmpfs (memoria) si existe, si no el directorio temporal
+DIRECTORIO_DATASETS = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                                   "gowalla_datasets")
+TAM_MAXIMO = 1024 * 1024 * 1024
+
+# =============================================================================
+# FUNCIONES: conversión a arrays que se pueden abrir con mmap
+# =============================================================================
+def _array(valores) -> np.ndarray:
+    """
+    Array contiguo de un array o columna sin tipo mixto. Los objetos se pasan
+    a número si todos lo son y si no a cadenas de longitud fija (mmap no
+    admite objetos de Python).
+    """
+    array = np.asarray(valores)
+    if array.dtype == object:
+        try:
+            array = array.astype(np.float64)
+        except (TypeError, ValueError):
+            array = array.astype(str)
+    return np.ascontiguousarray(array)
+
+
+def _columna(serie) -> np.ndarray:
+    """Array de una columna de un DataFrame con su propio tipo (numérica, bool, fecha o texto)."""
+    import pandas as pd
+
+    valores = serie.to_numpy()
+    if valores.dtype == object:
+        if pd.api.types.is_numeric_dtype(serie.dtype):  # enteros con nulos (Int64...): float con NaN
+            valores = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            valores = serie.astype(str).to_numpy(dtype=str)
+    return np.ascontiguousarray(valores)
+
+
+def convertir_dataset(cargado) -> tuple:
+    """
+    Convierte lo que devuelve un cargador del registro en (X, y, meta).
+    Admite objetos con 'data' y 'target' (Bunch de scikit-learn), tuplas
+    (X, y) y tablas o arrays sueltos (y = None).
+
+    Si X es un DataFrame se devuelve una lista con un array por columna (cada
+    una con su tipo: una columna de texto no convierte en texto a las
+    numéricas) y la meta guarda sus nombres y tipos para reconstruirlo.
+    Igual con y si es una Series.
+    """
+    meta = {}
+    if hasattr(cargado, 'data') and hasattr(cargado, 'target'):
+        X, y = cargado.data, cargado.target
+        for campo in ('feature_names', 'target_names'):
+            if getattr(cargado, campo, None) is not None:
+                meta[campo] = [str(v) for v in getattr(cargado, campo)]
+    elif isinstance(cargado, tuple) and len(cargado) == 2:
+        X, y = cargado
+    else:
+        X, y = cargado, None
+
+    if hasattr(X, 'columns'):
+        meta['feature_names'] = [str(c) for c in X.columns]
+        meta['feature_dtypes'] = [str(t) for t in X.dtypes]
+        X = [_columna(X[c]) for c in X.columns]
+    else:
+        X = _array(X)
+    if y is not None and hasattr(y, 'name') and hasattr(y, 'dtype'):
+        meta['target_name'] = None if y.name is None else str(y.name)
+        meta['target_dtype'] = str(y.dtype)
+        y = _columna(y)
+    elif y is not None:
+        y = _array(y)
+    return X, y, meta
+
+
+def _reconstruir(X, y, meta: dict) -> tuple:
+    """Vuelve a montar el DataFrame (y la Series) de un dataset guardado por columnas."""
+    import pandas as pd
+
+    if isinstance(X, list):
+        X = pd.DataFrame(dict(zip(meta['feature_names'], X)), copy=False)
+        for nombre, tipo in zip(meta['feature_names'], meta['feature_dtypes']):
+            if tipo == 'category':
+                X[nombre] = X[nombre].astype('category')
+    if y is not None and 'target_dtype' in meta:
+        y = pd.Series(y, name=meta['target_name'], copy=False)
+        if meta['target_dtype'] == 'category':
+            y = y.astype('category')
+    return X, y
+
+# =============================================================================
+# CLASE: CacheDatasets
+# =============================================================================
+class CacheDatasets:
+    """
+    Datasets en memoria compartida por nombre. Los ficheros del directorio son
+    comunes a todos los procesos; cada proceso guarda además los arrays que ya
+    tiene abiertos. La fecha de último acceso de cada meta marca su último uso
+    para el desalojo (como en cache_mapas.py).
+
+    Parámetros:
+    -----------
+    registro : dict, opcional
+        Nombre -> cargador (función sin argumentos) o datos ya cargados
+        (por defecto, DATASETS de src/model.py)
+    directorio : str, opcional
+        Directorio compartido de los .npy
+    tam_maximo : int, opcional
+        Bytes máximos que pueden ocupar los datasets del directorio
+    """
+
+    def __init__(self, registro: dict = None, directorio: str = DIRECTORIO_DATASETS,
+                 tam_maximo: int = TAM_MAXIMO):
+        self._registro = registro
+        self.directorio = directorio
+        self.tam_maximo = tam_maximo
+        self._abiertos = {}
+        self._cerrojo = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    @property
+    def registro(self) -> dict:
+        # El registro de src/model.py se importa al usarlo por primera vez
+        if self._registro is None:
+            from src.model import DATASETS
+            self._registro = DATASETS
+        return self._registro
+
+    def _ruta(self, nombre: str, parte: str) -> str:
+        return os.path.join(self.directorio, f"{nombre}.{parte}")
+
+    def _partes(self, nombre: str) -> list:
+        """Ficheros .npy de un dataset (X.npy o X<i>.npy por columna, y.npy) presentes en el directorio."""
+        return [fichero for fichero in os.listdir(self.directorio)
+                if fnmatch.fnmatch(fichero, f"{nombre}.X*.npy") or fichero == f"{nombre}.y.npy"]
+
+    def _guardar(self, nombre: str):
+        """Carga el dataset del registro y lo escribe en el directorio compartido."""
+        cargador = self.registro[nombre]
+        X, y, meta = convertir_dataset(cargador() if callable(cargador) else cargador)
+        columnas = X if isinstance(X, list) else None
+        meta.update(nombre=nombre, con_y=y is not None, columnas=None if columnas is None else len(columnas),
+                    bytes=sum(c.nbytes for c in (columnas or [X])) + (0 if y is None else y.nbytes))
+
+        # Se escribe a temporales y se renombra: otro proceso nunca ve un .npy a medias
+        partes = [("X.npy", X)] if columnas is None else [(f"X{i}.npy", c) for i, c in enumerate(columnas)]
+        for parte, array in (*partes, ("y.npy", y)):
+            if array is not None:
+                temporal = self._ruta(nombre, parte) + f".{os.getpid()}.tmp"
+                with open(temporal, "wb") as f:
+                    np.save(f, array)
+                os.replace(temporal, self._ruta(nombre, parte))
+        # La meta se escribe la última: sin ella el dataset se considera incompleto
+        temporal = self._ruta(nombre, "json") + f".{os.getpid()}.tmp"
+        with open(temporal, "w") as f:
+            json.dump(meta, f)
+        os.replace(temporal, self._ruta(nombre, "json"))
+
+    def obtener(self, nombre: str) -> tuple:
+        """
+        (X, y) del dataset como arrays de solo lectura sobre memoria
+        compartida, o como DataFrame (y Series) con sus nombres y tipos si
+        así lo devolvía el cargador: sus columnas numéricas pueden copiarse
+        al montar la tabla. La primera vez en la máquina se carga del
+        registro; después solo se abre con mmap. Lanza KeyError si no está
+        registrado.
+        """
+        with self._cerrojo:
+            ruta_meta = self._ruta(nombre, "json")
+            if nombre in self._abiertos and os.path.exists(ruta_meta):
+                os.utime(ruta_meta, ns=(time.time_ns(), os.stat(ruta_meta).st_mtime_ns))
+                return self._abiertos[nombre]
+            if nombre not in self.registro:
+                raise KeyError(f"Dataset no registrado: {nombre}")
+
+            if not os.path.exists(ruta_meta):
+                self._guardar(nombre)
+                self.desalojar(conservar=nombre)
+            with open(ruta_meta) as f:
+                meta = json.load(f)
+            if meta.get('columnas') is None:
+                X = np.load(self._ruta(nombre, "X.npy"), mmap_mode='r')
+            else:
+                X = [np.load(self._ruta(nombre, f"X{i}.npy"), mmap_mode='r') for i in range(meta['columnas'])]
+            y = np.load(self._ruta(nombre, "y.npy"), mmap_mode='r') if meta['con_y'] else None
+            X, y = _reconstruir(X, y, meta)
+            os.utime(ruta_meta, ns=(time.time_ns(), os.stat(ruta_meta).st_mtime_ns))
+            self._abiertos[nombre] = (X, y)
+            return X, y
+
+    def meta(self, nombre: str) -> dict:
+        """Nombres de columnas y clases, bytes, etc. del dataset (lo carga si hace falta)."""
+        self.obtener(nombre)
+        with open(self._ruta(nombre, "json")) as f:
+            return json.load(f)
+
+    def entradas(self) -> list:
+        """(último uso, bytes, nombre) de cada dataset compartido, del más antiguo al más reciente."""
+        entradas = []
+        for fichero in os.listdir(self.directorio):
+            if fichero.endswith(".json"):
+                nombre = fichero[:-len(".json")]
+                # Sin leer la meta: leerla cambiaría su fecha de último acceso
+                try:
+                    ultimo_uso = os.stat(os.path.join(self.directorio, fichero)).st_atime
+                except OSError:
+                    continue
+                tamano = sum(os.path.getsize(os.path.join(self.directorio, parte))
+                             for parte in self._partes(nombre))
+                entradas.append((ultimo_uso, tamano, nombre))
+        return sorted(entradas)
+
+    def _borrar(self, nombre: str):
+        # Los procesos que ya lo tienen abierto siguen leyendo sus páginas hasta cerrarlo
+        self._abiertos.pop(nombre, None)
+        for fichero in [f"{nombre}.json", *self._partes(nombre)]:
+            try:
+                os.remove(os.path.join(self.directorio, fichero))
+            except FileNotFoundError:
+                pass
+
+    def desalojar(self, conservar: str = None):
+        """Borra los datasets usados hace más tiempo hasta quedar por debajo de tam_maximo."""
+        entradas = self.entradas()
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, nombre in entradas:
+            if total <= self.tam_maximo:
+                break
+            if nombre != conservar:
+                self._borrar(nombre)
+                total -= tamano
+
+    def limpiar(self):
+        with self._cerrojo:
+            for _, _, nombre in self.entradas():
+                self._borrar(nombre)
+
+    def resumen(self) -> dict:
+        """Memoria usada por los datasets compartidos y los abiertos en este proceso."""
+        entradas = self.entradas()
+        return {
+            'datasets': {nombre: tamano for _, tamano, nombre in entradas},
+            'bytes': sum(tamano for _, tamano, _ in entradas),
+            'max_bytes': self.tam_maximo,
+            'open_in_process': sorted(self._abiertos),
+        }
+
+# =============================================================================
+# INSTANCIA COMPARTIDA
+# =============================================================================
+_cache = None
+
+
+def cache_datasets() -> CacheDatasets:
+    """Caché de datasets del proceso (una por proceso, ficheros comunes a todos)."""
+    global _cache
+    if _cache is None:
+        _cache = CacheDatasets()
+    return _cache
+
+
+def obtener_dataset(nombre: str) -> tuple:
+    """(X, y) de un dataset del registro, compartidos entre procesos."""
+    return cache_datasets().obtener(nombre)
+
+# =============================================================================
+# PUNTO DE ENTRADA: precargar datasets o vaciar la caché
+# =============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Precarga de datasets en memoria compartida.")
+    parser.add_argument("datasets", nargs="*", help="Datasets a precargar (por defecto, todos los registrados)")
+    parser.add_argument("--limpiar", action="store_true", help="Borrar los datasets compartidos")
+    args = parser.parse_args()
+
+    cache = cache_datasets()
+    if args.limpiar:
+        cache.limpiar()
+    else:
+        for nombre in args.datasets or list(cache.registro):
+            X, y = cache.obtener(nombre)
+            tipos = ("columnas " + ", ".join(sorted({str(t) for t in X.dtypes}))) if hasattr(X, 'columns') else X.dtype
+            print(f"[OK] {nombre}: X {X.shape} {tipos}" + ("" if y is None else f", y {y.shape} {y.dtype}"))
+    resumen = cache.resumen()
+    print(f"Datasets compartidos en {cache.directorio}: {len(resumen['datasets'])}, "
+          f"{resumen['bytes'] / 1024 / 1024:.1f} MB de {cache.tam_maximo / 1024 / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
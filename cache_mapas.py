@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: cache_mapas.py
+# DESCRIPCIÓN: Caché direccionada por contenido de los mapas HTML generados.
+#              La clave es un hash de los datos que se pintan, la ciudad, el
+#              usuario y las opciones de dibujo; si ya existe un mapa con esa
+#              clave se enlaza (o copia) en lugar de volver a generarlo. El
+#              tamaño total está acotado y se desalojan los mapas usados hace
+#              más tiempo (LRU).
+# USO: Lo importan generate_maps.py y generate_individual_maps.py
+#      python cache_mapas.py [--limpiar]   (muestra el estado o vacía la caché)
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from compresion_estatica import escribir_comprimidos
+
+# Directorio de la caché y tamaño máximo que puede ocupar
+DIRECTORIO_CACHE = ".cache_mapas"
+TAM_MAXIMO = 512 * 1024 * 1024
+
+EXTENSION_MAPA = ".html"
+
+# =============================================================================
+# FUNCIONES DE HUELLA
+# =============================================================================
+def huella_fichero(ruta: str) -> str:
+    """
+    Hash del contenido de un fichero de check-ins o de un almacén columnar
+    (todos sus ficheros .npy, sin los índices, que no cambian los datos).
+    """
+    if os.path.isdir(ruta):
+        from almacen_checkins import COLUMNAS
+        ficheros = [os.path.join(ruta, nombre + ".npy") for nombre in (*COLUMNAS, "ids_localizacion")]
+    else:
+        ficheros = [ruta]
+
+    h = hashlib.sha256()
+    for fichero in ficheros:
+        with open(fichero, "rb") as f:
+            for trozo in iter(lambda: f.read(1 << 20), b""):
+                h.update(trozo)
+    return h.hexdigest()
+
+
+def huella_dataframe(datos) -> str:
+    """Hash de las filas de un DataFrame (por ejemplo, los check-ins de un usuario)."""
+    import pandas as pd
+    return hashlib.sha256(pd.util.hash_pandas_object(datos, index=False).values.tobytes()).hexdigest()
+
+
+def clave_mapa(**partes) -> str:
+    """Clave de un mapa: hash de todas las partes (datos, ciudad, usuario, opciones...)."""
+    import folium
+    partes['folium'] = folium.__version__
+    return hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()
+
+# =============================================================================
+# CLASE: CacheMapas
+# =============================================================================
+class CacheMapas:
+    """
+    Almacén de mapas HTML indexado por clave. La fecha de último acceso de
+    cada fichero marca su último uso, de modo que el desalojo LRU no necesita
+    ningún índice aparte (la de modificación no se toca: los mapas enlazados
+    conservan su ETag y sus versiones comprimidas).
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_CACHE, tam_maximo: int = TAM_MAXIMO):
+        self.directorio = directorio
+        self.tam_maximo = tam_maximo
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave + EXTENSION_MAPA)
+
+    def obtener(self, clave: str, destino: str) -> bool:
+        """
+        Si el mapa está en la caché lo deja en 'destino' (enlace duro o copia),
+        lo marca como usado y devuelve True.
+        """
+        ruta = self._ruta(clave)
+        if not os.path.exists(ruta):
+            return False
+        info = os.stat(ruta)
+        os.utime(ruta, ns=(time.time_ns(), info.st_mtime_ns))
+        if os.path.exists(destino):
+            if os.path.samefile(ruta, destino):
+                return True
+            os.remove(destino)
+        try:
+            os.link(ruta, destino)
+        except OSError:
+            shutil.copyfile(ruta, destino)
+        return True
+
+    def guardar(self, clave: str, origen: str):
+        """Guarda en la caché un mapa recién generado y desaloja si se supera el tamaño."""
+        temporal = self._ruta(clave) + ".tmp"
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        try:
+            os.link(origen, temporal)
+        except OSError:
+            shutil.copy2(origen, temporal)
+        os.replace(temporal, self._ruta(clave))
+        self.desalojar()
+
+    def entradas(self) -> list:
+        """(última vez usado, tamaño, ruta) de cada mapa, del más antiguo al más reciente."""
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith(EXTENSION_MAPA):
+                info = os.stat(os.path.join(self.directorio, nombre))
+                entradas.append((info.st_atime, info.st_size, os.path.join(self.directorio, nombre)))
+        return sorted(entradas)
+
+    def desalojar(self):
+        """Borra los mapas usados hace más tiempo hasta quedar por debajo de tam_maximo."""
+        entradas = self.entradas()
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, ruta in entradas:
+            if total <= self.tam_maximo:
+                break
+            os.remove(ruta)
+            total -= tamano
+
+    def limpiar(self):
+        for _, _, ruta in self.entradas():
+            os.remove(ruta)
+
+# =============================================================================
+# FUNCIÓN: generar_con_cache
+# =============================================================================
+def generar_con_cache(clave: str, destino: str, generar, cache: CacheMapas = None, forzar: bool = False) -> bool:
+    """
+    Deja en 'destino' el mapa de 'clave': desde la caché si existe (y no se
+    fuerza) o llamando a generar(destino) y guardándolo después. En ambos
+    casos deja también sus versiones precomprimidas (compresion_estatica.py).
+    Devuelve True si el mapa venía de la caché.
+    """
+    cache = cache or CacheMapas()
+    if not forzar and cache.obtener(clave, destino):
+        escribir_comprimidos(destino)
+        return True
+    # Un enlace anterior a la caché no debe sobrescribirse en el sitio
+    if os.path.exists(destino):
+        os.remove(destino)
+    generar(destino)
+    if os.path.exists(destino):
+        cache.guardar(clave, destino)
+        escribir_comprimidos(destino)
+    return False
+
+# =============================================================================
+# PUNTO DE ENTRADA
+# =============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Estado y limpieza de la caché de mapas HTML.")
+    parser.add_argument("--directorio", default=DIRECTORIO_CACHE, help="Directorio de la caché")
+    parser.add_argument("--limpiar", action="store_true", help="Borrar todos los mapas de la caché")
+    args = parser.parse_args()
+
+    cache = CacheMapas(args.directorio)
+    if args.limpiar:
+        cache.limpiar()
+    entradas = cache.entradas()
+    total = sum(tamano for _, tamano, _ in entradas)
+    print(f"Caché de mapas {args.directorio}: {len(entradas)} mapas, "
+          f"{total / 1024 / 1024:.1f} MB de {cache.tam_maximo / 1024 / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
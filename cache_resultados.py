@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: cache_resultados.py
+# DESCRIPCIÓN: Caché en memoria (LRU y acotada) de los resultados de
+#              entrenamiento del servicio Flask. La clave es el conjunto
+#              completo de parámetros (dataset, modelo, tamaños de train/test,
+#              semilla e hiperparámetros del modelo) y el valor es la precisión,
+#              el error y la imagen PNG generada. Una entrada solo es válida
+#              mientras su PNG siga existiendo sin cambios, de modo que
+#              /clean_images (o un entrenamiento que sobrescriba la imagen) la
+#              invalida. Cada clave tiene su propio PNG, que se borra al
+#              desalojar la entrada.
+# USO: Lo importa app.py (POST /train)
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Resultados que se conservan como máximo
+RESULTADOS_MAXIMOS = 256
+
+# =============================================================================
+# FUNCIONES AUXILIARES
+# =============================================================================
+def hiperparametros_modelo(modelo) -> dict:
+    """Hiperparámetros de un modelo (get_params de scikit-learn o, si no, su repr)."""
+    if hasattr(modelo, 'get_params'):
+        return modelo.get_params()
+    return {'repr': repr(modelo)}
+
+
+def clave_resultado(dataset: str, modelo: str, train_size: float, test_size: float,
+                    semilla=None, hiperparametros: dict = None) -> str:
+    """
+    Clave de un entrenamiento: hash de todos los parámetros que cambian el
+    resultado. Los tamaños se normalizan a float ('0.1' y '0.10' son iguales).
+    """
+    partes = {
+        'dataset': dataset,
+        'modelo': modelo,
+        'train_size': float(train_size),
+        'test_size': float(test_size),
+        'semilla': semilla,
+        'hiperparametros': hiperparametros or {},
+    }
+    return hashlib.sha256(json.dumps(partes, sort_keys=True, default=repr).encode()).hexdigest()
+
+# =============================================================================
+# CLASE: CacheResultados
+# =============================================================================
+class CacheResultados:
+    """
+    Resultados de entrenamiento por clave, con desalojo del usado hace más
+    tiempo al superar 'maximo' entradas. Es segura entre hilos.
+
+    Parámetros:
+    -----------
+    maximo : int, opcional
+        Entradas que se conservan como máximo
+    borrar_desalojadas : bool, opcional
+        Borrar el PNG de cada entrada desalojada (cuando cada clave tiene el suyo)
+    """
+
+    def __init__(self, maximo: int = RESULTADOS_MAXIMOS, borrar_desalojadas: bool = False):
+        self.maximo = maximo
+        self.borrar_desalojadas = borrar_desalojadas
+        self._entradas = OrderedDict()
+        self._cerrojo = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave: str) -> dict:
+        """
+        Resultado guardado para 'clave' ({'accuracy', 'error', 'imagen'}) o
+        None si no existe o su imagen ya no es la que se generó.
+        """
+        with self._cerrojo:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                try:
+                    vigente = os.stat(entrada['imagen']).st_mtime_ns == entrada['mtime']
+                except OSError:
+                    vigente = False
+                if vigente:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return dict(entrada)
+                del self._entradas[clave]
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave: str, accuracy: float, error: float, imagen: str):
+        """Guarda un resultado recién calculado junto con la fecha de su imagen."""
+        try:
+            mtime = os.stat(imagen).st_mtime_ns
+        except OSError:
+            return  # sin imagen no se puede servir el resultado completo
+        desalojadas = []
+        with self._cerrojo:
+            self._entradas[clave] = {'accuracy': accuracy, 'error': error, 'imagen': imagen, 'mtime': mtime}
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                desalojadas.append(self._entradas.popitem(last=False)[1]['imagen'])
+        if self.borrar_desalojadas:
+            for ruta in desalojadas:
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+
+    def limpiar(self):
+        with self._cerrojo:
+            self._entradas.clear()
+
+    def resumen(self) -> dict:
+        with self._cerrojo:
+            return {'entries': len(self._entradas), 'max_entries': self.maximo,
+                    'hits': self.aciertos, 'misses': self.fallos}
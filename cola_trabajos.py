@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: cola_trabajos.py
+# DESCRIPCIÓN: Cola acotada de trabajos en segundo plano para el servicio Flask.
+#              Cada trabajo se ejecuta en un pool de procesos (el entrenamiento
+#              y las figuras de matplotlib no son seguros entre hilos), recibe
+#              un id y se consulta su estado (queued/running/done/failed). Si la
+#              cola está llena se rechazan trabajos nuevos (contrapresión) en
+#              lugar de acumular peticiones sin límite. Si un proceso del pool
+#              muere (OOM, señal) el pool roto se descarta y se crea otro.
+# USO: Lo importa app.py (POST /train con async=1 y GET /train/status/<id>)
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Trabajos terminados que se conservan para poder consultar su resultado
+RETENCION = 1000
+
+# =============================================================================
+# EXCEPCIÓN: ColaLlena
+# =============================================================================
+class ColaLlena(Exception):
+    """No caben más trabajos pendientes: el cliente debe reintentar más tarde."""
+
+# =============================================================================
+# CLASE: ColaTrabajos
+# =============================================================================
+class ColaTrabajos:
+    """
+    Cola de trabajos con un número fijo de procesos y como mucho 'capacidad'
+    trabajos pendientes (en espera o en ejecución).
+
+    Parámetros:
+    -----------
+    trabajadores : int, opcional
+        Procesos del pool (por defecto, número de CPUs)
+    capacidad : int, opcional
+        Trabajos pendientes admitidos antes de rechazar (por defecto, 4 por proceso)
+    """
+
+    def __init__(self, trabajadores: int = None, capacidad: int = None):
+        self.trabajadores = trabajadores or os.cpu_count() or 1
+        self.capacidad = capacidad or 4 * self.trabajadores
+        self._pool = None
+        self._trabajos = OrderedDict()
+        self._pendientes = 0
+        self._cerrojo = threading.Lock()
+
+    def _pool_procesos(self) -> ProcessPoolExecutor:
+        # El pool se crea con el primer trabajo, no al importar la aplicación
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.trabajadores)
+        return self._pool
+
+    def _descartar_pool(self, pool: ProcessPoolExecutor):
+        """
+        Descarta 'pool' si sigue siendo el actual (un proceso murió y ya no
+        admite trabajos): el siguiente trabajo crea uno nuevo. Llamar con el
+        cerrojo tomado.
+        """
+        if pool is not None and self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def enviar(self, funcion, *args, datos: dict = None, al_terminar=None) -> str:
+        """
+        Encola funcion(*args) y devuelve el id del trabajo. 'datos' se guarda
+        con el trabajo y se devuelve en su estado. Si se indica,
+        al_terminar(resultado) se llama en este proceso en cuanto el trabajo
+        acaba sin error (aunque nadie consulte su estado). Lanza ColaLlena si
+        ya hay 'capacidad' trabajos pendientes. Si el pool está roto se
+        sustituye por uno nuevo y se reintenta una vez.
+        """
+        with self._cerrojo:
+            if self._pendientes >= self.capacidad:
+                raise ColaLlena(f"Hay {self._pendientes} trabajos pendientes (máximo {self.capacidad})")
+            self._pendientes += 1
+            id_trabajo = uuid.uuid4().hex
+            trabajo = {'datos': datos or {}, 'creado': time.time(), 'terminado': None, 'futuro': None,
+                       'pool': None}
+            self._trabajos[id_trabajo] = trabajo
+            try:
+                try:
+                    trabajo['futuro'] = self._pool_procesos().submit(funcion, *args)
+                except BrokenProcessPool:
+                    self._descartar_pool(self._pool)
+                    trabajo['futuro'] = self._pool_procesos().submit(funcion, *args)
+                trabajo['pool'] = self._pool
+            except Exception:
+                del self._trabajos[id_trabajo]
+                self._pendientes -= 1
+                raise
+            self._olvidar_antiguos()
+        trabajo['futuro'].add_done_callback(lambda futuro: self._terminado(id_trabajo, futuro, al_terminar))
+        return id_trabajo
+
+    def _terminado(self, id_trabajo: str, futuro, al_terminar=None):
+        if not futuro.cancelled() and isinstance(futuro.exception(), BrokenProcessPool):
+            # El trabajo falla, pero los siguientes no deben ir al pool roto
+            with self._cerrojo:
+                self._descartar_pool(self._trabajos.get(id_trabajo, {}).get('pool'))
+        try:
+            if al_terminar is not None and not futuro.cancelled() and futuro.exception() is None:
+                al_terminar(futuro.result())
+        finally:
+            self._marcar_terminado(id_trabajo)
+
+    def _marcar_terminado(self, id_trabajo: str):
+        with self._cerrojo:
+            self._pendientes -= 1
+            if id_trabajo in self._trabajos:
+                self._trabajos[id_trabajo]['terminado'] = time.time()
+
+    def _olvidar_antiguos(self):
+        """Descarta los trabajos terminados más antiguos por encima de RETENCION."""
+        sobran = len(self._trabajos) - RETENCION - self._pendientes
+        for id_trabajo in list(self._trabajos):
+            if sobran <= 0:
+                break
+            if self._trabajos[id_trabajo]['terminado'] is not None:
+                del self._trabajos[id_trabajo]
+                sobran -= 1
+
+    def estado(self, id_trabajo: str) -> dict:
+        """
+        Estado de un trabajo: 'status' (queued, running, done, failed), sus
+        datos, tiempos y el resultado ('result') o la excepción ('exception').
+        Devuelve None si el id no existe (o ya se descartó).
+        """
+        with self._cerrojo:
+            trabajo = self._trabajos.get(id_trabajo)
+        if trabajo is None:
+            return None
+
+        futuro = trabajo['futuro']
+        estado = {'job_id': id_trabajo, **trabajo['datos'], 'created': trabajo['creado'],
+                  'finished': trabajo['terminado']}
+        if futuro.done():
+            excepcion = futuro.exception()
+            if excepcion is None:
+                estado.update(status='done', result=futuro.result())
+            else:
+                estado.update(status='failed', exception=f"{type(excepcion).__name__}: {excepcion}")
+        else:
+            estado['status'] = 'running' if futuro.running() else 'queued'
+        return estado
+
+    def resumen(self) -> dict:
+        """Ocupación de la cola (útil para monitorizar la contrapresión)."""
+        with self._cerrojo:
+            return {'workers': self.trabajadores, 'capacity': self.capacidad, 'pending': self._pendientes}
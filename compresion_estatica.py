@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: compresion_estatica.py
+# DESCRIPCIÓN: Entrega eficiente de ficheros estáticos (mapas HTML y PNGs).
+#              Al generar un mapa se escriben a su lado versiones precomprimidas
+#              (.gz y, si está instalado brotli, .br). Al servirlo se elige la
+#              versión según Accept-Encoding, con ETag fuerte (hash del
+#              contenido), respuestas 304 a If-None-Match / If-Modified-Since y
+#              cabeceras de caché: las URLs versionadas (?v=<etag>, ver
+#              url_versionada) son inmutables y se guardan un año en el
+#              cliente. Las versiones comprimidas son válidas mientras el hash
+#              del original coincida con el guardado al escribirlas (ruta.hash),
+#              así que copiar el fichero sin cambiarlo no las invalida; si el
+#              contenido cambia se regeneran al servirlo.
+# USO: Lo importan app.py, generate_maps.py y generate_individual_maps.py
+#      python compresion_estatica.py templates/html_files/*.html
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se escribe .gz
+    brotli = None
+
+# Tipos que merece la pena comprimir (los PNG ya están comprimidos)
+EXTENSIONES_COMPRIMIBLES = ('.html', '.htm', '.js', '.css', '.json', '.svg', '.txt')
+
+# Codificaciones por orden de preferencia: (Content-Encoding, extensión, función)
+CODIFICACIONES = [('gzip', '.gz', lambda datos: gzip.compress(datos, 9, mtime=0))]
+if brotli is not None:
+    CODIFICACIONES.insert(0, ('br', '.br', lambda datos: brotli.compress(datos, quality=11)))
+
+# Cache-Control de las URLs versionadas y de las que hay que revalidar
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_REVALIDAR = 'no-cache'
+
+# Hash de cada fichero servido, por (ruta, tamaño, mtime): no se relee si no
+# cambia. Se conservan los HASHES_MAXIMOS usados más recientemente
+HASHES_MAXIMOS = 4096
+_hashes = OrderedDict()
+_cerrojo_hashes = threading.Lock()
+
+# Fichero junto al original con el hash del contenido que se comprimió
+EXTENSION_HASH = '.hash'
+
+# =============================================================================
+# FUNCIONES AUXILIARES
+# =============================================================================
+def hash_contenido(ruta: str) -> str:
+    """sha256 del contenido de un fichero, memorizado (LRU) mientras no cambie."""
+    info = os.stat(ruta)
+    clave = (ruta, info.st_size, info.st_mtime_ns)
+    with _cerrojo_hashes:
+        if clave in _hashes:
+            _hashes.move_to_end(clave)
+            return _hashes[clave]
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for trozo in iter(lambda: f.read(1 << 20), b""):
+            h.update(trozo)
+    with _cerrojo_hashes:
+        _hashes[clave] = h.hexdigest()
+        while len(_hashes) > HASHES_MAXIMOS:
+            _hashes.popitem(last=False)
+    return h.hexdigest()
+
+
+def _comprimidos_vigentes(ruta: str) -> bool:
+    """
+    Las versiones comprimidas de 'ruta' son válidas si el hash guardado al
+    escribirlas es el del contenido actual (no basta la fecha: un cp la cambia).
+    """
+    try:
+        with open(ruta + EXTENSION_HASH) as f:
+            return f.read().strip() == hash_contenido(ruta)
+    except OSError:
+        return False
+
+
+def url_versionada(directorio: str, nombre: str, prefijo: str) -> str:
+    """
+    URL de un fichero con su versión (?v=<hash>): servir_fichero la marca
+    como inmutable, y cambia en cuanto cambia el contenido.
+    """
+    return f"{prefijo}{nombre}?v={hash_contenido(os.path.join(directorio, nombre))[:32]}"
+
+# =============================================================================
+# FUNCIÓN: escribir_comprimidos
+# =============================================================================
+def escribir_comprimidos(ruta: str) -> list:
+    """
+    Escribe junto a 'ruta' sus versiones comprimidas (ruta.gz, ruta.br) si
+    faltan o están desactualizadas. El hash del contenido comprimido se
+    guarda el último en ruta.hash: sin él (o si no coincide) no se sirven.
+    Devuelve las rutas escritas.
+    """
+    if not ruta.lower().endswith(EXTENSIONES_COMPRIMIBLES):
+        return []
+    pendientes = [(ext, comprimir) for _, ext, comprimir in CODIFICACIONES
+                  if not os.path.exists(ruta + ext)]
+    if not pendientes and _comprimidos_vigentes(ruta):
+        return []
+
+    try:
+        os.remove(ruta + EXTENSION_HASH)
+    except FileNotFoundError:
+        pass
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    escritas = []
+    for _, ext, comprimir in CODIFICACIONES:
+        temporal = f"{ruta}{ext}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as f:
+            f.write(comprimir(datos))
+        os.replace(temporal, ruta + ext)
+        escritas.append(ruta + ext)
+    temporal = f"{ruta}{EXTENSION_HASH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, "w") as f:
+        f.write(hashlib.sha256(datos).hexdigest())
+    os.replace(temporal, ruta + EXTENSION_HASH)
+    return escritas
+
+# =============================================================================
+# FUNCIÓN: servir_fichero
+# =============================================================================
+def servir_fichero(directorio: str, nombre: str):
+    """
+    Respuesta Flask para el fichero 'nombre' de 'directorio' (dentro de una
+    petición): versión precomprimida según Accept-Encoding, ETag fuerte por
+    contenido y codificación, 304 si el cliente ya la tiene y Cache-Control
+    inmutable cuando la URL lleva ?v=<etag> vigente. Si el original cambió
+    desde que se comprimió, sus versiones comprimidas se regeneran aquí.
+    """
+    from flask import abort, make_response, request, send_file
+    from werkzeug.security import safe_join
+
+    ruta = safe_join(directorio, nombre)
+    if ruta is None or not os.path.isfile(ruta):
+        abort(404)
+    info = os.stat(ruta)
+    version = hash_contenido(ruta)[:32]
+
+    vigentes = _comprimidos_vigentes(ruta)
+    if not vigentes and ruta.lower().endswith(EXTENSIONES_COMPRIMIBLES):
+        try:
+            escribir_comprimidos(ruta)
+            vigentes = _comprimidos_vigentes(ruta)
+        except OSError:
+            pass  # directorio de solo lectura: se sirve sin comprimir
+    codificacion, fichero = None, ruta
+    for nombre_codificacion, ext, _ in CODIFICACIONES:
+        if vigentes and request.accept_encodings[nombre_codificacion] and os.path.exists(ruta + ext):
+            codificacion, fichero = nombre_codificacion, ruta + ext
+            break
+    etag = version + ('-' + codificacion if codificacion else '')
+
+    if request.if_none_match:
+        no_modificado = request.if_none_match.contains_weak(etag)
+    else:
+        no_modificado = (request.if_modified_since is not None
+                         and int(info.st_mtime) <= request.if_modified_since.timestamp())
+
+    if no_modificado:
+        respuesta = make_response('', 304)
+    else:
+        # El nombre que ve el cliente es el del original (mapa.html), no el de la versión comprimida
+        respuesta = send_file(fichero, mimetype=mimetypes.guess_type(ruta)[0] or 'application/octet-stream',
+                              download_name=os.path.basename(ruta), conditional=False, etag=False,
+                              last_modified=info.st_mtime, max_age=None)
+        if codificacion:
+            respuesta.headers['Content-Encoding'] = codificacion
+
+    respuesta.set_etag(etag)
+    respuesta.last_modified = info.st_mtime
+    respuesta.headers['Vary'] = 'Accept-Encoding'
+    respuesta.headers['Cache-Control'] = CACHE_INMUTABLE if request.args.get('v') == version else CACHE_REVALIDAR
+    return respuesta
+
+# =============================================================================
+# PUNTO DE ENTRADA: precomprimir ficheros ya generados
+# =============================================================================
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python compresion_estatica.py <fichero.html> [...]")
+        sys.exit(1)
+
+    for ruta in sys.argv[1:]:
+        for escrita in escribir_comprimidos(ruta):
+            print(f"[OK] {escrita}: {os.path.getsize(escrita)} bytes (original {os.path.getsize(ruta)})")
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: escaner_bytes.py
+# DESCRIPCIÓN: Escáner rápido de ficheros Gowalla que trabaja directamente sobre
+#              los bytes (mmap + numpy). No decodifica UTF-8 ni crea un objeto
+#              str por campo: los separadores, los enteros y las fechas se
+#              extraen con operaciones vectorizadas sobre bloques grandes.
+# USO: Lo importan estadísticas.py (--rapido) y estadisticas_ciudades.py
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import mmap
+import os
+
+import numpy as np
+
+# Tamaño de cada bloque leído del mmap (64 MB)
+TAM_BLOQUE = 64 * 1024 * 1024
+
+# Granularidades admitidas para el histograma temporal
+GRANULARIDADES = ('mes', 'dia', 'hora')
+
+SALTO_LINEA = ord('\n')
+RETORNO_CARRO = ord('\r')
+TABULADOR = ord('\t')
+CERO = ord('0')
+
+# =============================================================================
+# FUNCIÓN: _parsear_enteros
+# =============================================================================
+def _parsear_enteros(datos: np.ndarray, inicio: np.ndarray, fin: np.ndarray):
+    """
+    Convierte a enteros los campos datos[inicio[i]:fin[i]] de todas las líneas
+    a la vez. Se itera sobre la posición del dígito (como mucho unas pocas
+    decenas de pasos), nunca sobre las líneas.
+
+    Retorna:
+    --------
+    (valores, validos): int64 por campo y máscara de campos formados solo por dígitos
+    """
+    longitud = fin - inicio
+    valores = np.zeros(len(inicio), dtype=np.int64)
+    validos = (longitud > 0) & (longitud <= 18)
+    ultimo = len(datos) - 1
+    for k in range(int(longitud.max(initial=0))):
+        activos = k < longitud
+        digitos = datos[np.minimum(inicio + k, ultimo)].astype(np.int64) - CERO
+        validos &= ~activos | ((digitos >= 0) & (digitos <= 9))
+        valores = np.where(activos, valores * 10 + digitos, valores)
+    return valores, validos
+
+
+def _dos_digitos(datos: np.ndarray, posicion: np.ndarray) -> np.ndarray:
+    """Número de dos cifras que empieza en cada posición."""
+    return (datos[posicion].astype(np.int64) - CERO) * 10 + (datos[posicion + 1].astype(np.int64) - CERO)
+
+# =============================================================================
+# FUNCIÓN: escanear_buffer
+# =============================================================================
+def escanear_buffer(datos: np.ndarray, granularidad: str = 'mes', campos: int = 5) -> dict:
+    """
+    Analiza un bloque de líneas completas (array uint8) con el formato
+    usuario<TAB>fecha<TAB>latitud<TAB>longitud<TAB>localización (campos=5) o el
+    de los ficheros filtrados usuario<TAB>fecha<TAB>localización (campos=3).
+
+    Retorna:
+    --------
+    dict
+        'filas': número de líneas del bloque (igual que estadísticas.py),
+        'usuarios' / 'localizaciones': ids distintos (arrays int64 ordenados),
+        'usuarios_filas' / 'localizaciones_filas' / 'periodos_filas': valores de
+            cada línea completa,
+        'periodos' / 'conteos': histograma temporal del bloque
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad '{granularidad}' no válida: {GRANULARIDADES}")
+
+    saltos = np.flatnonzero(datos == SALTO_LINEA)
+    fin_lineas = saltos
+    if len(datos) and datos[-1] != SALTO_LINEA:
+        fin_lineas = np.append(saltos, len(datos))
+    inicio_lineas = np.concatenate(([0], fin_lineas[:-1] + 1)) if len(fin_lineas) else fin_lineas
+    filas = len(fin_lineas)
+
+    # Quitar el \r final de los ficheros con saltos de línea de Windows
+    fin_contenido = fin_lineas.copy()
+    if filas:
+        con_retorno = (fin_contenido > inicio_lineas) & (datos[np.maximum(fin_contenido - 1, 0)] == RETORNO_CARRO)
+        fin_contenido[con_retorno] -= 1
+
+    # Tabuladores de cada línea: una línea completa tiene exactamente campos - 1
+    tabs = np.flatnonzero(datos == TABULADOR)
+    linea_de_tab = np.searchsorted(fin_lineas, tabs)
+    tabs_por_linea = np.bincount(linea_de_tab, minlength=filas)[:filas]
+    primer_tab = np.concatenate(([0], np.cumsum(tabs_por_linea)[:-1])) if filas else tabs_por_linea
+
+    completas = np.flatnonzero(tabs_por_linea == campos - 1)
+    t0 = tabs[primer_tab[completas]]
+    t1 = tabs[primer_tab[completas] + 1]
+    t_ultimo = tabs[primer_tab[completas] + campos - 2]
+
+    usuarios, usuarios_ok = _parsear_enteros(datos, inicio_lineas[completas], t0)
+    localizaciones, localizaciones_ok = _parsear_enteros(datos, t_ultimo + 1, fin_contenido[completas])
+
+    # La fecha tiene formato fijo AAAA-MM-DDTHH:MM:SSZ a partir de t0 + 1
+    fecha_ok = (t1 - t0 - 1) >= 13
+    validas = usuarios_ok & localizaciones_ok & fecha_ok
+    usuarios, localizaciones, inicio_fecha = usuarios[validas], localizaciones[validas], t0[validas] + 1
+
+    periodo = (_dos_digitos(datos, inicio_fecha) * 100 + _dos_digitos(datos, inicio_fecha + 2)) * 100 \
+        + _dos_digitos(datos, inicio_fecha + 5)
+    if granularidad in ('dia', 'hora'):
+        periodo = periodo * 100 + _dos_digitos(datos, inicio_fecha + 8)
+    if granularidad == 'hora':
+        periodo = periodo * 100 + _dos_digitos(datos, inicio_fecha + 11)
+    periodos, conteos = np.unique(periodo, return_counts=True)
+
+    return {
+        'filas': filas,
+        'usuarios': np.unique(usuarios),
+        'localizaciones': np.unique(localizaciones),
+        'usuarios_filas': usuarios,
+        'localizaciones_filas': localizaciones,
+        'periodos_filas': periodo,
+        'periodos': periodos,
+        'conteos': conteos,
+    }
+
+# =============================================================================
+# FUNCIÓN: sumar_conteos
+# =============================================================================
+def sumar_conteos(ids_a, conteos_a, ids_b, conteos_b):
+    """Suma dos tablas (ids, conteos) en una sola con los ids ordenados."""
+    ids, inverso = np.unique(np.concatenate((ids_a, ids_b)), return_inverse=True)
+    conteos = np.bincount(inverso, weights=np.concatenate((conteos_a, conteos_b)), minlength=len(ids))
+    return ids, conteos.astype(np.int64)
+
+# =============================================================================
+# FUNCIÓN: formatear_periodo
+# =============================================================================
+def formatear_periodo(periodo: int, granularidad: str = 'mes') -> str:
+    """201007 -> '2010-07', 20100715 -> '2010-07-15', 2010071518 -> '2010-07-15T18'"""
+    texto = str(periodo)
+    if granularidad == 'mes':
+        return f"{texto[:4]}-{texto[4:6]}"
+    if granularidad == 'dia':
+        return f"{texto[:4]}-{texto[4:6]}-{texto[6:8]}"
+    return f"{texto[:4]}-{texto[4:6]}-{texto[6:8]}T{texto[8:10]}"
+
+# =============================================================================
+# FUNCIÓN: detectar_campos
+# =============================================================================
+def detectar_campos(fichero: str) -> int:
+    """Número de campos de la primera línea: 5 (dataset original) o 3 (filtrado)."""
+    with open(fichero, "rb") as f:
+        return f.readline().count(b"\t") + 1
+
+# =============================================================================
+# FUNCIÓN: bloques_mmap
+# =============================================================================
+def bloques_mmap(fichero: str, inicio: int = 0, fin: int = None, tam_bloque: int = TAM_BLOQUE):
+    """
+    Recorre el intervalo [inicio, fin) del fichero en bloques de unos
+    tam_bloque bytes que terminan siempre en un salto de línea. Cada bloque es
+    una vista uint8 sobre el mmap, sin copiar los datos.
+    """
+    if os.path.getsize(fichero) == 0:
+        return
+    with open(fichero, "rb") as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # El mmap no se cierra explícitamente: los bloques entregados son vistas sobre
+    # él y el sistema lo libera cuando deja de haber referencias
+    fin = len(mapa) if fin is None else fin
+    while inicio < fin:
+        corte = min(inicio + tam_bloque, fin)
+        if corte < fin:
+            salto = mapa.rfind(b"\n", inicio, corte)
+            # Una línea más larga que el bloque: se alarga hasta su final
+            corte = salto + 1 if salto >= 0 else (mapa.find(b"\n", corte, fin) + 1 or fin)
+        yield np.frombuffer(mapa, dtype=np.uint8, count=corte - inicio, offset=inicio)
+        inicio = corte
+
+# =============================================================================
+# FUNCIÓN: escanear_fichero
+# =============================================================================
+def escanear_fichero(fichero: str, granularidad: str = 'mes', inicio: int = 0, fin: int = None,
+                     tam_bloque: int = TAM_BLOQUE, campos: int = 5) -> dict:
+    """
+    Escanea un fichero completo (o el intervalo [inicio, fin)) y devuelve las
+    estadísticas acumuladas: filas, ids distintos e histograma {periodo: n}.
+    """
+    filas = 0
+    usuarios = np.empty(0, dtype=np.int64)
+    localizaciones = np.empty(0, dtype=np.int64)
+    histograma = {}
+
+    for bloque in bloques_mmap(fichero, inicio, fin, tam_bloque):
+        parcial = escanear_buffer(bloque, granularidad, campos)
+        filas += parcial['filas']
+        usuarios = np.union1d(usuarios, parcial['usuarios'])
+        localizaciones = np.union1d(localizaciones, parcial['localizaciones'])
+        for periodo, conteo in zip(parcial['periodos'].tolist(), parcial['conteos'].tolist()):
+            histograma[periodo] = histograma.get(periodo, 0) + conteo
+
+    return {
+        'filas': filas,
+        'usuarios': usuarios,
+        'localizaciones': localizaciones,
+        'histograma': {formatear_periodo(p, granularidad): n for p, n in sorted(histograma.items())},
+    }
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: estadisticas_ciudades.py
+# DESCRIPCIÓN: Motor paralelo de estadísticas para varias ciudades. Cada fichero
+#              se divide en bloques alineados a fin de línea que se procesan en
+#              un pool de procesos, leyendo cada byte una única vez. Calcula las
+#              mismas métricas que estadísticas.py por ciudad y un total global.
+# USO: python estadisticas_ciudades.py DatasetsGowalla/*Gowalla.txt [--json salida.json]
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import argparse
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from escaner_bytes import detectar_campos, escanear_fichero
+from sketches import HyperLogLog
+
+# Tamaño de bloque por defecto que procesa cada tarea del pool (32 MB)
+TAM_BLOQUE = 32 * 1024 * 1024
+
+# Meses que estadísticas.py muestra de forma explícita
+MESES_DESTACADOS = ("2010-07", "2010-08")
+
+# Clave del resultado que agrupa todas las ciudades
+TODAS = "TODAS"
+
+# =============================================================================
+# CLASE: EstadisticasParciales
+# =============================================================================
+class EstadisticasParciales:
+    """
+    Acumulador de estadísticas de un bloque, de un fichero o de varios ficheros.
+    Dos acumuladores se combinan con fusionar(), de modo que el resultado no
+    depende de cómo se haya troceado la entrada.
+
+    Con error=None los ids distintos se guardan en conjuntos exactos; con un
+    error relativo se usan sketches HyperLogLog de memoria constante.
+    """
+
+    def __init__(self, error: float = None):
+        self.error = error
+        if error is None:
+            self.usuarios = set()
+            self.localizaciones = set()
+        else:
+            self.usuarios = HyperLogLog(error)
+            self.localizaciones = HyperLogLog(error)
+        self.filas = 0
+        self.meses = Counter()
+
+    def anadir_ids(self, usuarios, localizaciones):
+        """Añade arrays de ids de usuario y de localización."""
+        if self.error is None:
+            self.usuarios.update(usuarios.tolist())
+            self.localizaciones.update(localizaciones.tolist())
+        else:
+            self.usuarios.anadir(usuarios)
+            self.localizaciones.anadir(localizaciones)
+
+    def fusionar(self, otro: "EstadisticasParciales") -> "EstadisticasParciales":
+        """Añade a este acumulador el contenido de otro y lo devuelve."""
+        if self.error is None:
+            self.usuarios |= otro.usuarios
+            self.localizaciones |= otro.localizaciones
+        else:
+            self.usuarios.fusionar(otro.usuarios)
+            self.localizaciones.fusionar(otro.localizaciones)
+        self.filas += otro.filas
+        self.meses.update(otro.meses)
+        return self
+
+    def a_dict(self) -> dict:
+        """Métricas finales en el mismo orden que las imprime estadísticas.py."""
+        resultado = {
+            'usuarios_distintos': len(self.usuarios),
+            'localizaciones_distintas': len(self.localizaciones),
+            'filas_completas': self.filas,
+        }
+        for mes in MESES_DESTACADOS:
+            resultado[f'checkins_{mes}'] = self.meses.get(mes, 0)
+        resultado['checkins_por_mes'] = dict(sorted(self.meses.items()))
+        if self.error is not None:
+            resultado['error_relativo_distintos'] = self.usuarios.error_estandar
+        return resultado
+
+# =============================================================================
+# FUNCIÓN: dividir_en_bloques
+# =============================================================================
+def dividir_en_bloques(fichero: str, tam_bloque: int = TAM_BLOQUE) -> list:
+    """
+    Divide un fichero en intervalos [inicio, fin) de unos tam_bloque bytes
+    cuyos límites caen siempre justo después de un salto de línea.
+    """
+    tamano = os.path.getsize(fichero)
+    bloques = []
+    inicio = 0
+    with open(fichero, "rb") as f:
+        while inicio < tamano:
+            fin = min(inicio + tam_bloque, tamano)
+            if fin < tamano:
+                # Avanzar hasta el final de la línea que queda cortada
+                f.seek(fin)
+                fin += len(f.readline())
+            bloques.append((inicio, fin))
+            inicio = fin
+    return bloques
+
+# =============================================================================
+# FUNCIÓN: procesar_bloque
+# =============================================================================
+def procesar_bloque(fichero: str, inicio: int, fin: int, error: float = None,
+                    campos: int = 5) -> EstadisticasParciales:
+    """
+    Calcula las estadísticas de las líneas contenidas en [inicio, fin) con el
+    escáner de bytes (escaner_bytes.py). 'campos' es el de todo el fichero
+    (5 original, 3 filtrado). Se ejecuta dentro de un proceso del pool.
+    """
+    resultado = escanear_fichero(fichero, 'mes', inicio, fin, campos=campos)
+    parciales = EstadisticasParciales(error)
+    parciales.anadir_ids(resultado['usuarios'], resultado['localizaciones'])
+    parciales.filas = resultado['filas']
+    parciales.meses.update(resultado['histograma'])
+    return parciales
+
+# =============================================================================
+# FUNCIÓN: nombre_ciudad
+# =============================================================================
+def nombre_ciudad(fichero: str) -> str:
+    """DatasetsGowalla/ElPasoGowalla.txt -> ElPaso"""
+    nombre = os.path.splitext(os.path.basename(fichero))[0]
+    return nombre[:-len("Gowalla")] if nombre.endswith("Gowalla") else nombre
+
+# =============================================================================
+# FUNCIÓN: estadisticas_ciudades
+# =============================================================================
+def estadisticas_ciudades(ficheros: list, procesos: int = None, tam_bloque: int = TAM_BLOQUE,
+                          error: float = None, dir_sketches: str = None) -> dict:
+    """
+    Calcula en paralelo las estadísticas de todas las ciudades en una sola
+    pasada por fichero. Los bloques de todos los ficheros se reparten a la vez
+    entre los procesos del pool.
+
+    Con 'error' los ids distintos se estiman con HyperLogLog; si además se
+    indica dir_sketches, se guardan allí los sketches de cada ciudad
+    (<ciudad>_usuarios.hll, <ciudad>_localizaciones.hll) para fusionarlos
+    después con sketches.py sin releer los datos.
+
+    Retorna:
+    --------
+    dict
+        {ciudad: métricas, ..., TODAS: métricas de todas las ciudades juntas}
+    """
+    por_ciudad = {nombre_ciudad(f): EstadisticasParciales(error) for f in ficheros}
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        tareas = []
+        for fichero in ficheros:
+            # Se mira en la primera línea: los bloques siguientes no la tienen
+            campos = detectar_campos(fichero)
+            for inicio, fin in dividir_en_bloques(fichero, tam_bloque):
+                tareas.append((nombre_ciudad(fichero),
+                               pool.submit(procesar_bloque, fichero, inicio, fin, error, campos)))
+        for ciudad, tarea in tareas:
+            por_ciudad[ciudad].fusionar(tarea.result())
+
+    total = EstadisticasParciales(error)
+    for parciales in por_ciudad.values():
+        total.fusionar(parciales)
+
+    if error is not None and dir_sketches:
+        os.makedirs(dir_sketches, exist_ok=True)
+        for ciudad, parciales in por_ciudad.items():
+            parciales.usuarios.guardar(os.path.join(dir_sketches, f"{ciudad}_usuarios.hll"))
+            parciales.localizaciones.guardar(os.path.join(dir_sketches, f"{ciudad}_localizaciones.hll"))
+
+    resultado = {ciudad: parciales.a_dict() for ciudad, parciales in por_ciudad.items()}
+    resultado[TODAS] = total.a_dict()
+    return resultado
+
+# =============================================================================
+# FUNCIÓN: formatear_texto
+# =============================================================================
+def formatear_texto(resultado: dict) -> str:
+    """Texto con el mismo formato de salida que estadísticas.py para cada ciudad."""
+    lineas = []
+    for ciudad, metricas in resultado.items():
+        titulo = "todas las ciudades" if ciudad == TODAS else ciudad
+        lineas.append(f"Estadísticas para {titulo}")
+        lineas.append(f"Número de usuarios distintos: {metricas['usuarios_distintos']}")
+        lineas.append(f"Número de localizaciones distintas: {metricas['localizaciones_distintas']}")
+        lineas.append(f"Número de filas completas: {metricas['filas_completas']}")
+        for mes in MESES_DESTACADOS:
+            lineas.append(f"Número de check-ins en {mes}: {metricas[f'checkins_{mes}']}")
+        lineas.append("")
+    return "\n".join(lineas)
+
+# =============================================================================
+# PUNTO DE ENTRADA
+# =============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Estadísticas en paralelo de varios ficheros Gowalla.")
+    parser.add_argument("ficheros", nargs="+", help="Ficheros <Ciudad>Gowalla.txt")
+    parser.add_argument("--procesos", type=int, default=None, help="Número de procesos (por defecto, CPUs)")
+    parser.add_argument("--tam_bloque", type=int, default=TAM_BLOQUE, help="Bytes por bloque")
+    parser.add_argument("--json", default=None, help="Fichero donde guardar el resultado en JSON")
+    parser.add_argument("--aproximado", action="store_true",
+                        help="Estimar los ids distintos con HyperLogLog (memoria constante)")
+    parser.add_argument("--error", type=float, default=0.01, help="Error relativo del modo aproximado")
+    parser.add_argument("--sketches", default=None,
+                        help="Directorio donde guardar los sketches HyperLogLog de cada ciudad")
+    args = parser.parse_args()
+
+    error = args.error if args.aproximado else None
+    resultado = estadisticas_ciudades(args.ficheros, args.procesos, args.tam_bloque, error, args.sketches)
+    print(formatear_texto(resultado))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"Resultado JSON guardado en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
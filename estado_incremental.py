@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: estado_incremental.py
+# DESCRIPCIÓN: Estadísticas incrementales para ficheros de check-ins que solo
+#              crecen. Junto a cada fichero se guarda un estado (<fichero>.estado.npz)
+#              con el byte hasta el que se ha procesado, una huella del fichero,
+#              los ids distintos, los check-ins por usuario y el histograma. En
+#              las siguientes ejecuciones solo se analiza la cola añadida. No
+#              escribe nada en pantalla: los scripts muestran informe() por stderr.
+# USO: Lo importan estadísticas.py y topn_selection_Claudia_Gonzalo.py (--incremental)
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from escaner_bytes import bloques_mmap, detectar_campos, escanear_buffer, formatear_periodo, sumar_conteos
+
+# Versión del formato del estado: si cambia, se recalcula desde cero
+VERSION_ESTADO = 1
+
+# Bytes que se usan para la huella del principio del fichero y del final procesado
+TAM_HUELLA = 4096
+
+EXTENSION_ESTADO = ".estado.npz"
+
+# =============================================================================
+# FUNCIONES AUXILIARES
+# =============================================================================
+def ruta_estado(fichero: str) -> str:
+    """Ruta del fichero de estado asociado a un fichero de check-ins."""
+    return fichero + EXTENSION_ESTADO
+
+
+def _huella(fichero: str, offset: int) -> dict:
+    """
+    Huella del contenido ya procesado: hash de los primeros bytes y de los
+    últimos bytes antes de 'offset'. Si el fichero se reescribe o se trunca,
+    alguna de las dos deja de coincidir.
+    """
+    with open(fichero, "rb") as f:
+        cabecera = f.read(min(TAM_HUELLA, offset))
+        f.seek(max(0, offset - TAM_HUELLA))
+        cola = f.read(min(TAM_HUELLA, offset))
+    return {
+        'cabecera': hashlib.sha1(cabecera).hexdigest(),
+        'cola': hashlib.sha1(cola).hexdigest(),
+    }
+
+
+def _fin_ultima_linea(fichero: str) -> int:
+    """Posición justo después del último salto de línea (una línea a medio escribir no se procesa)."""
+    tamano = os.path.getsize(fichero)
+    with open(fichero, "rb") as f:
+        posicion = tamano
+        while posicion > 0:
+            inicio = max(0, posicion - 65536)
+            f.seek(inicio)
+            trozo = f.read(posicion - inicio)
+            salto = trozo.rfind(b"\n")
+            if salto >= 0:
+                return inicio + salto + 1
+            posicion = inicio
+    return 0
+
+# =============================================================================
+# CLASE: EstadoIncremental
+# =============================================================================
+class EstadoIncremental:
+    """
+    Estadísticas acumuladas de un fichero hasta el byte 'offset'.
+
+    Atributos:
+    ----------
+    offset : int
+        Primer byte aún no procesado
+    filas : int
+        Líneas procesadas (igual que estadísticas.py)
+    usuarios, conteos_usuarios : np.ndarray
+        Ids de usuario distintos (ordenados) y check-ins de cada uno
+    localizaciones : np.ndarray
+        Ids de localización distintos (ordenados)
+    periodos, conteos_periodos : np.ndarray
+        Histograma temporal con la granularidad indicada
+    reiniciado : bool
+        El estado guardado no valía porque el fichero se reescribió o truncó
+    bytes_previos, bytes_nuevos : int
+        Bytes ya procesados al cargarlo y bytes analizados en la última
+        actualización (ver actualizar_estado)
+    """
+
+    def __init__(self, fichero: str, granularidad: str = 'mes', campos: int = 5):
+        self.fichero = fichero
+        self.granularidad = granularidad
+        self.campos = campos
+        self.offset = 0
+        self.filas = 0
+        self.huella = {}
+        self.usuarios = np.empty(0, dtype=np.int64)
+        self.conteos_usuarios = np.empty(0, dtype=np.int64)
+        self.localizaciones = np.empty(0, dtype=np.int64)
+        self.periodos = np.empty(0, dtype=np.int64)
+        self.conteos_periodos = np.empty(0, dtype=np.int64)
+        self.reiniciado = False
+        self.bytes_previos = 0
+        self.bytes_nuevos = 0
+
+    # -------------------------------------------------------------------------
+    # Persistencia
+    # -------------------------------------------------------------------------
+    def guardar(self):
+        """Escribe el estado de forma atómica junto al fichero de check-ins."""
+        meta = {
+            'version': VERSION_ESTADO,
+            'granularidad': self.granularidad,
+            'campos': self.campos,
+            'offset': self.offset,
+            'filas': self.filas,
+            'huella': self.huella,
+        }
+        temporal = ruta_estado(self.fichero) + ".tmp"
+        with open(temporal, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)),
+                     usuarios=self.usuarios, conteos_usuarios=self.conteos_usuarios,
+                     localizaciones=self.localizaciones,
+                     periodos=self.periodos, conteos_periodos=self.conteos_periodos)
+        os.replace(temporal, ruta_estado(self.fichero))
+
+    @classmethod
+    def cargar(cls, fichero: str, granularidad: str = 'mes', campos: int = 5) -> "EstadoIncremental":
+        """
+        Carga el estado guardado si es compatible y el fichero no ha sido
+        reescrito ni truncado; en otro caso devuelve un estado vacío (lo que
+        provoca un recálculo completo), con 'reiniciado' a True si el fichero
+        cambió.
+        """
+        estado = cls(fichero, granularidad, campos)
+        try:
+            with np.load(ruta_estado(fichero), allow_pickle=False) as datos:
+                meta = json.loads(str(datos['meta']))
+                if (meta['version'] != VERSION_ESTADO or meta['granularidad'] != granularidad
+                        or meta['campos'] != campos):
+                    return estado
+                if os.path.getsize(fichero) < meta['offset'] or _huella(fichero, meta['offset']) != meta['huella']:
+                    estado.reiniciado = True
+                    return estado
+                estado.offset = meta['offset']
+                estado.filas = meta['filas']
+                estado.huella = meta['huella']
+                for nombre in ('usuarios', 'conteos_usuarios', 'localizaciones', 'periodos', 'conteos_periodos'):
+                    setattr(estado, nombre, datos[nombre])
+        except (OSError, KeyError, ValueError):
+            pass
+        return estado
+
+    # -------------------------------------------------------------------------
+    # Actualización
+    # -------------------------------------------------------------------------
+    def procesar_cola(self) -> int:
+        """
+        Procesa las líneas completas añadidas desde el último offset y devuelve
+        el número de bytes analizados.
+        """
+        fin = _fin_ultima_linea(self.fichero)
+        if fin <= self.offset:
+            return 0
+
+        for bloque in bloques_mmap(self.fichero, self.offset, fin):
+            parcial = escanear_buffer(bloque, self.granularidad, self.campos)
+            self.filas += parcial['filas']
+            ids, conteos = np.unique(parcial['usuarios_filas'], return_counts=True)
+            self.usuarios, self.conteos_usuarios = sumar_conteos(self.usuarios, self.conteos_usuarios,
+                                                                 ids, conteos)
+            self.localizaciones = np.union1d(self.localizaciones, parcial['localizaciones'])
+            self.periodos, self.conteos_periodos = sumar_conteos(self.periodos, self.conteos_periodos,
+                                                                 parcial['periodos'], parcial['conteos'])
+
+        procesados = fin - self.offset
+        self.offset = fin
+        self.huella = _huella(self.fichero, fin)
+        return procesados
+
+    def informe(self) -> str:
+        """Texto para el usuario sobre la última actualización (los scripts lo escriben en stderr)."""
+        lineas = [f"[INFO] {self.fichero} se ha reescrito o truncado: recalculando desde el principio"] \
+            if self.reiniciado else []
+        lineas.append(f"[INFO] Estado incremental: {self.bytes_nuevos} bytes nuevos analizados "
+                      f"(ya procesados: {self.bytes_previos} bytes)")
+        return "\n".join(lineas)
+
+    def histograma(self) -> dict:
+        """Histograma {periodo formateado: check-ins}."""
+        return {formatear_periodo(p, self.granularidad): int(n)
+                for p, n in zip(self.periodos.tolist(), self.conteos_periodos.tolist())}
+
+# =============================================================================
+# FUNCIÓN: actualizar_estado
+# =============================================================================
+def actualizar_estado(fichero: str, granularidad: str = 'mes') -> EstadoIncremental:
+    """
+    Carga el estado de un fichero, procesa solo la parte nueva y lo vuelve a
+    guardar. Es el punto de entrada que usan los scripts; lo procesado
+    queda en estado.bytes_previos / estado.bytes_nuevos (ver informe()).
+    """
+    estado = EstadoIncremental.cargar(fichero, granularidad, detectar_campos(fichero))
+    estado.bytes_previos = estado.offset
+    estado.bytes_nuevos = estado.procesar_cola()
+    if estado.bytes_nuevos:
+        estado.guardar()
+    return estado
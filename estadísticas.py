@@ -1,9 +1,162 @@
 #estadisticas.py
-import sys
+import argparse
 import os
+import sys
+
+
+def estadisticas_almacen(ruta):
+    """
+    Calcula las mismas estadísticas a partir de un almacén columnar
+    (almacen_checkins.py), sin parsear texto: todo son operaciones numpy
+    sobre columnas abiertas con mmap. Los check-ins de cada mes salen del
+    índice temporal (indice_temporal.py) con dos búsquedas binarias.
+    """
+    import numpy as np
+    from almacen_checkins import abrir_almacen
+    from indice_temporal import IndiceTemporal
+
+    almacen = abrir_almacen(ruta)
+    indice = IndiceTemporal(almacen)
+
+    def checkins_mes(mes):
+        return indice.contar(mes, str(np.datetime64(mes, 'M') + 1))
+
+    return (len(np.unique(almacen.usuario)), len(np.unique(almacen.localizacion)),
+            len(almacen), checkins_mes("2010-07"), checkins_mes("2010-08"))
+
+
+def estadisticas_rapidas(fichero, granularidad="mes"):
+    """
+    Modo rápido: recorre el fichero como bytes (mmap) con escaner_bytes.py, sin
+    decodificar ni partir cada línea en objetos str, y obtiene en la misma
+    pasada el histograma completo de check-ins por mes, día u hora.
+    """
+    from escaner_bytes import detectar_campos, escanear_fichero
+
+    # Ficheros originales (5 campos) o filtrados (3 campos), como en los demás modos
+    resultado = escanear_fichero(fichero, granularidad, campos=detectar_campos(fichero))
+    histograma = resultado['histograma']
+
+    def checkins_mes(mes):
+        return sum(n for periodo, n in histograma.items() if periodo.startswith(mes))
+
+    return (len(resultado['usuarios']), len(resultado['localizaciones']), resultado['filas'],
+            checkins_mes("2010-07"), checkins_mes("2010-08"), histograma)
+
+
+def estadisticas_incrementales(fichero, granularidad="mes"):
+    """
+    Modo incremental: reutiliza el estado guardado junto al fichero
+    (estado_incremental.py) y solo analiza las líneas añadidas desde la
+    última ejecución.
+    """
+    from estado_incremental import actualizar_estado
+
+    estado = actualizar_estado(fichero, granularidad)
+    print(estado.informe(), file=sys.stderr)
+    histograma = estado.histograma()
+
+    def checkins_mes(mes):
+        return sum(n for periodo, n in histograma.items() if periodo.startswith(mes))
+
+    return (len(estado.usuarios), len(estado.localizaciones), estado.filas,
+            checkins_mes("2010-07"), checkins_mes("2010-08"), histograma)
+
+
+def estadisticas_aproximadas(fichero, error=0.01, granularidad="mes"):
+    """
+    Modo aproximado: como el modo rápido, pero los usuarios y localizaciones
+    distintos se estiman con sketches HyperLogLog (sketches.py), así que la
+    memoria no crece con el tamaño del dataset.
+    """
+    from escaner_bytes import bloques_mmap, detectar_campos, escanear_buffer, formatear_periodo
+    from sketches import HyperLogLog
+
+    usuarios = HyperLogLog(error)
+    localizaciones = HyperLogLog(error)
+    campos = detectar_campos(fichero)
+    filas = 0
+    conteos = {}
+    for bloque in bloques_mmap(fichero):
+        parcial = escanear_buffer(bloque, granularidad, campos)
+        filas += parcial['filas']
+        usuarios.anadir(parcial['usuarios'])
+        localizaciones.anadir(parcial['localizaciones'])
+        for periodo, n in zip(parcial['periodos'].tolist(), parcial['conteos'].tolist()):
+            conteos[periodo] = conteos.get(periodo, 0) + n
+    histograma = {formatear_periodo(p, granularidad): n for p, n in sorted(conteos.items())}
+
+    def checkins_mes(mes):
+        return sum(n for periodo, n in histograma.items() if periodo.startswith(mes))
+
+    margen = f" (aprox. ±{usuarios.error_estandar:.1%})"
+    return (f"{usuarios.estimar()}{margen}", f"{localizaciones.estimar()}{margen}", filas,
+            checkins_mes("2010-07"), checkins_mes("2010-08"), histograma)
+
+
+def imprimir_estadisticas(fichero, usuarios, localizaciones, filas, julio, agosto, histograma=None):
+    print(f"Estadísticas para {os.path.basename(fichero)}")
+    print(f"Número de usuarios distintos: {usuarios}")
+    print(f"Número de localizaciones distintas: {localizaciones}")
+    print(f"Número de filas completas: {filas}")
+    print(f"Número de check-ins en 2010-07: {julio}")
+    print(f"Número de check-ins en 2010-08: {agosto}")
+    if histograma:
+        print("Histograma de check-ins:")
+        for periodo, n in histograma.items():
+            print(f"  {periodo}: {n}")
+
 
 if __name__ == "__main__":
-    fichero = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Estadísticas de un fichero de check-ins Gowalla.")
+    parser.add_argument("fichero", help="Fichero <Ciudad>Gowalla.txt o directorio de su almacén columnar")
+    parser.add_argument("--rapido", action="store_true",
+                        help="Escanear los bytes con mmap y mostrar el histograma temporal completo")
+    parser.add_argument("--granularidad", choices=["mes", "dia", "hora"], default=None,
+                        help="Granularidad del histograma en modo rápido o incremental (por defecto, mes)")
+    parser.add_argument("--aproximado", action="store_true",
+                        help="Estimar usuarios y localizaciones distintos con HyperLogLog (memoria constante)")
+    parser.add_argument("--error", type=float, default=None,
+                        help="Error relativo estándar del modo aproximado (por defecto 0.01)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Procesar solo lo añadido desde la última ejecución (estado en <fichero>.estado.npz)")
+    args = parser.parse_args()
+    fichero = args.fichero
+
+    # Combinaciones sin sentido: se rechazan en lugar de ignorar opciones
+    opciones_escaneo = [nombre for nombre, dada in (("--rapido", args.rapido), ("--aproximado", args.aproximado),
+                                                     ("--incremental", args.incremental),
+                                                     ("--granularidad", args.granularidad is not None),
+                                                     ("--error", args.error is not None)) if dada]
+    if os.path.isdir(fichero) and opciones_escaneo:
+        parser.error(f"{', '.join(opciones_escaneo)} no se "
+                     f"{'admiten' if len(opciones_escaneo) > 1 else 'admite'} con un almacén columnar")
+    if args.aproximado and args.incremental:
+        parser.error("--aproximado y --incremental no se pueden combinar")
+    if args.error is not None and not args.aproximado:
+        parser.error("--error solo se usa con --aproximado")
+    if args.granularidad is not None and not (args.rapido or args.aproximado or args.incremental):
+        parser.error("--granularidad solo se usa con --rapido, --aproximado o --incremental")
+    granularidad = args.granularidad or "mes"
+    error = 0.01 if args.error is None else args.error
+
+    # Si se pasa el directorio de un almacén columnar no hay nada que parsear
+    if os.path.isdir(fichero):
+        imprimir_estadisticas(fichero, *estadisticas_almacen(fichero))
+        sys.exit(0)
+
+    if args.aproximado:
+        imprimir_estadisticas(fichero, *estadisticas_aproximadas(fichero, error, granularidad))
+        sys.exit(0)
+
+    if args.incremental:
+        imprimir_estadisticas(fichero, *estadisticas_incrementales(fichero, granularidad))
+        sys.exit(0)
+
+    if args.rapido:
+        imprimir_estadisticas(fichero, *estadisticas_rapidas(fichero, granularidad))
+        sys.exit(0)
+
     usuarios = set()
     localizaciones = set()
     total_interacciones = 0
@@ -28,9 +181,5 @@ if __name__ == "__main__":
                 if fecha.startswith("2010-08"):
                     checkins_agosto += 1
     
-    print(f"Estadísticas para {os.path.basename(fichero)}")
-    print(f"Número de usuarios distintos: {len(usuarios)}")
-    print(f"Número de localizaciones distintas: {len(localizaciones)}")
-    print(f"Número de filas completas: {total_interacciones}")
-    print(f"Número de check-ins en 2010-07: {checkins_julio}")
-    print(f"Número de check-ins en 2010-08: {checkins_agosto}")
\ No newline at end of file
+    imprimir_estadisticas(fichero, len(usuarios), len(localizaciones), total_interacciones,
+                          checkins_julio, checkins_agosto)
\ No newline at end of file
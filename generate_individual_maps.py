@@ -1,9 +1,13 @@
 # generate_individual_maps.py
 import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from datetime import datetime
 import folium
 from folium.plugins import AntPath
+from cache_mapas import DIRECTORIO_CACHE, CacheMapas, clave_mapa, generar_con_cache, huella_dataframe
+from compresion_estatica import escribir_comprimidos
 
 # Coordinates of the cities
 city_coordinates = {
@@ -13,49 +17,121 @@ city_coordinates = {
     'ElPaso': (31.7619, -106.4850)
 }
 
+# File name of each map in batch mode
+DEFAULT_OUTPUT_NAME = "user_{user_id}_{city_name}.html"
+
 
 def parse_args():
     """
     Parse the command line arguments.
 
+    A single user is selected with --user_id (and written to --output_html).
+    Batch mode selects many users with --user_ids, --top_file or --min_visits
+    and writes one HTML per user into --output_dir.
+
     Returns:
         args: Parsed command line arguments.
     """
     parser = argparse.ArgumentParser(
         description="Generate a map showing a user's route through Points of Interest in a city."
     )
-    parser.add_argument("--user_id", type=int, required=True, help="User ID")
+    users = parser.add_mutually_exclusive_group(required=True)
+    users.add_argument("--user_id", type=int, help="User ID")
+    users.add_argument("--user_ids", type=int, nargs="+", help="Several user IDs (batch mode)")
+    users.add_argument("--top_file", type=str, help="Top-N file; the first column of each line is a user ID (batch mode)")
+    users.add_argument("--min_visits", type=int, help="Every user with at least this many check-ins (batch mode)")
     parser.add_argument("--city_name", type=str, required=True, help="City name")
-    parser.add_argument("--input_file", type=str, required=True, help="Input file containing check-ins")
-    parser.add_argument("--output_html", type=str, required=True, help="Output HTML file")
-    return parser.parse_args()
+    parser.add_argument("--input_file", type=str, required=True, help="Input file containing check-ins (or check-in store directory)")
+    parser.add_argument("--output_html", type=str, help="Output HTML file (single user)")
+    parser.add_argument("--output_dir", type=str, help="Output directory (batch mode)")
+    parser.add_argument("--output_name", type=str, default=DEFAULT_OUTPUT_NAME,
+                        help=f"File name pattern in batch mode (default: {DEFAULT_OUTPUT_NAME})")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes in batch mode (default: CPUs)")
+    parser.add_argument("--force", action="store_true", help="Regenerate the maps even if they are cached")
+    parser.add_argument("--cache_dir", type=str, default=DIRECTORIO_CACHE,
+                        help=f"Map cache directory (default: {DIRECTORIO_CACHE})")
+    args = parser.parse_args()
+
+    if args.user_id is not None and not args.output_html:
+        parser.error("--output_html is required with --user_id")
+    if args.user_id is None and not args.output_dir:
+        parser.error("--output_dir is required with --user_ids, --top_file or --min_visits")
+    return args
 
 
-def generate_route(user_id, city_name, input_file, output_html):
+def load_user_checkins(user_id, input_file):
     """
-    Generate a map showing the route of a specific user through Points of Interest.
+    Load the check-ins of a single user.
+
+    When a check-in store is available (input_file is a store directory, or an
+    up-to-date store built by almacen_checkins.py sits next to the text file),
+    the per-user index in indice_usuarios.py reads only that user's rows.
+    Otherwise the whole text file is parsed and filtered.
 
     Args:
         user_id (int): The ID of the user.
-        city_name (str): The name of the city.
-        input_file (str): Path to the input file with check-ins data.
-        output_html (str): Path to the output HTML file where the map will be saved.
+        input_file (str): Path to the check-ins text file or store directory.
 
-    Raises:
-        ValueError: If the city name is not found in the predefined coordinates.
+    Returns:
+        pandas.DataFrame: The user's check-ins (possibly empty).
     """
-    # Read the check-ins data
+    from almacen_checkins import almacen_actualizado, es_almacen
+
+    if es_almacen(input_file) or almacen_actualizado(input_file):
+        from indice_usuarios import abrir_indice_usuarios
+        return abrir_indice_usuarios(input_file).checkins(user_id)
+
+    data = load_checkins(input_file)
+    return data[data['user_id'] == user_id]
+
+
+def load_checkins(input_file):
+    """
+    Load every check-in once, from a check-in store directory (or the
+    up-to-date store next to the text file) or by parsing the text file.
+
+    Args:
+        input_file (str): Path to the check-ins text file or store directory.
+
+    Returns:
+        pandas.DataFrame: All check-ins.
+    """
+    from almacen_checkins import abrir_almacen, almacen_actualizado, es_almacen
+
+    if es_almacen(input_file) or almacen_actualizado(input_file):
+        return abrir_almacen(input_file).a_dataframe()
+
     data = pd.read_csv(input_file, delimiter='\t', header=None)
     data.columns = ['user_id', 'timestamp', 'latitude', 'longitude', 'poi_id']
+    return data
 
-    # Filter the data for the specified user
-    user_data = data[data['user_id'] == user_id]
 
-    # If the user does not exist in the data, exit the function
-    if user_data.empty:
-        print(f"User ID {user_id} not found in the data. No file will be generated.")
-        return
+def read_top_file(top_file):
+    """
+    Read the user IDs of a top-N file written by topn_selection_Claudia_Gonzalo.py.
+
+    Args:
+        top_file (str): Path to the top-N file ("<user_id> <count>" per line).
+
+    Returns:
+        list: User IDs in file order.
+    """
+    with open(top_file) as f:
+        return [int(line.split()[0]) for line in f if line.strip()]
+
+
+def render_route(user_data, city_name, output_html):
+    """
+    Draw the route of one user and save it as HTML.
+
+    Args:
+        user_data (pandas.DataFrame): Check-ins of the user.
+        city_name (str): The name of the city.
+        output_html (str): Path to the output HTML file.
 
+    Raises:
+        ValueError: If the city name is not found in the predefined coordinates.
+    """
     # Convert the timestamp column to datetime format, accounting for the "Z" suffix
     user_data.loc[:, 'timestamp'] = pd.to_datetime(user_data['timestamp'], format='%Y-%m-%dT%H:%M:%SZ')
 
@@ -85,9 +161,129 @@ def generate_route(user_id, city_name, input_file, output_html):
 
     # Save the map to the output HTML file
     m.save(output_html)
-    print(f"Map saved to {output_html}")
+    return output_html
+
+
+def route_key(user_id, user_data, city_name):
+    """
+    Map cache key of a route: hash of the user's check-ins (in time order),
+    city and user. The columns are brought to the check-in store's types
+    first (float32 coordinates), so the text file and the store give the
+    same key.
+    """
+    ordered = user_data.sort_values('timestamp', kind='stable')
+    ordered = ordered.astype({'user_id': 'int64', 'timestamp': str, 'latitude': 'float32',
+                              'longitude': 'float32', 'poi_id': 'int64'})
+    return clave_mapa(map='route', data=huella_dataframe(ordered), city=city_name, user=int(user_id))
+
+
+def generate_route(user_id, city_name, input_file, output_html, force=False, cache_dir=DIRECTORIO_CACHE):
+    """
+    Generate a map showing the route of a specific user through Points of Interest.
+
+    Args:
+        user_id (int): The ID of the user.
+        city_name (str): The name of the city.
+        input_file (str): Path to the input file with check-ins data, or to a
+            check-in store directory built by almacen_checkins.py.
+        output_html (str): Path to the output HTML file where the map will be saved.
+        force (bool): Render the map even if the same route is in the map cache.
+        cache_dir (str): Directory of the map cache (see cache_mapas.py).
+
+    Raises:
+        ValueError: If the city name is not found in the predefined coordinates.
+    """
+    # Load only the check-ins of the specified user
+    user_data = load_user_checkins(user_id, input_file)
+
+    # If the user does not exist in the data, exit the function
+    if user_data.empty:
+        print(f"User ID {user_id} not found in the data. No file will be generated.")
+        return
+
+    cached = generar_con_cache(route_key(user_id, user_data, city_name), output_html,
+                               lambda destination: render_route(user_data, city_name, destination),
+                               CacheMapas(cache_dir), force)
+    print(f"Map saved to {output_html}" + (" (cached)" if cached else ""))
+
+
+def _render_task(task):
+    """Worker entry point: render one (user_data, city_name, output_html) task."""
+    return render_route(*task)
+
+
+def generate_routes(city_name, input_file, output_dir, user_ids=None, min_visits=None,
+                    output_name=DEFAULT_OUTPUT_NAME, workers=None, force=False, cache_dir=DIRECTORIO_CACHE):
+    """
+    Generate the route maps of many users in one run.
+
+    The check-ins are loaded and grouped by user once; the maps that are not
+    in the map cache are then rendered across a process pool, one HTML file
+    per user.
+
+    Args:
+        city_name (str): The name of the city.
+        input_file (str): Path to the check-ins text file or store directory.
+        output_dir (str): Directory where the HTML files are written.
+        user_ids (list, optional): Users to draw, in order.
+        min_visits (int, optional): Draw every user with at least this many check-ins.
+        output_name (str): File name pattern with {user_id} and {city_name} fields.
+        workers (int, optional): Number of worker processes (default: CPUs).
+        force (bool): Render every map even if it is in the map cache.
+        cache_dir (str): Directory of the map cache (see cache_mapas.py).
+
+    Returns:
+        list: Paths of the generated HTML files.
+    """
+    if city_name not in city_coordinates:
+        raise ValueError(f"Coordinates for the city {city_name} are not defined.")
+
+    groups = dict(tuple(load_checkins(input_file).groupby('user_id', sort=False)))
+
+    if user_ids is None:
+        user_ids = sorted(u for u, g in groups.items() if len(g) >= min_visits)
+    for user_id in user_ids:
+        if user_id not in groups:
+            print(f"User ID {user_id} not found in the data. No file will be generated.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    cache = CacheMapas(cache_dir)
+    outputs, tasks, keys = [], [], []
+    for user_id in user_ids:
+        if user_id not in groups:
+            continue
+        output_html = os.path.join(output_dir, output_name.format(user_id=user_id, city_name=city_name))
+        outputs.append(output_html)
+        key = route_key(user_id, groups[user_id], city_name)
+        if not force and cache.obtener(key, output_html):
+            escribir_comprimidos(output_html)
+            continue
+        # An old link into the cache must not be overwritten in place
+        if os.path.exists(output_html):
+            os.remove(output_html)
+        tasks.append((groups[user_id].copy(), city_name, output_html))
+        keys.append(key)
+
+    if tasks:
+        # Big batches are sent to the workers in chunks to amortize the pickling overhead
+        chunksize = max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for key, output_html in zip(keys, pool.map(_render_task, tasks, chunksize=chunksize)):
+                cache.guardar(key, output_html)
+                escribir_comprimidos(output_html)
+
+    if outputs:
+        print(f"{len(outputs)} maps saved to {output_dir} ({len(outputs) - len(tasks)} cached)")
+    return outputs
 
 
 if __name__ == "__main__":
     args = parse_args()
-    generate_route(args.user_id, args.city_name, args.input_file, args.output_html)
+    if args.user_id is not None:
+        generate_route(args.user_id, args.city_name, args.input_file, args.output_html,
+                       force=args.force, cache_dir=args.cache_dir)
+    else:
+        user_ids = read_top_file(args.top_file) if args.top_file else args.user_ids
+        generate_routes(args.city_name, args.input_file, args.output_dir, user_ids=user_ids,
+                        min_visits=args.min_visits, output_name=args.output_name, workers=args.workers,
+                        force=args.force, cache_dir=args.cache_dir)
@@ -1,8 +1,11 @@
 # generate_maps.py
 import pandas as pd
 import folium
-from folium.plugins import MarkerCluster
+from folium.plugins import FastMarkerCluster, HeatMap, MarkerCluster
 import argparse
+import os
+import numpy as np
+from cache_mapas import DIRECTORIO_CACHE, CacheMapas, clave_mapa, generar_con_cache, huella_fichero
 
 city_coordinates = {
     'Manchester': (53.4808, -2.2426),
@@ -11,44 +14,273 @@ city_coordinates = {
     'ElPaso': (31.7619, -106.4850)
 }
 
-def plot_and_save_map(filtered_file_path: str, city_name: str, output_html_path: str):
-    """Crea un mapa con los check-ins."""
+# Modo rápido: el navegador crea y agrupa los marcadores a partir de un único
+# array [lat, lon, usuario, hora]; el aspecto es el mismo que el de los CircleMarker
+FAST_CALLBACK = """function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+        {radius: 3, color: 'blue', fill: true, fillColor: 'blue'});
+    marker.bindPopup('User: ' + row[2] + '<br>Time: ' + row[3]);
+    return marker;
+}"""
+
+# Modo por localización: un marcador por POI con radio según las visitas
+# (fila [lat, lon, radio, visitas, popup])
+LOCATION_CALLBACK = """function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]),
+        {radius: row[2], color: 'blue', fill: true, fillColor: 'blue'});
+    marker.bindTooltip(row[3] + ' visits');
+    marker.bindPopup(row[4]);
+    return marker;
+}"""
+
+# Usuarios que se muestran en el popup de cada localización
+TOP_USERS = 3
+
+# Nivel de la pirámide de densidad del modo mapa de calor (celdas de ~1 km)
+HEATMAP_ZOOM = 12
+
+# Muestreo estratificado (--max_points): celda inicial de la rejilla en grados
+# (~100 m) y semilla fija para que el mismo mapa salga siempre igual
+SAMPLING_CELL = 0.001
+SAMPLING_SEED = 0
+
+def load_checkins(input_path: str) -> pd.DataFrame:
+    """
+    Lee los check-ins del fichero de texto o, sin parsear, de un almacén
+    columnar (el directorio indicado o el almacén actualizado junto al texto).
+    """
+    from almacen_checkins import abrir_almacen, almacen_actualizado, es_almacen
+
+    if es_almacen(input_path) or almacen_actualizado(input_path):
+        data = abrir_almacen(input_path).a_dataframe()
+        data.columns = ['user', 'check-in_time', 'latitude', 'longitude', 'location_id']
+        return data
+    return pd.read_csv(input_path, delimiter='\t', header=None,
+                       names=['user', 'check-in_time', 'latitude', 'longitude', 'location_id'])
+
+
+def add_markers(data: pd.DataFrame, map_: folium.Map):
+    """Un CircleMarker con su popup por check-in, agrupados con MarkerCluster."""
+    marker_cluster = MarkerCluster().add_to(map_)
+
+    for _, row in data.iterrows():
+        folium.CircleMarker(
+            location=[row['latitude'], row['longitude']],
+            radius=3,
+            color='blue',
+            fill=True,
+            fill_color='blue',
+            popup=f"User: {row['user']}<br>Time: {row['check-in_time']}"
+        ).add_to(marker_cluster)
+
+
+def add_fast_markers(data: pd.DataFrame, map_: folium.Map):
+    """
+    Los check-ins como un único array de datos que el navegador agrupa
+    (FastMarkerCluster): no se crea ningún objeto folium por fila.
+    """
+    points = data[['latitude', 'longitude', 'user', 'check-in_time']].to_numpy(dtype=object)
+    FastMarkerCluster(points.tolist(), callback=FAST_CALLBACK).add_to(map_)
+
+
+def aggregate_locations(data: pd.DataFrame, top_users: int = TOP_USERS) -> pd.DataFrame:
+    """
+    Agrupa los check-ins por location_id: coordenadas, visitas, visitantes
+    distintos, los 'top_users' usuarios con más visitas, radio del marcador
+    y popup resumido.
+    """
+    locations = data.groupby('location_id').agg(latitude=('latitude', 'first'),
+                                                longitude=('longitude', 'first'),
+                                                visits=('user', 'size'),
+                                                visitors=('user', 'nunique'))
+
+    # Visitas de cada usuario a cada localización, de más a menos (empates por id)
+    per_user = data.groupby(['location_id', 'user']).size().rename('n').reset_index()
+    per_user = per_user.sort_values(['location_id', 'n', 'user'], ascending=[True, False, True])
+    top = per_user.groupby('location_id').head(top_users)
+    labels = top['user'].astype(str) + ' (' + top['n'].astype(str) + ')'
+    locations['top_users'] = labels.groupby(top['location_id']).agg(', '.join)
+
+    locations = locations.reset_index()
+    # Radio de 3 px para una visita, creciendo con el logaritmo de las visitas
+    locations['radius'] = np.minimum(3 + 2 * np.log2(locations['visits']), 20).round(1)
+    locations['popup'] = ('Location: ' + locations['location_id'].astype(str)
+                          + '<br>Visits: ' + locations['visits'].astype(str)
+                          + '<br>Visitors: ' + locations['visitors'].astype(str)
+                          + '<br>Top users: ' + locations['top_users'])
+    return locations
+
+
+def add_location_markers(locations: pd.DataFrame, map_: folium.Map, fast: bool = False):
+    """Un marcador por localización (ver aggregate_locations), agrupados en clusters."""
+    if fast:
+        rows = locations[['latitude', 'longitude', 'radius', 'visits', 'popup']].to_numpy(dtype=object)
+        FastMarkerCluster(rows.tolist(), callback=LOCATION_CALLBACK).add_to(map_)
+        return
+
+    marker_cluster = MarkerCluster().add_to(map_)
+    for row in locations.itertuples(index=False):
+        folium.CircleMarker(
+            location=[row.latitude, row.longitude],
+            radius=row.radius,
+            color='blue',
+            fill=True,
+            fill_color='blue',
+            tooltip=f"{row.visits} visits",
+            popup=row.popup
+        ).add_to(marker_cluster)
+
+
+def stratified_sample(data: pd.DataFrame, max_points: int, seed: int = SAMPLING_SEED) -> pd.DataFrame:
+    """
+    Reduce las filas a como mucho max_points con un muestreo estratificado en
+    una rejilla lat/lon: cada celda no vacía conserva al menos un punto (los
+    puntos aislados no desaparecen) y el resto del cupo se reparte en
+    proporción a los puntos de cada celda, de modo que se mantiene la
+    distribución de densidad. La rejilla se hace más gruesa hasta que hay
+    como mucho max_points / 2 celdas no vacías; si una celda ya abarca todos
+    los puntos y siguen siendo más (la rejilla es absoluta, así que los
+    datos a ambos lados de 0° nunca se juntan), se toma una muestra
+    aleatoria simple.
+    """
+    if max_points < 1:
+        raise ValueError(f"max_points must be at least 1, got {max_points}")
+    n = len(data)
+    if n <= max_points:
+        return data
+
+    latitude = data['latitude'].to_numpy(dtype=np.float64)
+    longitude = data['longitude'].to_numpy(dtype=np.float64)
+    extent = max(np.ptp(latitude), np.ptp(longitude))
+    rng = np.random.default_rng(seed)
+    cell = SAMPLING_CELL
+    while True:
+        keys = np.floor(latitude / cell).astype(np.int64) * (1 << 32) + np.floor(longitude / cell).astype(np.int64)
+        cells, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        if len(cells) <= max(1, max_points // 2):
+            break
+        if cell > extent:
+            return data.iloc[np.sort(rng.choice(n, max_points, replace=False))]
+        cell *= 2
+
+    # Un punto por celda y el cupo restante proporcional a los demás puntos de cada una
+    rate = (max_points - len(cells)) / (n - len(cells))
+    quota = 1 + np.floor((counts - 1) * rate).astype(np.int64)
+
+    # Orden aleatorio dentro de cada celda; se quedan los 'quota' primeros
+    order = np.lexsort((rng.random(n), inverse))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(n) - starts[inverse[order]]
+    keep = np.sort(order[rank < quota[inverse[order]]])
+    return data.iloc[keep]
+
+
+def add_sampling_note(map_: folium.Map, shown: int, total: int, what: str):
+    """Nota fija en el mapa con la tasa de muestreo aplicada."""
+    note = (f'<div style="position: fixed; bottom: 20px; left: 20px; z-index: 1000; background: white; '
+            f'padding: 4px 8px; font-family: sans-serif; font-size: 12px;">'
+            f'Showing {shown} of {total} {what} (spatially stratified sample, rate {shown / total:.2%})</div>')
+    map_.get_root().html.add_child(folium.Element(note))
+
+
+def render_map(data: pd.DataFrame, city_name: str, output_html_path: str, fast: bool = False,
+               by_location: bool = False, max_points: int = None):
+    """
+    Dibuja los check-ins de una ciudad y guarda el HTML. Con max_points, los
+    check-ins (o las localizaciones con by_location) se muestrean con
+    stratified_sample y el mapa indica la tasa aplicada.
+    """
+    city_lat, city_lon = city_coordinates[city_name]
+    
+    map_ = folium.Map(location=[city_lat, city_lon], zoom_start=12)
+    points = aggregate_locations(data) if by_location else data
+    if max_points is not None and len(points) > max_points:
+        total = len(points)
+        points = stratified_sample(points, max_points)
+        add_sampling_note(map_, len(points), total, 'locations' if by_location else 'check-ins')
+
+    if by_location:
+        add_location_markers(points, map_, fast)
+    elif fast:
+        add_fast_markers(points, map_)
+    else:
+        add_markers(points, map_)
+    
+    map_.save(output_html_path)
+
+
+def render_heatmap(input_path: str, city_name: str, output_html_path: str, zoom: int = HEATMAP_ZOOM):
+    """
+    Dibuja un mapa de calor a partir de la pirámide de densidad precalculada
+    (teselas_densidad.py): una celda por punto, sin recorrer los check-ins.
+    """
+    from teselas_densidad import abrir_piramide
+
+    cells = abrir_piramide(input_path).puntos_calor((-180.0, -90.0, 180.0, 90.0), zoom)
+    if len(cells):
+        cells[:, 2] /= cells[:, 2].max()
+    
+    city_lat, city_lon = city_coordinates[city_name]
+    map_ = folium.Map(location=[city_lat, city_lon], zoom_start=12)
+    HeatMap(cells.tolist(), radius=15).add_to(map_)
+    map_.save(output_html_path)
+
+
+def plot_and_save_map(filtered_file_path: str, city_name: str, output_html_path: str, fast: bool = False,
+                      by_location: bool = False, force: bool = False, cache_dir: str = DIRECTORIO_CACHE,
+                      heatmap: bool = False, max_points: int = None):
+    """
+    Crea un mapa con los check-ins (fast=True: marcadores generados en el
+    navegador; by_location=True: un marcador por localización; heatmap=True:
+    mapa de calor de la pirámide de densidad; max_points: como mucho ese
+    número de puntos, con muestreo estratificado).
+
+    Si ya se generó un mapa con los mismos datos, ciudad y opciones, se toma
+    de la caché de mapas (cache_mapas.py) salvo que force=True.
+    """
     try:
-        data = pd.read_csv(filtered_file_path, delimiter='\t', header=None,
-                          names=['user', 'check-in_time', 'latitude', 'longitude', 'location_id'])
-        
         if city_name not in city_coordinates:
             raise ValueError(f"City '{city_name}' not found.")
         
-        city_lat, city_lon = city_coordinates[city_name]
-        
-        map_ = folium.Map(location=[city_lat, city_lon], zoom_start=12)
-        marker_cluster = MarkerCluster().add_to(map_)
-        
-        for _, row in data.iterrows():
-            folium.CircleMarker(
-                location=[row['latitude'], row['longitude']],
-                radius=3,
-                color='blue',
-                fill=True,
-                fill_color='blue',
-                popup=f"User: {row['user']}<br>Time: {row['check-in_time']}"
-            ).add_to(marker_cluster)
-        
-        map_.save(output_html_path)
-        print(f"Map saved to {output_html_path}")
+        key = clave_mapa(map='city', data=huella_fichero(filtered_file_path), city=city_name,
+                         fast=fast, by_location=by_location, heatmap=heatmap, max_points=max_points)
+        if heatmap:
+            render = lambda destino: render_heatmap(filtered_file_path, city_name, destino)
+        else:
+            render = lambda destino: render_map(load_checkins(filtered_file_path), city_name, destino,
+                                                fast, by_location, max_points)
+        cached = generar_con_cache(key, output_html_path, render, CacheMapas(cache_dir), force)
+        print(f"Map saved to {output_html_path}" + (" (cached)" if cached else ""))
         
     except Exception as e:
         print(f"Error generating map: {e}")
 
+def positive_int(value: str) -> int:
+    """argparse type for --max_points: an integer of at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description="Generate map from check-in data.")
-    parser.add_argument("--input_file", required=True, help="Path to input file")
+    parser.add_argument("--input_file", required=True, help="Path to input file or check-in store directory")
     parser.add_argument("--city_name", required=True, help="City name")
     parser.add_argument("--output_html", required=True, help="Output HTML file path")
+    parser.add_argument("--fast", action="store_true",
+                        help="Render the markers in the browser from one data array (much smaller HTML)")
+    parser.add_argument("--by_location", action="store_true",
+                        help="One marker per location sized by its visits, with a summarized popup")
+    parser.add_argument("--heatmap", action="store_true",
+                        help="Heatmap from the precomputed density pyramid (teselas_densidad.py)")
+    parser.add_argument("--max_points", "--max-points", type=positive_int, default=None,
+                        help="Draw at most this many points (spatially stratified down-sampling)")
+    parser.add_argument("--force", action="store_true", help="Regenerate the map even if it is cached")
+    parser.add_argument("--cache_dir", default=DIRECTORIO_CACHE, help=f"Map cache directory (default: {DIRECTORIO_CACHE})")
     
     args = parser.parse_args()
-    plot_and_save_map(args.input_file, args.city_name, args.output_html)
+    plot_and_save_map(args.input_file, args.city_name, args.output_html, args.fast, args.by_location,
+                      args.force, args.cache_dir, args.heatmap, args.max_points)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
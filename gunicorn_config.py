@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: gunicorn_config.py
+# DESCRIPCIÓN: Configuración del servidor de producción (gunicorn) para app.py.
+#              La aplicación y su estado pesado (módulos, índices de las
+#              ciudades) se cargan una vez en el proceso maestro antes de crear
+#              los workers, que los comparten copy-on-write. Con /train
+#              asíncrono activo (TRAIN_ASYNC=1, por defecto) hay un solo worker
+#              con varios hilos, porque la tabla de trabajos, su pool de
+#              procesos y la caché de resultados viven en la memoria del
+#              worker; con TRAIN_ASYNC=0 se arrancan varios workers, se
+#              reciclan tras MAX_REQUESTS peticiones y /metrics suma los
+#              contadores de todos. Incluye tiempos máximos por petición y
+#              reinicio ordenado.
+# USO: gunicorn -c gunicorn_config.py app:app
+#      THREADS=16 PUERTO=8000 gunicorn -c gunicorn_config.py app:app
+#      TRAIN_ASYNC=0 WORKERS=4 THREADS=8 gunicorn -c gunicorn_config.py app:app
+#      kill -HUP <pid del maestro>   (reinicio ordenado de los workers)
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import glob
+import os
+import tempfile
+
+# =============================================================================
+# CONEXIÓN
+# =============================================================================
+bind = f"0.0.0.0:{os.environ.get('PUERTO', '5000')}"
+backlog = 2048
+keepalive = 5  # segundos que se mantiene abierta una conexión sin peticiones
+
+# =============================================================================
+# PROCESOS E HILOS
+# =============================================================================
+# Los trabajos de /train?async=1 (y su pool de procesos) solo existen en el
+# worker que los aceptó: con varios workers, /train/status/<id> fallaría al
+# llegar a otro. Mientras estén activos hay un único worker y la concurrencia
+# la dan los hilos (el entrenamiento corre en el pool, no en el hilo)
+TRABAJOS_ASINCRONOS = os.environ.get('TRAIN_ASYNC', '1') == '1'
+WORKERS_PEDIDOS = int(os.environ.get('WORKERS', os.cpu_count() or 1))
+workers = 1 if TRABAJOS_ASINCRONOS else WORKERS_PEDIDOS
+threads = int(os.environ.get('THREADS', 8 if TRABAJOS_ASINCRONOS else 4))
+worker_class = 'gthread'
+
+# Con varios workers cada uno vuelca sus métricas en este directorio y
+# /metrics las suma (ver metricas_servicio.py)
+if workers > 1:
+    os.environ.setdefault('METRICS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'gowalla_metricas'))
+
+# Cargar app.py en el maestro antes de crear los workers (copy-on-write).
+# Con preload_app un HUP reinicia los workers pero no recarga el código: para
+# desplegar código nuevo hay que reiniciar el maestro
+preload_app = True
+
+# =============================================================================
+# TIEMPOS Y REINICIOS
+# =============================================================================
+# Un worker que no responde en 'timeout' segundos se mata y se sustituye
+timeout = int(os.environ.get('TIMEOUT', 120))
+# Al reiniciar (HUP) o parar (TERM), los workers terminan sus peticiones durante este tiempo
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+# Reciclar cada worker tras N peticiones (con desfase aleatorio para no
+# reiniciarlos a la vez). Nunca con trabajos asíncronos: reciclar el worker
+# perdería la tabla de trabajos y mataría los entrenamientos en curso
+max_requests = 0 if TRABAJOS_ASINCRONOS else int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+
+# =============================================================================
+# REGISTRO
+# =============================================================================
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+# =============================================================================
+# GANCHOS
+# =============================================================================
+def on_starting(server):
+    """En el maestro, antes de crear workers: carga los índices de las ciudades."""
+    if TRABAJOS_ASINCRONOS and WORKERS_PEDIDOS > 1 and 'WORKERS' in os.environ:
+        server.log.warning("WORKERS=%d ignorado: con TRAIN_ASYNC=1 se usa un solo worker", WORKERS_PEDIDOS)
+    directorio_metricas = os.environ.get('METRICS_MULTIPROC_DIR')
+    if directorio_metricas:
+        # Los contadores de una ejecución anterior no se suman a los de esta
+        os.makedirs(directorio_metricas, exist_ok=True)
+        for fichero in glob.glob(os.path.join(directorio_metricas, '*.json')):
+            os.remove(fichero)
+    from app import preload_state
+    preload_state(cities=os.environ.get('PRECARGAR_CIUDADES', '1') == '1')
+    server.log.info("Estado precargado en el maestro (%d workers x %d hilos)", workers, threads)
+
+
+def worker_exit(server, worker):
+    """Al salir un worker: vuelca sus últimas métricas para que /metrics las siga sumando."""
+    from metricas_servicio import volcar_metricas
+    volcar_metricas(forzar=True)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: indice_espacial.py
+# DESCRIPCIÓN: Índice espacial en rejilla de los check-ins de una ciudad. Las
+#              filas del almacén columnar se agrupan por celda lat/lon (y por
+#              timestamp dentro de cada celda), de modo que los check-ins de un
+#              rectángulo se obtienen con una búsqueda binaria por fila de la
+#              rejilla, sin recorrer la ciudad. Para vistas alejadas agrega los
+#              check-ins en celdas cuyo tamaño depende del nivel de zoom.
+# USO: python indice_espacial.py DatasetsGowalla/ManchesterGowalla.txt \
+#          --bbox -2.30,53.45,-2.20,53.50 [--zoom 12] [--desde 2010-07-01] [--hasta 2010-08-01]
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from almacen_checkins import abrir_almacen, borrar_meta, guardar_array, guardar_meta
+from indice_temporal import a_epoch
+
+# Tamaño de celda del índice en grados (~1 km de latitud)
+TAM_CELDA = 0.01
+
+# Celdas de agregación por lado de una tesela de 256 px (celdas de 32 px)
+CELDAS_POR_TESELA = 8
+
+# Niveles de zoom admitidos (los de Leaflet/OSM). Más allá de ~30 las claves
+# de celda de 32 bits por eje colisionan, y 2**zoom desborda el float
+ZOOM_MINIMO = 0
+ZOOM_MAXIMO = 22
+
+# Ficheros del índice dentro del directorio del almacén
+FICHERO_META = "espacial_meta.json"
+FICHERO_ORDEN = "espacial_orden.npy"
+FICHERO_CELDAS = "espacial_celdas.npy"
+FICHERO_INICIOS = "espacial_inicios.npy"
+
+# =============================================================================
+# FUNCIÓN: construir_indice_espacial
+# =============================================================================
+def construir_indice_espacial(almacen, tam_celda: float = TAM_CELDA) -> dict:
+    """
+    Asigna a cada fila su celda de la rejilla (fila * columnas + columna),
+    ordena las filas por (celda, timestamp) y guarda la permutación, las
+    celdas no vacías y dónde empieza cada una. Devuelve la meta del índice.
+    """
+    borrar_meta(os.path.join(almacen.ruta, FICHERO_META))
+    # Celdas calculadas en float64 (exacto para los float32 del almacén), igual que las consultas
+    latitud = np.asarray(almacen.latitud, dtype=np.float64)
+    longitud = np.asarray(almacen.longitud, dtype=np.float64)
+    meta = {
+        'tam_celda': tam_celda,
+        'lat0': float(latitud.min()) if len(latitud) else 0.0,
+        'lon0': float(longitud.min()) if len(longitud) else 0.0,
+    }
+    meta['columnas'] = int((longitud.max() - meta['lon0']) // tam_celda) + 1 if len(longitud) else 1
+    meta['filas'] = int((latitud.max() - meta['lat0']) // tam_celda) + 1 if len(latitud) else 1
+
+    celda = (((latitud - meta['lat0']) // tam_celda).astype(np.int64) * meta['columnas']
+             + ((longitud - meta['lon0']) // tam_celda).astype(np.int64))
+    orden = np.lexsort((np.asarray(almacen.timestamp), celda)).astype(np.int64)
+    celdas, inicios = np.unique(celda[orden], return_index=True)
+
+    guardar_array(os.path.join(almacen.ruta, FICHERO_ORDEN), orden)
+    guardar_array(os.path.join(almacen.ruta, FICHERO_CELDAS), celdas)
+    guardar_array(os.path.join(almacen.ruta, FICHERO_INICIOS), np.append(inicios, len(orden)).astype(np.int64))
+    # La meta se escribe la última: sin ella el índice se considera incompleto
+    guardar_meta(os.path.join(almacen.ruta, FICHERO_META), meta)
+    return meta
+
+# =============================================================================
+# CLASE: IndiceEspacial
+# =============================================================================
+class IndiceEspacial:
+    """
+    Consultas por rectángulo (bbox) y ventana temporal sobre un almacén
+    columnar. Los rectángulos son cerrados y las ventanas [t0, t1) semiabiertas,
+    como en indice_temporal.py.
+    """
+
+    def __init__(self, almacen, tam_celda: float = TAM_CELDA):
+        self.almacen = almacen
+        try:
+            with open(os.path.join(almacen.ruta, FICHERO_META)) as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            self.meta = None
+        if self.meta is None or self.meta['tam_celda'] != tam_celda:
+            self.meta = construir_indice_espacial(almacen, tam_celda)
+        self.orden = np.load(os.path.join(almacen.ruta, FICHERO_ORDEN), mmap_mode='r')
+        self.celdas = np.load(os.path.join(almacen.ruta, FICHERO_CELDAS), mmap_mode='r')
+        self.inicios = np.load(os.path.join(almacen.ruta, FICHERO_INICIOS), mmap_mode='r')
+
+    def _rango(self, minimo: float, maximo: float, origen: float, limite: int) -> tuple:
+        """Primera y última fila/columna de la rejilla que cortan [minimo, maximo]."""
+        tam = self.meta['tam_celda']
+        inicio = max(0, int((minimo - origen) // tam))
+        fin = min(limite - 1, int((maximo - origen) // tam))
+        return inicio, fin
+
+    def filas(self, bbox: tuple, t0=None, t1=None) -> np.ndarray:
+        """
+        Filas del almacén dentro de bbox = (lon_min, lat_min, lon_max, lat_max)
+        y de la ventana temporal, ordenadas por (celda, timestamp). Solo se
+        leen las celdas que cortan el rectángulo; las de borde se filtran
+        después con las coordenadas exactas.
+        """
+        lon_min, lat_min, lon_max, lat_max = bbox
+        fila0, fila1 = self._rango(lat_min, lat_max, self.meta['lat0'], self.meta['filas'])
+        col0, col1 = self._rango(lon_min, lon_max, self.meta['lon0'], self.meta['columnas'])
+        if fila0 > fila1 or col0 > col1:
+            return np.empty(0, dtype=np.int64)
+
+        # Las celdas de una fila de la rejilla son consecutivas: un tramo del orden por fila
+        claves = np.arange(fila0, fila1 + 1, dtype=np.int64) * self.meta['columnas']
+        desde = np.searchsorted(self.celdas, claves + col0, side='left')
+        hasta = np.searchsorted(self.celdas, claves + col1, side='right')
+        tramos = [np.asarray(self.orden[self.inicios[a]:self.inicios[b]])
+                  for a, b in zip(desde.tolist(), hasta.tolist()) if b > a]
+        if not tramos:
+            return np.empty(0, dtype=np.int64)
+        filas = np.concatenate(tramos)
+
+        latitud = np.asarray(self.almacen.latitud[filas], dtype=np.float64)
+        longitud = np.asarray(self.almacen.longitud[filas], dtype=np.float64)
+        dentro = (latitud >= lat_min) & (latitud <= lat_max) & (longitud >= lon_min) & (longitud <= lon_max)
+        if t0 is not None or t1 is not None:
+            timestamps = self.almacen.timestamp[filas]
+            if t0 is not None:
+                dentro &= timestamps >= a_epoch(t0)
+            if t1 is not None:
+                dentro &= timestamps < a_epoch(t1)
+        return filas[dentro]
+
+    def agregar(self, bbox: tuple, zoom: int, t0=None, t1=None) -> dict:
+        """
+        Agrega los check-ins del rectángulo en celdas de 1/CELDAS_POR_TESELA
+        de tesela para el nivel de zoom. Devuelve el centroide y el número de
+        check-ins de cada celda no vacía, ordenadas por celda. Lanza
+        ValueError si el zoom no está entre ZOOM_MINIMO y ZOOM_MAXIMO.
+        """
+        if not ZOOM_MINIMO <= zoom <= ZOOM_MAXIMO:
+            raise ValueError(f"zoom debe estar entre {ZOOM_MINIMO} y {ZOOM_MAXIMO}")
+        filas = self.filas(bbox, t0, t1)
+        tam = 360.0 / (2 ** zoom) / CELDAS_POR_TESELA
+        latitud = np.asarray(self.almacen.latitud[filas], dtype=np.float64)
+        longitud = np.asarray(self.almacen.longitud[filas], dtype=np.float64)
+        # Rejilla absoluta (no relativa al bbox) para que las celdas no cambien al desplazar el mapa
+        claves = np.floor(latitud / tam).astype(np.int64) * (1 << 32) + np.floor(longitud / tam).astype(np.int64)
+        celdas, inversa, conteos = np.unique(claves, return_inverse=True, return_counts=True)
+        return {
+            'latitud': np.bincount(inversa, weights=latitud, minlength=len(celdas)) / np.maximum(conteos, 1),
+            'longitud': np.bincount(inversa, weights=longitud, minlength=len(celdas)) / np.maximum(conteos, 1),
+            'conteos': conteos,
+        }
+
+# =============================================================================
+# FUNCIÓN: abrir_indice_espacial
+# =============================================================================
+def abrir_indice_espacial(ruta: str) -> IndiceEspacial:
+    """Abre el índice de un fichero de texto o de un almacén (los construye si faltan)."""
+    return IndiceEspacial(abrir_almacen(ruta, construir=True))
+
+# =============================================================================
+# PUNTO DE ENTRADA
+# =============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Consulta de check-ins por rectángulo.")
+    parser.add_argument("fichero", help="Fichero <Ciudad>Gowalla.txt o directorio de su almacén")
+    parser.add_argument("--bbox", required=True, help="lon_min,lat_min,lon_max,lat_max")
+    parser.add_argument("--zoom", type=int, default=None, help="Agregar en celdas para este nivel de zoom")
+    parser.add_argument("--desde", default=None, help="Inicio de la ventana (incluido)")
+    parser.add_argument("--hasta", default=None, help="Fin de la ventana (excluido)")
+    args = parser.parse_args()
+
+    bbox = tuple(float(v) for v in args.bbox.split(","))
+    indice = abrir_indice_espacial(args.fichero)
+    print(f"Check-ins en el rectángulo: {len(indice.filas(bbox, args.desde, args.hasta))}")
+    if args.zoom is not None:
+        celdas = indice.agregar(bbox, args.zoom, args.desde, args.hasta)
+        print(f"Celdas no vacías con zoom {args.zoom}: {len(celdas['conteos'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: indice_temporal.py
+# DESCRIPCIÓN: Índice temporal de los check-ins de una ciudad. Guarda dentro del
+#              almacén columnar (almacen_checkins.py) las filas ordenadas por
+#              timestamp, de modo que "cuántos / cuáles check-ins hay entre t0
+#              y t1" se responde con dos búsquedas binarias en vez de recorrer
+#              todo el fichero. También filtra por usuario o por localización.
+# USO: python indice_temporal.py DatasetsGowalla/ElPasoGowalla.txt \
+#          --desde 2010-07-01 --hasta 2010-08-01 [--usuario U] [--localizacion L] [--listar]
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import argparse
+import os
+
+import numpy as np
+
+from almacen_checkins import abrir_almacen, borrar_meta, guardar_array, guardar_meta
+
+# Ficheros del índice dentro del directorio del almacén
+FICHERO_ORDEN = "orden_tiempo.npy"
+FICHERO_TIMESTAMPS = "timestamp_ordenado.npy"
+FICHERO_META = "temporal_meta.json"
+
+# =============================================================================
+# FUNCIÓN: a_epoch
+# =============================================================================
+def a_epoch(fecha) -> int:
+    """
+    Convierte una fecha ('2010-07', '2010-07-15', '2010-07-15T18:00:00Z') o
+    un entero de segundos epoch a segundos epoch.
+    """
+    if isinstance(fecha, (int, np.integer)):
+        return int(fecha)
+    return int(np.datetime64(str(fecha).rstrip('Z'), 's').astype(np.int64))
+
+# =============================================================================
+# FUNCIÓN: construir_indice_temporal
+# =============================================================================
+def construir_indice_temporal(almacen) -> None:
+    """
+    Ordena las filas del almacén por timestamp y guarda la permutación. La
+    meta se escribe la última y marca el índice como completo.
+    """
+    borrar_meta(os.path.join(almacen.ruta, FICHERO_META))
+    orden = np.argsort(almacen.timestamp, kind='stable').astype(np.int64)
+    guardar_array(os.path.join(almacen.ruta, FICHERO_ORDEN), orden)
+    guardar_array(os.path.join(almacen.ruta, FICHERO_TIMESTAMPS), np.asarray(almacen.timestamp)[orden])
+    guardar_meta(os.path.join(almacen.ruta, FICHERO_META), {'filas': int(len(orden))})
+
+# =============================================================================
+# CLASE: IndiceTemporal
+# =============================================================================
+class IndiceTemporal:
+    """
+    Consultas por ventana temporal [t0, t1) sobre un almacén columnar.
+    Las ventanas son semiabiertas: incluyen t0 y excluyen t1.
+    """
+
+    def __init__(self, almacen):
+        self.almacen = almacen
+        if not os.path.exists(os.path.join(almacen.ruta, FICHERO_META)):
+            construir_indice_temporal(almacen)
+        self.orden = np.load(os.path.join(almacen.ruta, FICHERO_ORDEN), mmap_mode='r')
+        self.timestamps = np.load(os.path.join(almacen.ruta, FICHERO_TIMESTAMPS), mmap_mode='r')
+
+    def _ventana(self, t0, t1) -> slice:
+        """Posiciones del índice ordenado cuyos timestamps caen en [t0, t1)."""
+        inicio = 0 if t0 is None else int(np.searchsorted(self.timestamps, a_epoch(t0), side='left'))
+        fin = len(self.timestamps) if t1 is None else int(np.searchsorted(self.timestamps, a_epoch(t1), side='left'))
+        return slice(inicio, max(inicio, fin))
+
+    def filas(self, t0=None, t1=None, usuario: int = None, localizacion: int = None) -> np.ndarray:
+        """
+        Filas del almacén (en orden temporal) dentro de la ventana. El filtro
+        por usuario o por location_id solo recorre las filas de la ventana.
+        """
+        filas = np.asarray(self.orden[self._ventana(t0, t1)])
+        if usuario is not None:
+            filas = filas[np.asarray(self.almacen.usuario)[filas] == usuario]
+        if localizacion is not None:
+            interno = np.searchsorted(self.almacen.ids_localizacion, localizacion)
+            if interno >= len(self.almacen.ids_localizacion) or self.almacen.ids_localizacion[interno] != localizacion:
+                return filas[:0]
+            filas = filas[np.asarray(self.almacen.localizacion)[filas] == interno]
+        return filas
+
+    def contar(self, t0=None, t1=None, usuario: int = None, localizacion: int = None) -> int:
+        """Número de check-ins en la ventana (sin filtros, solo dos búsquedas binarias)."""
+        if usuario is None and localizacion is None:
+            ventana = self._ventana(t0, t1)
+            return ventana.stop - ventana.start
+        return len(self.filas(t0, t1, usuario, localizacion))
+
+    def listar(self, t0=None, t1=None, usuario: int = None, localizacion: int = None):
+        """Check-ins de la ventana como DataFrame con las columnas de generate_individual_maps.py."""
+        return self.almacen.a_dataframe(filas=self.filas(t0, t1, usuario, localizacion))
+
+# =============================================================================
+# FUNCIÓN: abrir_indice_temporal
+# =============================================================================
+def abrir_indice_temporal(ruta: str) -> IndiceTemporal:
+    """Abre el índice de un fichero de texto o de un almacén (los construye si faltan)."""
+    return IndiceTemporal(abrir_almacen(ruta, construir=True))
+
+# =============================================================================
+# PUNTO DE ENTRADA
+# =============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Consulta de check-ins por ventana temporal.")
+    parser.add_argument("fichero", help="Fichero <Ciudad>Gowalla.txt o directorio de su almacén")
+    parser.add_argument("--desde", default=None, help="Inicio de la ventana (incluido), p. ej. 2010-07-01")
+    parser.add_argument("--hasta", default=None, help="Fin de la ventana (excluido), p. ej. 2010-08-01")
+    parser.add_argument("--usuario", type=int, default=None, help="Filtrar por id de usuario")
+    parser.add_argument("--localizacion", type=int, default=None, help="Filtrar por location_id")
+    parser.add_argument("--listar", action="store_true", help="Mostrar los check-ins, no solo el número")
+    args = parser.parse_args()
+
+    indice = abrir_indice_temporal(args.fichero)
+    print(f"Check-ins en [{args.desde or 'inicio'}, {args.hasta or 'fin'}): "
+          f"{indice.contar(args.desde, args.hasta, args.usuario, args.localizacion)}")
+    if args.listar:
+        print(indice.listar(args.desde, args.hasta, args.usuario, args.localizacion).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: indice_usuarios.py
+# DESCRIPCIÓN: Índice usuario -> rango de filas del almacén columnar. Las filas
+#              se agrupan por usuario y, dentro de cada usuario, se ordenan por
+#              timestamp; así los check-ins de un usuario se cargan en
+#              O(log U + filas del usuario) sin leer el resto de la ciudad.
+# USO: python indice_usuarios.py DatasetsGowalla/ElPasoGowalla.txt [--usuario U]
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import argparse
+import os
+
+import numpy as np
+
+from almacen_checkins import abrir_almacen, borrar_meta, guardar_array, guardar_meta
+
+# Ficheros del índice dentro del directorio del almacén
+FICHERO_ORDEN = "orden_usuario.npy"
+FICHERO_USUARIOS = "usuarios_indice.npy"
+FICHERO_INICIOS = "usuarios_inicio.npy"
+FICHERO_META = "usuarios_meta.json"
+
+# =============================================================================
+# FUNCIÓN: construir_indice_usuarios
+# =============================================================================
+def construir_indice_usuarios(almacen) -> None:
+    """
+    Guarda la permutación de filas ordenada por (usuario, timestamp), los ids
+    de usuario distintos y dónde empieza el bloque de cada uno. La meta se
+    escribe la última y marca el índice como completo.
+    """
+    borrar_meta(os.path.join(almacen.ruta, FICHERO_META))
+    usuarios = np.asarray(almacen.usuario)
+    orden = np.lexsort((np.asarray(almacen.timestamp), usuarios)).astype(np.int64)
+    ids, inicios = np.unique(usuarios[orden], return_index=True)
+    inicios = np.append(inicios, len(orden)).astype(np.int64)
+
+    guardar_array(os.path.join(almacen.ruta, FICHERO_ORDEN), orden)
+    guardar_array(os.path.join(almacen.ruta, FICHERO_USUARIOS), ids.astype(np.int64))
+    guardar_array(os.path.join(almacen.ruta, FICHERO_INICIOS), inicios)
+    guardar_meta(os.path.join(almacen.ruta, FICHERO_META), {'filas': int(len(orden)), 'usuarios': int(len(ids))})
+
+# =============================================================================
+# CLASE: IndiceUsuarios
+# =============================================================================
+class IndiceUsuarios:
+    """Acceso a los check-ins de un usuario concreto a través del índice."""
+
+    def __init__(self, almacen):
+        self.almacen = almacen
+        if not os.path.exists(os.path.join(almacen.ruta, FICHERO_META)):
+            construir_indice_usuarios(almacen)
+        self.orden = np.load(os.path.join(almacen.ruta, FICHERO_ORDEN), mmap_mode='r')
+        self.usuarios = np.load(os.path.join(almacen.ruta, FICHERO_USUARIOS), mmap_mode='r')
+        self.inicios = np.load(os.path.join(almacen.ruta, FICHERO_INICIOS), mmap_mode='r')
+
+    def filas(self, usuario: int) -> np.ndarray:
+        """Filas del almacén del usuario, en orden temporal (vacío si no existe)."""
+        posicion = int(np.searchsorted(self.usuarios, usuario))
+        if posicion >= len(self.usuarios) or self.usuarios[posicion] != usuario:
+            return np.empty(0, dtype=np.int64)
+        return np.asarray(self.orden[self.inicios[posicion]:self.inicios[posicion + 1]])
+
+    def visitas(self) -> tuple:
+        """(ids de usuario, número de check-ins de cada uno) sin recorrer las filas."""
+        return np.asarray(self.usuarios), np.diff(self.inicios)
+
+    def checkins(self, usuario: int):
+        """DataFrame con los check-ins del usuario (columnas de generate_individual_maps.py)."""
+        return self.almacen.a_dataframe(filas=self.filas(usuario))
+
+# =============================================================================
+# FUNCIÓN: abrir_indice_usuarios
+# =============================================================================
+def abrir_indice_usuarios(ruta: str) -> IndiceUsuarios:
+    """Abre el índice de un fichero de texto o de un almacén (los construye si faltan)."""
+    return IndiceUsuarios(abrir_almacen(ruta, construir=True))
+
+# =============================================================================
+# PUNTO DE ENTRADA
+# =============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Construye o consulta el índice de usuarios.")
+    parser.add_argument("fichero", help="Fichero <Ciudad>Gowalla.txt o directorio de su almacén")
+    parser.add_argument("--usuario", type=int, default=None, help="Mostrar los check-ins de este usuario")
+    args = parser.parse_args()
+
+    indice = abrir_indice_usuarios(args.fichero)
+    print(f"[OK] Índice de usuarios listo: {len(indice.usuarios)} usuarios")
+    if args.usuario is not None:
+        print(indice.checkins(args.usuario).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
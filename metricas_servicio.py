@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: metricas_servicio.py
+# DESCRIPCIÓN: Instrumentación del servicio Flask con métricas en formato
+#              Prometheus. Por cada petición registra, por ruta, el tiempo real,
+#              el tiempo de CPU del hilo que la atiende, el aumento del pico de
+#              memoria residente (RSS) del proceso y las recolecciones del
+#              recolector de basura. Con fase() se miden además las fases
+#              internas de los cálculos pesados (carga de datos, entrenamiento,
+#              predicción, gráfico, guardado del PNG). Con varios procesos
+#              (METRICS_MULTIPROC_DIR, ver gunicorn_config.py) cada uno vuelca
+#              sus contadores e histogramas en ese directorio y /metrics los
+#              suma, sea cual sea el worker que atienda la petición.
+# USO: Lo importa app.py, que expone las métricas en GET /metrics
+#      En src/model.py:  from metricas_servicio import fase
+#                        with fase('fit', 'train_and_evaluate'): model.fit(X, y)
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import gc
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # resource solo existe en Unix: sin él no se mide el pico de RSS
+    resource = None
+
+# Cubos de los histogramas: segundos (tiempo real y de CPU) y bytes (memoria)
+CUBOS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CUBOS_BYTES = (0, 1 << 20, 4 << 20, 16 << 20, 64 << 20, 256 << 20, 1 << 30)
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Directorio compartido por los procesos del servidor (None: un solo proceso)
+# y segundos mínimos entre dos volcados del registro de un proceso
+DIRECTORIO_MULTIPROCESO = os.environ.get('METRICS_MULTIPROC_DIR')
+INTERVALO_VOLCADO = 1.0
+
+# =============================================================================
+# CLASE: RegistroMetricas
+# =============================================================================
+class RegistroMetricas:
+    """
+    Contadores, histogramas y medidas instantáneas con etiquetas, seguros
+    entre hilos. Cada proceso tiene su propio registro; estado() y combinar()
+    permiten sumar los contadores e histogramas de varios procesos.
+    """
+
+    def __init__(self):
+        self._cerrojo = threading.Lock()
+        self._ayudas = {}
+        self._tipos = {}
+        self._cubos = {}
+        self._contadores = {}
+        self._histogramas = {}
+        self._medidas = {}
+
+    def _declarar(self, nombre: str, tipo: str, ayuda: str):
+        self._tipos.setdefault(nombre, tipo)
+        self._ayudas.setdefault(nombre, ayuda)
+
+    def incrementar(self, nombre: str, ayuda: str, valor: float = 1, **etiquetas):
+        with self._cerrojo:
+            self._declarar(nombre, 'counter', ayuda)
+            clave = (nombre, tuple(sorted(etiquetas.items())))
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def observar(self, nombre: str, ayuda: str, valor: float, cubos: tuple = CUBOS_SEGUNDOS, **etiquetas):
+        with self._cerrojo:
+            self._declarar(nombre, 'histogram', ayuda)
+            cubos = self._cubos.setdefault(nombre, cubos)
+            clave = (nombre, tuple(sorted(etiquetas.items())))
+            conteos, suma = self._histogramas.get(clave, ([0] * (len(cubos) + 1), 0.0))
+            indice = next((i for i, limite in enumerate(cubos) if valor <= limite), len(cubos))
+            conteos[indice] += 1
+            self._histogramas[clave] = (conteos, suma + valor)
+
+    def fijar(self, nombre: str, ayuda: str, valor: float, **etiquetas):
+        with self._cerrojo:
+            self._declarar(nombre, 'gauge', ayuda)
+            self._medidas[(nombre, tuple(sorted(etiquetas.items())))] = valor
+
+    def estado(self) -> dict:
+        """Contadores e histogramas del registro en un dict serializable a JSON."""
+        with self._cerrojo:
+            return {
+                'tipos': dict(self._tipos), 'ayudas': dict(self._ayudas), 'cubos': dict(self._cubos),
+                'contadores': [[n, etiquetas, valor] for (n, etiquetas), valor in self._contadores.items()],
+                'histogramas': [[n, etiquetas, list(conteos), suma]
+                                for (n, etiquetas), (conteos, suma) in self._histogramas.items()],
+            }
+
+    def medidas(self) -> list:
+        """(nombre, ayuda, valor, etiquetas) de cada medida instantánea."""
+        with self._cerrojo:
+            return [(nombre, self._ayudas[nombre], valor, dict(etiquetas))
+                    for (nombre, etiquetas), valor in self._medidas.items()]
+
+    def combinar(self, estado: dict):
+        """Suma a este registro los contadores e histogramas de un estado() de otro proceso."""
+        with self._cerrojo:
+            for nombre, tipo in estado['tipos'].items():
+                if tipo != 'gauge':
+                    self._declarar(nombre, tipo, estado['ayudas'][nombre])
+            for nombre, cubos in estado['cubos'].items():
+                self._cubos.setdefault(nombre, tuple(cubos))
+            for nombre, etiquetas, valor in estado['contadores']:
+                clave = (nombre, tuple(tuple(par) for par in etiquetas))
+                self._contadores[clave] = self._contadores.get(clave, 0) + valor
+            for nombre, etiquetas, conteos, suma in estado['histogramas']:
+                clave = (nombre, tuple(tuple(par) for par in etiquetas))
+                previos, suma_previa = self._histogramas.get(clave, ([0] * len(conteos), 0.0))
+                self._histogramas[clave] = ([a + b for a, b in zip(previos, conteos)], suma_previa + suma)
+
+    def exportar(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus."""
+        def etiquetas_texto(etiquetas, extra=()):
+            pares = [*etiquetas, *extra]
+            if not pares:
+                return ''
+            return '{' + ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                                  for k, v in pares) + '}'
+
+        lineas = []
+        with self._cerrojo:
+            for nombre in sorted(self._tipos):
+                lineas.append(f'# HELP {nombre} {self._ayudas[nombre]}')
+                lineas.append(f'# TYPE {nombre} {self._tipos[nombre]}')
+                for (n, etiquetas), valor in sorted(self._contadores.items()):
+                    if n == nombre:
+                        lineas.append(f'{nombre}{etiquetas_texto(etiquetas)} {valor}')
+                for (n, etiquetas), valor in sorted(self._medidas.items()):
+                    if n == nombre:
+                        lineas.append(f'{nombre}{etiquetas_texto(etiquetas)} {valor}')
+                for (n, etiquetas), (conteos, suma) in sorted(self._histogramas.items()):
+                    if n != nombre:
+                        continue
+                    acumulado = 0
+                    for limite, conteo in zip((*self._cubos[nombre], '+Inf'), conteos):
+                        acumulado += conteo
+                        lineas.append(f'{nombre}_bucket{etiquetas_texto(etiquetas, [("le", limite)])} {acumulado}')
+                    lineas.append(f'{nombre}_sum{etiquetas_texto(etiquetas)} {suma}')
+                    lineas.append(f'{nombre}_count{etiquetas_texto(etiquetas)} {acumulado}')
+        return '\n'.join(lineas) + '\n'
+
+
+# Registro del proceso
+registro = RegistroMetricas()
+# Hay métricas sin volcar / (pid, hilo que las vuelca)
+_cambios = threading.Event()
+_volcador = None
+
+# =============================================================================
+# FUNCIONES AUXILIARES
+# =============================================================================
+def pico_rss() -> int:
+    """Pico de memoria residente del proceso en bytes (ru_maxrss está en KB en Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource else 0
+
+
+def recolecciones_gc() -> list:
+    """Recolecciones hechas hasta ahora por cada generación del recolector."""
+    return [generacion['collections'] for generacion in gc.get_stats()]
+
+
+def volcar_metricas(forzar: bool = False):
+    """
+    Escribe el estado del registro de este proceso en DIRECTORIO_MULTIPROCESO.
+    Sin 'forzar' solo marca el registro como cambiado: un hilo del proceso lo
+    escribe como mucho cada INTERVALO_VOLCADO segundos. Se escribe a un
+    temporal y se renombra: quien suma nunca lee un fichero a medias.
+    """
+    global _volcador
+    if DIRECTORIO_MULTIPROCESO is None:
+        return
+    if not forzar:
+        _cambios.set()
+        # El hilo se crea en cada proceso (los workers nacen de un fork sin él)
+        if _volcador is None or _volcador[0] != os.getpid():
+            _volcador = (os.getpid(), threading.Thread(target=_volcar_periodicamente, daemon=True))
+            _volcador[1].start()
+        return
+    _cambios.clear()
+    destino = os.path.join(DIRECTORIO_MULTIPROCESO, f"metricas_{os.getpid()}.json")
+    temporal = f"{destino}.{threading.get_ident()}.tmp"
+    os.makedirs(DIRECTORIO_MULTIPROCESO, exist_ok=True)
+    with open(temporal, "w") as f:
+        json.dump(registro.estado(), f)
+    os.replace(temporal, destino)
+
+
+def _volcar_periodicamente():
+    while True:
+        _cambios.wait()
+        time.sleep(INTERVALO_VOLCADO)
+        volcar_metricas(forzar=True)
+
+# =============================================================================
+# FUNCIÓN: fase
+# =============================================================================
+@contextmanager
+def fase(nombre: str, funcion: str = ''):
+    """
+    Mide el tiempo real de una fase de un cálculo (por ejemplo 'load', 'fit',
+    'predict', 'plot', 'save_png' dentro de 'train_and_evaluate').
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registro.observar('model_phase_duration_seconds', 'Wall time of the internal phases of heavy calls.',
+                          time.perf_counter() - inicio, function=funcion, phase=nombre)
+
+# =============================================================================
+# FUNCIÓN: instrumentar
+# =============================================================================
+def instrumentar(app):
+    """
+    Registra en 'app' los ganchos que miden cada petición. La ruta se anota
+    con su patrón (/statistics/<dataset>), no con la URL concreta, para que
+    el número de series no crezca con los parámetros.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _inicio_peticion():
+        g.metricas_inicio = (time.perf_counter(), time.thread_time(), pico_rss(), recolecciones_gc())
+
+    @app.after_request
+    def _fin_peticion(respuesta):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is None:
+            return respuesta
+        real, cpu, rss, gc_antes = inicio
+        ruta = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        etiquetas = {'method': request.method, 'route': ruta}
+
+        registro.incrementar('flask_http_requests_total', 'Requests served.',
+                             status=respuesta.status_code, **etiquetas)
+        registro.observar('flask_http_request_duration_seconds', 'Wall time per request.',
+                          time.perf_counter() - real, **etiquetas)
+        registro.observar('flask_http_request_cpu_seconds', 'CPU time of the thread serving the request.',
+                          time.thread_time() - cpu, **etiquetas)
+        registro.observar('flask_http_request_peak_rss_delta_bytes', 'Growth of the process peak RSS per request.',
+                          pico_rss() - rss, cubos=CUBOS_BYTES, **etiquetas)
+        for generacion, (antes, despues) in enumerate(zip(gc_antes, recolecciones_gc())):
+            if despues > antes:
+                registro.incrementar('flask_http_request_gc_collections_total',
+                                     'Garbage collections during requests.', despues - antes,
+                                     generation=generacion, route=ruta)
+        volcar_metricas()
+        return respuesta
+
+
+def exportar_metricas(rss: float = None) -> str:
+    """
+    Texto de /metrics: las métricas del registro más el estado actual del
+    proceso (RSS en bytes si se indica, y recolecciones por generación).
+    Con DIRECTORIO_MULTIPROCESO los contadores e histogramas son la suma de
+    los de todos los procesos (incluidos los workers ya reciclados); las
+    medidas instantáneas son las del proceso que responde.
+    """
+    if rss is not None:
+        registro.fijar('process_resident_memory_bytes', 'Resident memory of the process.', rss)
+    for generacion, recolecciones in enumerate(recolecciones_gc()):
+        registro.fijar('python_gc_collections', 'Garbage collections since the process started.',
+                       recolecciones, generation=generacion)
+    if DIRECTORIO_MULTIPROCESO is None:
+        return registro.exportar()
+
+    volcar_metricas(forzar=True)
+    total = RegistroMetricas()
+    for fichero in sorted(glob.glob(os.path.join(DIRECTORIO_MULTIPROCESO, "metricas_*.json"))):
+        try:
+            with open(fichero) as f:
+                total.combinar(json.load(f))
+        except (OSError, ValueError):
+            continue  # un proceso que terminó a medias no impide exportar el resto
+    for nombre, ayuda, valor, etiquetas in registro.medidas():
+        total.fijar(nombre, ayuda, valor, **etiquetas)
+    return total.exportar()
@@ -6,7 +6,7 @@
 # DESCRIPCIÓN: Script para realizar peticiones automáticas al servicio Flask
 #              y descargar las imágenes generadas por el entrenamiento
 #              CUMPLE CON TODOS LOS REQUISITOS DEL CUARTO EJERCICIO
-# USO: python peticiones_request.py
+# USO: python peticiones_request.py [--concurrencia N] [--reintentos N]
 # AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
 # FECHA: Noviembre 2025
 # =============================================================================
@@ -15,7 +15,11 @@ import requests
 import os
 import time
 import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import sys
 
 # =============================================================================
@@ -30,10 +34,55 @@ URL_BASE = f"http://{IP_ALPINE}:{PUERTO}"
 # Directorio para guardar imágenes descargadas
 DIRECTORIO_IMAGENES = "imagenes_descargadas"
 
+# Cliente concurrente: peticiones simultáneas, reintentos y descarga por trozos
+CONCURRENCIA = 4            # Peticiones de entrenamiento en paralelo
+REINTENTOS = 3              # Reintentos ante errores de conexión o 429/5xx
+ESPERA_REINTENTO = 0.5      # Espera base entre reintentos (0.5 s, 1 s, 2 s...)
+TAM_TROZO = 64 * 1024       # Bytes por trozo al guardar una imagen en disco
+
+# =============================================================================
+# FUNCIÓN: crear_sesion
+# =============================================================================
+def crear_sesion(concurrencia: int = CONCURRENCIA, reintentos: int = REINTENTOS) -> requests.Session:
+    """
+    Crea una sesión HTTP que reutiliza las conexiones (keep-alive) en lugar de
+    abrir una conexión TCP nueva en cada petición.
+
+    El pool admite tantas conexiones simultáneas como peticiones concurrentes.
+    Los fallos de conexión y las respuestas 429/500/502/503/504 se reintentan
+    con espera exponencial (respetando la cabecera Retry-After del servidor),
+    lo que sustituye a las pausas fijas entre peticiones.
+
+    Parámetros:
+    -----------
+    concurrencia : int, opcional
+        Conexiones que se mantienen abiertas con el servidor
+    reintentos : int, opcional
+        Número máximo de reintentos por petición
+
+    Retorna:
+    --------
+    requests.Session
+        Sesión lista para usar desde varios hilos
+    """
+    reintento = Retry(
+        total=reintentos,
+        backoff_factor=ESPERA_REINTENTO,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,  # También POST: repetir un entrenamiento da el mismo resultado
+        raise_on_status=False,
+    )
+    adaptador = HTTPAdapter(pool_connections=concurrencia, pool_maxsize=concurrencia, max_retries=reintento)
+
+    sesion = requests.Session()
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    return sesion
+
 # =============================================================================
 # FUNCIÓN: verificar_conexion
 # =============================================================================
-def verificar_conexion(url_base: str, timeout: int = 10) -> bool:
+def verificar_conexion(url_base: str, timeout: int = 10, sesion: requests.Session = None) -> bool:
     """
     Verifica si es posible establecer conexión con el servidor Flask.
     
@@ -46,6 +95,8 @@ def verificar_conexion(url_base: str, timeout: int = 10) -> bool:
         URL base del servidor Flask (ej: "http://localhost:5000")
     timeout : int, opcional
         Tiempo máximo de espera para la conexión (por defecto 10 segundos)
+    sesion : requests.Session, opcional
+        Sesión con conexiones reutilizables (por defecto, una conexión nueva)
     
     Retorna:
     --------
@@ -57,7 +108,7 @@ def verificar_conexion(url_base: str, timeout: int = 10) -> bool:
         
         # Realizar una petición GET simple al servidor Flask
         # El método GET es para "obtener/consultar datos" según el enunciado
-        respuesta = requests.get(url_base, timeout=timeout)
+        respuesta = (sesion or requests).get(url_base, timeout=timeout)
         
         # Mostrar información de la respuesta (según lo pedido en el enunciado)
         print(f"[INFO] Status code: {respuesta.status_code}")
@@ -86,7 +137,7 @@ def verificar_conexion(url_base: str, timeout: int = 10) -> bool:
 # =============================================================================
 # FUNCIÓN: descargar_imagen
 # =============================================================================
-def descargar_imagen(url_imagen: str, nombre_archivo: str) -> bool:
+def descargar_imagen(url_imagen: str, nombre_archivo: str, sesion: requests.Session = None) -> bool:
     """
     Descarga una imagen desde una URL y la guarda en el sistema de archivos local.
     
@@ -99,6 +150,8 @@ def descargar_imagen(url_imagen: str, nombre_archivo: str) -> bool:
         URL completa de la imagen a descargar
     nombre_archivo : str
         Ruta y nombre del archivo donde se guardará la imagen localmente
+    sesion : requests.Session, opcional
+        Sesión con conexiones reutilizables (por defecto, una conexión nueva)
     
     Retorna:
     --------
@@ -110,32 +163,34 @@ def descargar_imagen(url_imagen: str, nombre_archivo: str) -> bool:
         
         # Realizar petición GET para descargar la imagen
         # El método GET es para "obtener/consultar datos" - en este caso, la imagen
-        respuesta = requests.get(url_imagen, timeout=30)
-        
-        # Mostrar información de la respuesta (según lo pedido en el enunciado)
-        print(f"[INFO] Status code de descarga: {respuesta.status_code}")
-        
-        # Verificar que la petición fue exitosa (código 200 OK)
-        if respuesta.status_code == 200:
-            # Abrir archivo en modo binario de escritura ('wb')
-            # Las imágenes son archivos binarios, por eso usamos 'wb'
-            with open(nombre_archivo, 'wb') as f:
-                # Escribir el contenido binario de la imagen en el archivo
-                # response.content contiene el contenido binario de la respuesta
-                f.write(respuesta.content)
+        # Con stream=True el cuerpo no se carga entero en memoria: se lee por trozos
+        with (sesion or requests).get(url_imagen, timeout=30, stream=True) as respuesta:
             
-            # Verificar que el archivo se creó correctamente
-            if os.path.exists(nombre_archivo):
-                tamano = os.path.getsize(nombre_archivo)
-                print(f"[OK] Imagen descargada correctamente: {nombre_archivo} ({tamano} bytes)")
-                return True
-            else:
-                print(f"[ERROR] El archivo no se creó: {nombre_archivo}")
+            # Mostrar información de la respuesta (según lo pedido en el enunciado)
+            print(f"[INFO] Status code de descarga: {respuesta.status_code}")
+            
+            # Verificar que la petición fue exitosa (código 200 OK)
+            if respuesta.status_code != 200:
+                # La petición devolvió un código de error
+                print(f"[ERROR] Error al descargar imagen: Código {respuesta.status_code}")
+                print(f"[DEBUG] Contenido de error: {respuesta.content[:200]}")
                 return False
+            
+            # Escribir la imagen por trozos en un fichero temporal ('wb': es binaria)
+            # y renombrarlo al terminar, para no dejar imágenes a medias
+            temporal = nombre_archivo + ".part"
+            with open(temporal, 'wb') as f:
+                for trozo in respuesta.iter_content(chunk_size=TAM_TROZO):
+                    f.write(trozo)
+            os.replace(temporal, nombre_archivo)
+        
+        # Verificar que el archivo se creó correctamente
+        if os.path.exists(nombre_archivo):
+            tamano = os.path.getsize(nombre_archivo)
+            print(f"[OK] Imagen descargada correctamente: {nombre_archivo} ({tamano} bytes)")
+            return True
         else:
-            # La petición devolvió un código de error
-            print(f"[ERROR] Error al descargar imagen: Código {respuesta.status_code}")
-            print(f"[DEBUG] Contenido de error: {respuesta.content[:200]}")
+            print(f"[ERROR] El archivo no se creó: {nombre_archivo}")
             return False
             
     except Exception as e:
@@ -146,7 +201,8 @@ def descargar_imagen(url_imagen: str, nombre_archivo: str) -> bool:
 # =============================================================================
 # FUNCIÓN: hacer_peticion_entrenamiento
 # =============================================================================
-def hacer_peticion_entrenamiento(url_base: str, datos: dict, numero_peticion: int) -> bool:
+def hacer_peticion_entrenamiento(url_base: str, datos: dict, numero_peticion: int,
+                                 sesion: requests.Session = None) -> bool:
     """
     Realiza una petición POST de entrenamiento al servidor Flask y descarga 
     la imagen de resultados generada.
@@ -169,6 +225,8 @@ def hacer_peticion_entrenamiento(url_base: str, datos: dict, numero_peticion: in
         }
     numero_peticion : int
         Número identificativo de la petición (para logs)
+    sesion : requests.Session, opcional
+        Sesión con conexiones reutilizables (por defecto, una conexión nueva)
     
     Retorna:
     --------
@@ -192,7 +250,7 @@ def hacer_peticion_entrenamiento(url_base: str, datos: dict, numero_peticion: in
         # Según el enunciado: response = requests.post(url, data=dictionary)
         # El parámetro 'data' envía los datos como formulario (x-www-form-urlencoded)
         # que es lo que espera request.form[] en Flask
-        respuesta = requests.post(url_entrenamiento, data=datos, timeout=60)
+        respuesta = (sesion or requests).post(url_entrenamiento, data=datos, timeout=60)
         
         # =====================================================================
         # ANÁLISIS DE LA RESPUESTA - Como pide el enunciado
@@ -243,7 +301,7 @@ def hacer_peticion_entrenamiento(url_base: str, datos: dict, numero_peticion: in
             # =============================================================
             print(f"   [INFO] Intentando descargar imagen...")
             
-            if descargar_imagen(url_imagen, nombre_local):
+            if descargar_imagen(url_imagen, nombre_local, sesion):
                 print(f"   [OK] Petición {numero_peticion} completada exitosamente")
                 print(f"        Imagen descargada: {nombre_local}")
                 return True
@@ -269,7 +327,7 @@ def hacer_peticion_entrenamiento(url_base: str, datos: dict, numero_peticion: in
                         print(f"   [INFO] Encontrada URL alternativa: {url_alternativa}")
                         
                         # Intentar descargar con la URL alternativa
-                        if descargar_imagen(url_alternativa, nombre_local):
+                        if descargar_imagen(url_alternativa, nombre_local, sesion):
                             return True
                 
                 print(f"   [ERROR] No se pudo descargar la imagen después de múltiples intentos")
@@ -293,7 +351,7 @@ def hacer_peticion_entrenamiento(url_base: str, datos: dict, numero_peticion: in
 # =============================================================================
 # FUNCIÓN: ejecutar_pruebas_completas
 # =============================================================================
-def ejecutar_pruebas_completas(url_base: str):
+def ejecutar_pruebas_completas(url_base: str, concurrencia: int = CONCURRENCIA, sesion: requests.Session = None):
     """
     Ejecuta pruebas automáticas variando train_size de 0.1 a 0.9
     y test_size de 0.9 a 0.1, usando Random Forest.
@@ -303,10 +361,19 @@ def ejecutar_pruebas_completas(url_base: str):
     
     Esto da 9 combinaciones donde train_size + test_size = 1.0
     
+    Las peticiones se lanzan en paralelo (hasta 'concurrencia' a la vez) sobre
+    una sesión con conexiones reutilizables, de modo que los entrenamientos y
+    las descargas de imágenes se solapan. Con concurrencia 1 se ejecutan en
+    orden, una detrás de otra.
+    
     Parámetros:
     -----------
     url_base : str
         URL base del servidor Flask
+    concurrencia : int, opcional
+        Peticiones simultáneas (por defecto CONCURRENCIA)
+    sesion : requests.Session, opcional
+        Sesión HTTP a usar (por defecto se crea una con crear_sesion)
     """
     print("\n" + "="*70)
     print("EJECUTANDO PRUEBAS AUTOMÁTICAS - CUARTO EJERCICIO")
@@ -339,9 +406,8 @@ def ejecutar_pruebas_completas(url_base: str):
     dataset = "iris"          # Podría ser cualquier dataset, usamos iris como ejemplo
     modelo = "RandomForest"   # ENUNCIADO: "con random forest"
     
-    # Contadores para estadísticas
-    contador_exitos = 0
-    contador_total = 0
+    # Sesión con keep-alive y reintentos compartida por todas las peticiones
+    sesion = sesion or crear_sesion(concurrencia)
     
     # =========================================================================
     # BUCLE PRINCIPAL DE PRUEBAS
@@ -349,8 +415,10 @@ def ejecutar_pruebas_completas(url_base: str):
     print(f"\nTotal de combinaciones a probar: {len(train_sizes)}")
     print(f"Dataset: {dataset}")
     print(f"Modelo: {modelo}")
+    print(f"Peticiones simultáneas: {concurrencia}")
     print("-"*50)
     
+    peticiones = []
     for i, (train_size, test_size) in enumerate(zip(train_sizes, test_sizes), 1):
         
         # Mostrar información de la combinación actual
@@ -370,22 +438,23 @@ def ejecutar_pruebas_completas(url_base: str):
             'test_size': test_size     # Float - Flask lo convertirá a string
         }
         
-        # Realizar petición de entrenamiento y descargar imagen
-        exito = hacer_peticion_entrenamiento(url_base, datos, i)
-        
-        # Actualizar contadores
-        if exito:
-            contador_exitos += 1
-        contador_total += 1
-        
-        # =====================================================================
-        # PAUSA ENTRE PETICIONES
-        # =====================================================================
-        # Pausa para evitar sobrecargar el servidor
-        # y dar tiempo a que se procese cada entrenamiento
-        if i < len(train_sizes):  # No pausar después de la última
-            print(f"\n[INFO] Pausa de 3 segundos antes de la siguiente petición...")
-            time.sleep(3)
+        peticiones.append((datos, i))
+    
+    # =====================================================================
+    # EJECUCIÓN CONCURRENTE
+    # =====================================================================
+    # Cada hilo hace su petición de entrenamiento y descarga su imagen. No hay
+    # pausas fijas: si el servidor está saturado (503 con Retry-After) o falla
+    # la conexión, la sesión reintenta con espera exponencial
+    inicio = time.time()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        resultados = list(pool.map(lambda peticion: hacer_peticion_entrenamiento(url_base, *peticion, sesion),
+                                   peticiones))
+    duracion = time.time() - inicio
+    
+    # Contadores para estadísticas
+    contador_exitos = sum(resultados)
+    contador_total = len(resultados)
     
     # =========================================================================
     # RESUMEN ESTADÍSTICO
@@ -396,6 +465,7 @@ def ejecutar_pruebas_completas(url_base: str):
     print(f"Total de peticiones realizadas: {contador_total}")
     print(f"Peticiones exitosas: {contador_exitos}")
     print(f"Peticiones fallidas: {contador_total - contador_exitos}")
+    print(f"Tiempo total: {duracion:.2f} segundos ({concurrencia} peticiones simultáneas)")
     
     if contador_total > 0:
         tasa_exito = (contador_exitos / contador_total) * 100
@@ -457,13 +527,28 @@ def generar_informe():
     - Modelo: RandomForest
     
     PARA EJECUTAR:
-    $ python peticiones_request.py
+    $ python peticiones_request.py [--concurrencia 4] [--reintentos 3]
     
     NOTA: Asegúrate de que el servidor Flask esté ejecutándose antes de correr este script.
     """
     
     print(informe)
 
+# =============================================================================
+# FUNCIÓN AUXILIAR: entero_minimo
+# =============================================================================
+def entero_minimo(minimo: int):
+    """
+    Tipo de argparse para enteros de al menos 'minimo' (un valor menor es un
+    error de uso, no un ValueError al crear el pool de hilos).
+    """
+    def entero(valor: str) -> int:
+        numero = int(valor)
+        if numero < minimo:
+            raise argparse.ArgumentTypeError(f"debe ser al menos {minimo}, no {numero}")
+        return numero
+    return entero
+
 # =============================================================================
 # FUNCIÓN PRINCIPAL: main
 # =============================================================================
@@ -482,17 +567,25 @@ def main():
     print(f"Combinaciones a probar: 9 (train_size de 0.1 a 0.9)")
     
     # Verificar argumentos de línea de comandos
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--help" or sys.argv[1] == "-h":
-            generar_informe()
-            return
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-h", "--help", action="store_true")
+    parser.add_argument("--concurrencia", type=entero_minimo(1), default=CONCURRENCIA,
+                        help="Peticiones simultáneas (1 = una detrás de otra)")
+    parser.add_argument("--reintentos", type=entero_minimo(0), default=REINTENTOS,
+                        help="Reintentos con espera exponencial ante fallos o 429/5xx")
+    args = parser.parse_args()
+    if args.help:
+        generar_informe()
+        return
+    print(f"Peticiones simultáneas: {args.concurrencia} (reintentos: {args.reintentos})")
+    sesion = crear_sesion(args.concurrencia, args.reintentos)
     
     # =========================================================================
     # VERIFICACIÓN INICIAL DE CONEXIÓN
     # =========================================================================
     print(f"\n[ETAPA 1] Verificando conexión con el servidor Flask...")
     
-    if not verificar_conexion(URL_BASE):
+    if not verificar_conexion(URL_BASE, sesion=sesion):
         print(f"\n[ERROR] No se pudo establecer conexión con {URL_BASE}")
         print(f"Posibles soluciones:")
         print(f"  1. Asegúrate de que el servidor Flask esté ejecutándose")
@@ -505,7 +598,7 @@ def main():
     # EJECUCIÓN DE PRUEBAS PRINCIPALES
     # =========================================================================
     print(f"\n[ETAPA 2] Ejecutando pruebas automáticas...")
-    ejecutar_pruebas_completas(URL_BASE)
+    ejecutar_pruebas_completas(URL_BASE, args.concurrencia, sesion)
     
     # =========================================================================
     # MENSAJE FINAL
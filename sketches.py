@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: sketches.py
+# DESCRIPCIÓN: Estructuras aproximadas de memoria constante para los datasets
+#              Gowalla. HyperLogLog estima el número de ids distintos con un
+#              error relativo configurable y SpaceSaving encuentra los ids más
+#              frecuentes (heavy hitters) con cotas de error garantizadas. Todos
+#              los sketches se pueden serializar y fusionar, de modo que los
+#              resultados por bloque o por ciudad se combinan sin releer los datos.
+# USO: python sketches.py a.hll b.hll ...   (fusiona y muestra la estimación)
+#      python sketches.py a.ss b.ss ...     (fusiona y muestra los más frecuentes)
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import io
+import math
+import sys
+
+import numpy as np
+
+# Constantes de splitmix64 para obtener un hash de 64 bits estable entre
+# procesos y ejecuciones (el hash() de Python no lo es)
+_MEZCLA_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MEZCLA_2 = np.uint64(0x94D049BB133111EB)
+_INCREMENTO = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash64(valores) -> np.ndarray:
+    """Hash splitmix64 vectorizado de un array de enteros."""
+    with np.errstate(over='ignore'):
+        h = np.asarray(valores).astype(np.uint64) + _INCREMENTO
+        h = (h ^ (h >> np.uint64(30))) * _MEZCLA_1
+        h = (h ^ (h >> np.uint64(27))) * _MEZCLA_2
+        return h ^ (h >> np.uint64(31))
+
+
+def _longitud_bits(valores: np.ndarray) -> np.ndarray:
+    """Número de bits significativos de cada uint64 (0 para el valor 0), exacto."""
+    longitud = np.zeros(len(valores), dtype=np.uint64)
+    for paso in (32, 16, 8, 4, 2, 1):
+        desplazamiento = longitud + np.uint64(paso)
+        mayor = (valores >> desplazamiento) != 0
+        longitud = np.where(mayor, desplazamiento, longitud)
+    return (longitud + (valores != 0)).astype(np.int64)
+
+# =============================================================================
+# CLASE: HyperLogLog
+# =============================================================================
+class HyperLogLog:
+    """
+    Estimador HyperLogLog de cardinalidad. Usa m = 2^precision registros de un
+    byte, con un error estándar de 1.04 / sqrt(m) independientemente del
+    número de elementos.
+
+    Parámetros:
+    -----------
+    error : float, opcional
+        Error relativo estándar deseado (por defecto 1%, unos 16 KB)
+    precision : int, opcional
+        Número de bits de índice; si se indica, tiene prioridad sobre 'error'
+    """
+
+    PRECISION_MIN = 4
+    PRECISION_MAX = 18
+
+    def __init__(self, error: float = 0.01, precision: int = None):
+        if precision is None:
+            precision = math.ceil(math.log2((1.04 / error) ** 2))
+        if not self.PRECISION_MIN <= precision <= self.PRECISION_MAX:
+            raise ValueError(f"Precisión {precision} fuera de rango "
+                             f"[{self.PRECISION_MIN}, {self.PRECISION_MAX}]")
+        self.precision = precision
+        self.registros = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def error_estandar(self) -> float:
+        return 1.04 / math.sqrt(len(self.registros))
+
+    def anadir(self, valores):
+        """Añade un array (o lista) de ids enteros."""
+        valores = np.asarray(valores)
+        if valores.size == 0:
+            return
+        h = hash64(valores.ravel())
+        bits_resto = np.uint64(64 - self.precision)
+        indices = (h >> bits_resto).astype(np.int64)
+        resto = h & np.uint64((1 << (64 - self.precision)) - 1)
+        # Posición del primer bit a 1 en los 64 - p bits restantes
+        rango = (64 - self.precision) - _longitud_bits(resto) + 1
+        np.maximum.at(self.registros, indices, rango.astype(np.uint8))
+
+    def estimar(self) -> int:
+        """Número estimado de elementos distintos añadidos."""
+        m = len(self.registros)
+        alfa = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimacion = alfa * m * m / np.sum(np.power(2.0, -self.registros.astype(np.float64)))
+        vacios = int(np.count_nonzero(self.registros == 0))
+        # Corrección para cardinalidades pequeñas: conteo lineal
+        if estimacion <= 2.5 * m and vacios:
+            estimacion = m * math.log(m / vacios)
+        return int(round(estimacion))
+
+    def __len__(self) -> int:
+        return self.estimar()
+
+    def fusionar(self, otro: "HyperLogLog") -> "HyperLogLog":
+        """Une otro sketch de la misma precisión a este (máximo por registro)."""
+        if otro.precision != self.precision:
+            raise ValueError("Solo se pueden fusionar sketches con la misma precisión")
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def a_bytes(self) -> bytes:
+        """Serializa el sketch: un byte de precisión seguido de los registros."""
+        return bytes([self.precision]) + self.registros.tobytes()
+
+    @classmethod
+    def desde_bytes(cls, datos: bytes) -> "HyperLogLog":
+        sketch = cls(precision=datos[0])
+        registros = np.frombuffer(datos, dtype=np.uint8, offset=1)
+        if len(registros) != len(sketch.registros):
+            raise ValueError("Sketch HyperLogLog corrupto")
+        sketch.registros[:] = registros
+        return sketch
+
+    def guardar(self, ruta: str):
+        with open(ruta, "wb") as f:
+            f.write(self.a_bytes())
+
+    @classmethod
+    def cargar(cls, ruta: str) -> "HyperLogLog":
+        with open(ruta, "rb") as f:
+            return cls.desde_bytes(f.read())
+
+# =============================================================================
+# CLASE: SpaceSaving
+# =============================================================================
+class SpaceSaving:
+    """
+    Resumen SpaceSaving de los ids más frecuentes con memoria fija: como mucho
+    'capacidad' contadores (id, conteo, error).
+
+    Garantías para cada id guardado: conteo - error <= frecuencia real <= conteo.
+    Cualquier id no guardado tiene una frecuencia real <= minimo(), y el error
+    de cualquier contador nunca supera total / capacidad.
+
+    Las actualizaciones y las fusiones usan la misma regla de "Mergeable
+    summaries" (Agarwal et al.): un id ausente en un resumen lleno cuenta como
+    el mínimo de ese resumen, y después se conservan los 'capacidad' mayores.
+    Un bloque de datos se añade como un resumen exacto más.
+    """
+
+    def __init__(self, capacidad: int = 10000):
+        if capacidad < 1:
+            raise ValueError("La capacidad de SpaceSaving debe ser al menos 1")
+        self.capacidad = capacidad
+        self.total = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.conteos = np.empty(0, dtype=np.int64)
+        self.errores = np.empty(0, dtype=np.int64)
+
+    def minimo(self) -> int:
+        """Cota superior de la frecuencia de cualquier id no guardado."""
+        return int(self.conteos.min()) if len(self.ids) >= self.capacidad else 0
+
+    def anadir(self, ids, conteos=None):
+        """Añade los ids de cada fila (o ids distintos con sus conteos)."""
+        if conteos is None:
+            ids, conteos = np.unique(np.asarray(ids, dtype=np.int64), return_counts=True)
+        # Un resumen exacto del bloque: con capacidad de sobra, su mínimo es 0
+        bloque = SpaceSaving(len(ids) + 1)
+        bloque.ids = np.asarray(ids, dtype=np.int64)
+        bloque.conteos = np.asarray(conteos, dtype=np.int64)
+        bloque.errores = np.zeros(len(ids), dtype=np.int64)
+        bloque.total = int(bloque.conteos.sum())
+        self.fusionar(bloque)
+
+    def fusionar(self, otro: "SpaceSaving") -> "SpaceSaving":
+        """Combina otro resumen con este conservando 'capacidad' contadores."""
+        minimo_a, minimo_b = self.minimo(), otro.minimo()
+        ids = np.union1d(self.ids, otro.ids)
+
+        def valores(resumen, minimo):
+            """Conteo y error de cada id de la unión en 'resumen' (el mínimo si no está)."""
+            if len(resumen.ids) == 0:
+                return np.full(len(ids), minimo), np.full(len(ids), minimo)
+            posicion = np.minimum(np.searchsorted(resumen.ids, ids), len(resumen.ids) - 1)
+            presente = resumen.ids[posicion] == ids
+            return (np.where(presente, resumen.conteos[posicion], minimo),
+                    np.where(presente, resumen.errores[posicion], minimo))
+
+        conteos_a, errores_a = valores(self, minimo_a)
+        conteos_b, errores_b = valores(otro, minimo_b)
+        conteos, errores = conteos_a + conteos_b, errores_a + errores_b
+
+        if len(ids) > self.capacidad:
+            quedan = np.sort(np.argpartition(-conteos, self.capacidad - 1)[:self.capacidad])
+            ids, conteos, errores = ids[quedan], conteos[quedan], errores[quedan]
+
+        self.ids, self.conteos, self.errores = ids, conteos.astype(np.int64), errores.astype(np.int64)
+        self.total += otro.total
+        return self
+
+    def a_bytes(self) -> bytes:
+        """Serializa el resumen en formato .npy (capacidad, total y contadores)."""
+        salida = io.BytesIO()
+        cabecera = np.array([[self.capacidad, self.total, 0]], dtype=np.int64)
+        np.save(salida, np.vstack((cabecera, np.column_stack((self.ids, self.conteos, self.errores)))),
+                allow_pickle=False)
+        return salida.getvalue()
+
+    @classmethod
+    def desde_bytes(cls, datos: bytes) -> "SpaceSaving":
+        tabla = np.load(io.BytesIO(datos), allow_pickle=False)
+        resumen = cls(int(tabla[0, 0]))
+        resumen.total = int(tabla[0, 1])
+        resumen.ids, resumen.conteos, resumen.errores = (np.ascontiguousarray(tabla[1:, i]) for i in range(3))
+        return resumen
+
+    def guardar(self, ruta: str):
+        with open(ruta, "wb") as f:
+            f.write(self.a_bytes())
+
+    @classmethod
+    def cargar(cls, ruta: str) -> "SpaceSaving":
+        with open(ruta, "rb") as f:
+            return cls.desde_bytes(f.read())
+
+# =============================================================================
+# PUNTO DE ENTRADA: fusionar sketches guardados
+# =============================================================================
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python sketches.py a.hll [b.hll ...]  |  python sketches.py a.ss [b.ss ...]")
+        sys.exit(1)
+
+    tipo = SpaceSaving if sys.argv[1].endswith(".ss") else HyperLogLog
+    total = tipo.cargar(sys.argv[1])
+    for ruta in sys.argv[2:]:
+        total.fusionar(tipo.cargar(ruta))
+
+    if tipo is HyperLogLog:
+        print(f"Elementos distintos (aprox.): {total.estimar()} (±{total.error_estandar:.1%})")
+    else:
+        orden = np.argsort(-total.conteos)[:20]
+        print(f"Ids más frecuentes (total {total.total}, cota de error {total.minimo()}):")
+        for i in orden:
+            print(f"  {total.ids[i]} {total.conteos[i]} ±{total.errores[i]}")
@@ -71,4 +71,75 @@ CON ESTE CÓDIGO:
 """
 NOTA: También se debe agregar la función auxiliar matrix_multiply
 en el mismo archivo src/model.py, fuera de la función compare_execution.
-"""
\ No newline at end of file
+"""
+
+# =============================================================================
+# MEDICIÓN DE FASES (métricas de /metrics, ver metricas_servicio.py)
+# =============================================================================
+"""
+EN EL ARCHIVO src/model.py, AÑADIR AL PRINCIPIO:
+
+    from metricas_servicio import fase
+
+Y ENVOLVER CADA FASE DE LOS CÁLCULOS PESADOS CON fase(<fase>, <función>):
+
+    def train_and_evaluate(dataset_name, model_name, train_size, test_size, result_name):
+        with fase('load', 'train_and_evaluate'):
+            ...  # carga del dataset y train_test_split
+        with fase('fit', 'train_and_evaluate'):
+            model.fit(X_train, y_train)
+        with fase('predict', 'train_and_evaluate'):
+            y_pred = model.predict(X_test)
+        with fase('plot', 'train_and_evaluate'):
+            ...  # figura de matplotlib
+        with fase('save_png', 'train_and_evaluate'):
+            plt.savefig(...)
+
+    De la misma forma en perform_eda ('load', 'plot', 'save_png') y en
+    generate_synthetic_dataset ('generate', 'fit', 'predict', 'plot', 'save_png').
+
+NOTA: Cada proceso tiene su propio registro de métricas. Las fases de los
+entrenamientos que se ejecutan en otros procesos (POST /train con async=1 y
+/sweep) no aparecen en el /metrics del servidor; sí su tiempo total por ruta.
+"""
+
+# =============================================================================
+# DATASETS EN MEMORIA COMPARTIDA (ver cache_datasets.py)
+# =============================================================================
+"""
+EN EL ARCHIVO src/model.py, AÑADIR AL PRINCIPIO:
+
+    import pandas as pd
+    from cache_datasets import cache_datasets, obtener_dataset
+
+EL REGISTRO DATASETS NO CAMBIA: cache_datasets.py lo importa la primera vez
+que hace falta cargar un dataset y guarda lo que devuelva su cargador
+(Bunch de scikit-learn, tupla (X, y) o DataFrame).
+
+EN train_and_evaluate, SUSTITUIR LA LLAMADA AL CARGADOR DE DATASETS[dataset_name]
+Y LA OBTENCIÓN DE X E y A PARTIR DE LO QUE DEVUELVE POR:
+
+    X, y = obtener_dataset(dataset_name)
+
+    X e y son de solo lectura (mmap): train_test_split y fit los copian al
+    dividir, pero cualquier código que los modifique en sitio debe hacer
+    antes X = X.copy().
+
+EN perform_eda Y get_dataset_statistics, QUE NECESITAN LA TABLA Y LOS NOMBRES
+DE COLUMNAS Y CLASES DEL Bunch, SUSTITUIR LA CARGA POR:
+
+    X, y = obtener_dataset(dataset_name)
+    meta = cache_datasets().meta(dataset_name)
+    df = X.copy() if hasattr(X, 'columns') else pd.DataFrame(X, columns=meta.get('feature_names'))
+    df['target'] = y
+    target_names = meta.get('target_names')   # None si el cargador no las daba
+
+    Y USAR df, meta['feature_names'] y target_names DONDE SE USABAN
+    data.frame / data.feature_names / data.target_names.
+
+NOTA: Si el cargador devuelve un DataFrame, obtener_dataset devuelve otro
+DataFrame con las mismas columnas y tipos (las de texto y las categóricas se
+conservan); si devuelve arrays, se devuelven arrays. Tras cambiar un cargador
+hay que vaciar la caché (python cache_datasets.py --limpiar) o seguirá
+sirviéndose la versión ya guardada.
+"""
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# ARCHIVO: teselas_densidad.py
+# DESCRIPCIÓN: Pirámide de densidad multirresolución de los check-ins de una
+#              ciudad. Para cada nivel de zoom se cuentan los check-ins en una
+#              rejilla lat/lon (un histograma 2D vectorizado, una sola vez) y se
+#              guarda como array de conteos dentro del almacén columnar. Servir
+#              el mapa de calor de una vista es cortar el array del nivel
+#              adecuado, sin recorrer las filas.
+# USO: python teselas_densidad.py DatasetsGowalla/*Gowalla.txt
+# AUTOR: Claudia Maria Lopez Bombin Y Gonzalo Velasco Lucas
+# FECHA: Noviembre 2025
+# =============================================================================
+
+import json
+import os
+import sys
+
+import numpy as np
+
+from almacen_checkins import abrir_almacen, borrar_meta, guardar_array, guardar_meta
+from indice_espacial import CELDAS_POR_TESELA
+
+# Niveles de la pirámide. Por encima de ZOOM_MAX se pintan check-ins sueltos
+# (ver POINTS_MIN_ZOOM en app.py)
+ZOOM_MIN = 0
+ZOOM_MAX = 13
+
+# Un nivel con más celdas no se construye (ni los siguientes, que son mayores)
+MAX_CELDAS_NIVEL = 1 << 24
+
+# Ficheros de la pirámide dentro del directorio del almacén
+FICHERO_META = "densidad_meta.json"
+PATRON_NIVEL = "densidad_{zoom}.npy"
+
+# =============================================================================
+# FUNCIONES AUXILIARES
+# =============================================================================
+def tam_celda(zoom: int) -> float:
+    """Lado de la celda en grados para un nivel de zoom (igual que IndiceEspacial.agregar)."""
+    return 360.0 / (2 ** zoom) / CELDAS_POR_TESELA
+
+# =============================================================================
+# FUNCIÓN: construir_piramide
+# =============================================================================
+def construir_piramide(almacen, zoom_min: int = ZOOM_MIN, zoom_max: int = ZOOM_MAX) -> dict:
+    """
+    Cuenta los check-ins de cada celda para cada nivel y guarda un array
+    uint32 por nivel (filas = latitud, columnas = longitud) que cubre solo la
+    extensión de los datos. Devuelve la meta: origen de cada nivel en celdas
+    absolutas (floor(coordenada / tam_celda)).
+    """
+    borrar_meta(os.path.join(almacen.ruta, FICHERO_META))
+    latitud = np.asarray(almacen.latitud, dtype=np.float64)
+    longitud = np.asarray(almacen.longitud, dtype=np.float64)
+    meta = {'zoom_min': zoom_min, 'zoom_max': zoom_min - 1, 'niveles': {}}
+
+    for zoom in range(zoom_min, zoom_max + 1):
+        tam = tam_celda(zoom)
+        fila = np.floor(latitud / tam).astype(np.int64)
+        columna = np.floor(longitud / tam).astype(np.int64)
+        fila0 = int(fila.min()) if len(fila) else 0
+        columna0 = int(columna.min()) if len(columna) else 0
+        forma = ((int(fila.max()) - fila0 + 1, int(columna.max()) - columna0 + 1) if len(fila) else (0, 0))
+        if forma[0] * forma[1] > MAX_CELDAS_NIVEL:
+            break
+
+        conteos = np.bincount((fila - fila0) * forma[1] + (columna - columna0),
+                              minlength=forma[0] * forma[1]).reshape(forma).astype(np.uint32)
+        guardar_array(os.path.join(almacen.ruta, PATRON_NIVEL.format(zoom=zoom)), conteos)
+        meta['niveles'][str(zoom)] = {'fila0': fila0, 'columna0': columna0}
+        meta['zoom_max'] = zoom
+
+    # La meta se escribe la última: sin ella la pirámide se considera incompleta
+    guardar_meta(os.path.join(almacen.ruta, FICHERO_META), meta)
+    return meta
+
+# =============================================================================
+# CLASE: PiramideDensidad
+# =============================================================================
+class PiramideDensidad:
+    """Acceso a los niveles de la pirámide (abiertos con mmap_mode='r')."""
+
+    def __init__(self, almacen):
+        self.almacen = almacen
+        try:
+            with open(os.path.join(almacen.ruta, FICHERO_META)) as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            self.meta = construir_piramide(almacen)
+        self._niveles = {}
+
+    def nivel(self, zoom: int) -> int:
+        """Nivel de la pirámide que se usa para un zoom del mapa."""
+        return min(max(int(zoom), self.meta['zoom_min']), self.meta['zoom_max'])
+
+    def conteos(self, zoom: int) -> np.ndarray:
+        """Array de conteos completo del nivel correspondiente a 'zoom'."""
+        zoom = self.nivel(zoom)
+        if zoom not in self._niveles:
+            self._niveles[zoom] = np.load(os.path.join(self.almacen.ruta, PATRON_NIVEL.format(zoom=zoom)),
+                                          mmap_mode='r')
+        return self._niveles[zoom]
+
+    def tesela(self, bbox: tuple, zoom: int) -> dict:
+        """
+        Conteos de las celdas que cortan bbox = (lon_min, lat_min, lon_max, lat_max)
+        en el nivel adecuado para 'zoom': un corte del array, sin copiar datos.
+        'lat0'/'lon0' son la esquina suroeste de la primera celda del corte.
+        """
+        zoom = self.nivel(zoom)
+        tam = tam_celda(zoom)
+        origen = self.meta['niveles'][str(zoom)]
+        conteos = self.conteos(zoom)
+        lon_min, lat_min, lon_max, lat_max = bbox
+
+        def rango(minimo, maximo, origen_celdas, limite):
+            inicio = min(max(int(np.floor(minimo / tam)) - origen_celdas, 0), limite)
+            fin = min(max(int(np.floor(maximo / tam)) - origen_celdas + 1, inicio), limite)
+            return inicio, fin
+
+        fila0, fila1 = rango(lat_min, lat_max, origen['fila0'], conteos.shape[0])
+        columna0, columna1 = rango(lon_min, lon_max, origen['columna0'], conteos.shape[1])
+        return {
+            'zoom': zoom,
+            'tam_celda': tam,
+            'lat0': (origen['fila0'] + fila0) * tam,
+            'lon0': (origen['columna0'] + columna0) * tam,
+            'conteos': conteos[fila0:fila1, columna0:columna1],
+        }
+
+    def puntos_calor(self, bbox: tuple, zoom: int) -> np.ndarray:
+        """Celdas no vacías de la tesela como filas [lat, lon, conteo] (centro de la celda)."""
+        tesela = self.tesela(bbox, zoom)
+        filas, columnas = np.nonzero(tesela['conteos'])
+        tam = tesela['tam_celda']
+        return np.column_stack((tesela['lat0'] + (filas + 0.5) * tam,
+                                tesela['lon0'] + (columnas + 0.5) * tam,
+                                tesela['conteos'][filas, columnas]))
+
+# =============================================================================
+# FUNCIÓN: abrir_piramide
+# =============================================================================
+def abrir_piramide(ruta: str) -> PiramideDensidad:
+    """Abre la pirámide de un fichero de texto o de un almacén (los construye si faltan)."""
+    return PiramideDensidad(abrir_almacen(ruta, construir=True))
+
+# =============================================================================
+# PUNTO DE ENTRADA: construir la pirámide de uno o varios ficheros
+# =============================================================================
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python teselas_densidad.py <Ciudad>Gowalla.txt [...]")
+        sys.exit(1)
+
+    for fichero in sys.argv[1:]:
+        almacen = abrir_almacen(fichero, construir=True)
+        meta = construir_piramide(almacen)
+        celdas = sum(np.load(os.path.join(almacen.ruta, PATRON_NIVEL.format(zoom=z)), mmap_mode='r').size
+                     for z in range(meta['zoom_min'], meta['zoom_max'] + 1))
+        print(f"[OK] {fichero}: niveles {meta['zoom_min']}-{meta['zoom_max']}, {celdas} celdas")
@@ -1,27 +1,232 @@
 # topn_selection_Claudia_Gonzalo.py
+import argparse
+import heapq
+import os
 import sys
 
+import numpy as np
+
+from escaner_bytes import bloques_mmap, detectar_campos, escanear_buffer, formatear_periodo, sumar_conteos
+from sketches import SpaceSaving
+
+# Rankings que se pueden calcular en una sola pasada
+RANKINGS = ('usuarios', 'localizaciones', 'usuarios_mes')
+
+# En 'usuarios_mes' la clave combina mes y usuario: (AAAAMM << 32) | usuario
+BITS_USUARIO = 32
+
+# Contadores por defecto de cada resumen SpaceSaving en modo aproximado
+CAPACIDAD_APROXIMADA = 10000
+
+# Los empates se deshacen por id, no por el orden de aparición en el fichero
+# (la versión original): así el resultado no depende del orden de lectura de
+# los bloques ni de si la entrada es texto o un almacén
+NOTA_EMPATES = "Con el mismo conteo, primero el id menor."
+USO = ("Uso: topn_selection_Claudia_Gonzalo.py <archivo> <n> <salida> [--incremental | --aproximado]\n"
+       "     topn_selection_Claudia_Gonzalo.py --ficheros F [F ...] --n N --salida PREFIJO [opciones]\n"
+       "Con un almacén columnar como <archivo> el conteo es exacto: no admite --incremental\n"
+       "ni --aproximado (que tampoco se pueden combinar entre sí).\n"
+       + NOTA_EMPATES)
+
+
+class ContadorTopN:
+    """
+    Conteo de apariciones por id entero. Los conteos se guardan como dos
+    arrays ordenados (ids, conteos) y se acumulan bloque a bloque; los N
+    mayores se seleccionan con un heap acotado a N elementos, sin ordenar
+    todos los ids.
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.conteos = np.empty(0, dtype=np.int64)
+
+    def anadir(self, ids, conteos=None):
+        """Añade los ids de cada fila (o ids distintos con sus conteos)."""
+        if conteos is None:
+            ids, conteos = np.unique(ids, return_counts=True)
+        self.ids, self.conteos = sumar_conteos(self.ids, self.conteos, ids, conteos)
+
+
+def seleccionar_top(pares, n):
+    """
+    Selecciona los n pares (id, conteo) con mayor conteo en O(U log n) con un
+    min-heap que nunca supera n elementos. Resultado de mayor a menor conteo
+    (en caso de empate, primero el id menor). Con n <= 0 no selecciona
+    nada (como la versión original, que escribía un fichero vacío).
+    """
+    if n <= 0:
+        return []
+    heap = []
+    for id_, conteo in pares:
+        elemento = (conteo, -id_)
+        if len(heap) < n:
+            heapq.heappush(heap, elemento)
+        elif elemento > heap[0]:
+            heapq.heapreplace(heap, elemento)
+    return [(-id_negado, conteo) for conteo, id_negado in sorted(heap, reverse=True)]
+
+
+def top_por_mes(contador, n):
+    """Separa las claves (mes, usuario) de 'usuarios_mes' y devuelve {mes: top n}."""
+    por_mes = {}
+    for clave, conteo in zip(contador.ids.tolist(), contador.conteos.tolist()):
+        por_mes.setdefault(clave >> BITS_USUARIO, []).append((clave, conteo))
+    return {formatear_periodo(mes): seleccionar_top(pares, n) for mes, pares in sorted(por_mes.items())}
+
+
+def formatear_linea(id_, count, error=None):
+    """'id conteo', y en modo aproximado 'id conteo ±error' (frecuencia real en [conteo - error, conteo])."""
+    if error is None:
+        return f"{id_} {count}\n"
+    return f"{id_} {count} ±{error}\n"
+
+
+def contar_usuarios_almacen(ruta):
+    """
+    Cuenta los check-ins por usuario a partir de un almacén columnar
+    (almacen_checkins.py) con np.bincount, sin parsear texto.
+    """
+    from almacen_checkins import abrir_almacen
+
+    conteos = np.bincount(abrir_almacen(ruta).usuario)
+    usuarios = np.flatnonzero(conteos)
+    return usuarios, conteos[usuarios]
+
+
+def contar_usuarios_incremental(archivo):
+    """
+    Cuenta los check-ins por usuario reutilizando el estado guardado junto al
+    fichero (estado_incremental.py): solo se analizan las líneas nuevas.
+    """
+    from estado_incremental import actualizar_estado
+
+    estado = actualizar_estado(archivo)
+    print(estado.informe(), file=sys.stderr)
+    return estado.usuarios, estado.conteos_usuarios
+
+
+def contar_ficheros(ficheros, rankings=RANKINGS, capacidad=None):
+    """
+    Recorre una sola vez cada fichero (texto por bytes o almacén columnar) y
+    acumula a la vez los conteos de todos los rankings pedidos.
+
+    Con 'capacidad' cada ranking usa un resumen SpaceSaving (sketches.py) de
+    memoria fija en lugar de conteos exactos de todos los ids.
+    """
+    contadores = {r: SpaceSaving(capacidad) if capacidad else ContadorTopN() for r in rankings}
+
+    for fichero in ficheros:
+        if os.path.isdir(fichero):
+            from almacen_checkins import abrir_almacen
+            almacen = abrir_almacen(fichero)
+            meses = np.asarray(almacen.timestamp).astype('datetime64[s]').astype('datetime64[M]')
+            partes = [{
+                'usuarios_filas': np.asarray(almacen.usuario, dtype=np.int64),
+                'localizaciones_filas': almacen.localizaciones_originales(),
+                'periodos_filas': (meses.astype(np.int64) // 12 + 1970) * 100 + meses.astype(np.int64) % 12 + 1,
+            }]
+        else:
+            campos = detectar_campos(fichero)
+            partes = (escanear_buffer(bloque, 'mes', campos) for bloque in bloques_mmap(fichero))
+
+        for parte in partes:
+            if 'usuarios' in contadores:
+                contadores['usuarios'].anadir(parte['usuarios_filas'])
+            if 'localizaciones' in contadores:
+                contadores['localizaciones'].anadir(parte['localizaciones_filas'])
+            if 'usuarios_mes' in contadores:
+                contadores['usuarios_mes'].anadir((parte['periodos_filas'] << BITS_USUARIO) | parte['usuarios_filas'])
+    return contadores
+
+
+def errores_contador(contador):
+    """{id: error} de un resumen SpaceSaving, o None si los conteos son exactos."""
+    if isinstance(contador, SpaceSaving):
+        return dict(zip(contador.ids.tolist(), contador.errores.tolist()))
+    return None
+
+
+def escribir_top(s, contador, n):
+    """Escribe en 's' los n ids con más apariciones de un contador."""
+    errores = errores_contador(contador)
+    for id_, count in seleccionar_top(zip(contador.ids.tolist(), contador.conteos.tolist()), n):
+        s.write(formatear_linea(id_, count, errores and errores[id_]))
+
+
+def escribir_rankings(contadores, n, prefijo):
+    """Escribe un fichero por ranking: <prefijo>_<ranking>.txt"""
+    rutas = []
+    for ranking, contador in contadores.items():
+        ruta = f"{prefijo}_{ranking}.txt"
+        with open(ruta, "w") as s:
+            if ranking == 'usuarios_mes':
+                errores = errores_contador(contador)
+                for mes, top in top_por_mes(contador, n).items():
+                    for clave, count in top:
+                        usuario = clave & ((1 << BITS_USUARIO) - 1)
+                        s.write(f"{mes} " + formatear_linea(usuario, count, errores and errores[clave]))
+            else:
+                escribir_top(s, contador, n)
+        rutas.append(ruta)
+    return rutas
+
+
 if __name__ == "__main__":
-    archivo = sys.argv[1]
-    n = int(sys.argv[2])
-    archivo_salida = sys.argv[3]
-    
-    dic_usuarios = {}
+    if "--ficheros" in sys.argv[1:]:
+        # Modo multi-ranking: varios ficheros, varios rankings, un fichero por ranking
+        parser = argparse.ArgumentParser(description="Top N de usuarios, localizaciones y usuarios por mes.",
+                                         epilog=NOTA_EMPATES)
+        parser.add_argument("--ficheros", nargs="+", required=True, help="Ficheros de check-ins o almacenes")
+        parser.add_argument("--n", type=int, required=True, help="Tamaño de cada ranking")
+        parser.add_argument("--rankings", nargs="+", choices=RANKINGS, default=list(RANKINGS))
+        parser.add_argument("--salida", required=True, help="Prefijo de los ficheros de salida")
+        parser.add_argument("--aproximado", action="store_true",
+                            help="Usar resúmenes SpaceSaving de memoria fija (heavy hitters)")
+        parser.add_argument("--capacidad", type=int, default=CAPACIDAD_APROXIMADA,
+                            help="Contadores por ranking en modo aproximado")
+        parser.add_argument("--sketches", default=None,
+                            help="Directorio donde guardar los resúmenes SpaceSaving (<ranking>.ss)")
+        args = parser.parse_args()
+
+        contadores = contar_ficheros(args.ficheros, args.rankings, args.capacidad if args.aproximado else None)
+        for ruta in escribir_rankings(contadores, args.n, args.salida):
+            print(f"Ranking guardado en {ruta}")
+        if args.aproximado and args.sketches:
+            os.makedirs(args.sketches, exist_ok=True)
+            for ranking, contador in contadores.items():
+                contador.guardar(os.path.join(args.sketches, f"{ranking}.ss"))
+        sys.exit(0)
+
+    # Uso: topn_selection_Claudia_Gonzalo.py <archivo> <n> <salida> [--incremental | --aproximado]
+    incremental = "--incremental" in sys.argv[1:]
+    aproximado = "--aproximado" in sys.argv[1:]
+    argumentos = [a for a in sys.argv[1:] if a not in ("--incremental", "--aproximado")]
+    if len(argumentos) != 3 or "-h" in argumentos or "--help" in argumentos:
+        print(USO, file=sys.stderr)
+        sys.exit(0 if "-h" in argumentos or "--help" in argumentos else 2)
+    archivo = argumentos[0]
+    n = int(argumentos[1])
+    archivo_salida = argumentos[2]
+    if ((incremental or aproximado) and os.path.isdir(archivo)) or (incremental and aproximado):
+        if incremental and aproximado:
+            print("Error: --incremental y --aproximado no se pueden combinar", file=sys.stderr)
+        else:
+            opcion = "--incremental" if incremental else "--aproximado"
+            print(f"Error: {opcion} no se admite con un almacén columnar", file=sys.stderr)
+        print(USO, file=sys.stderr)
+        sys.exit(2)
     
-    with open(archivo, "r") as e:
-        for l in e:
-            l = l.strip().split()
-            if l:
-                usuario = l[0]
-                if usuario in dic_usuarios:
-                    dic_usuarios[usuario] += 1
-                else:
-                    dic_usuarios[usuario] = 1  # CORRECCIÓN: Inicializar en 1, no en 0
+    contador = ContadorTopN()
     
-    # Ordenar usuarios por número de check-ins (descendente)
-    usuarios_ordenados = sorted(dic_usuarios.items(), key=lambda x: x[1], reverse=True)
+    if os.path.isdir(archivo):
+        contador.anadir(*contar_usuarios_almacen(archivo))
+    elif incremental:
+        contador.anadir(*contar_usuarios_incremental(archivo))
+    else:
+        capacidad = CAPACIDAD_APROXIMADA if aproximado else None
+        contador = contar_ficheros([archivo], ['usuarios'], capacidad)['usuarios']
     
+    # Seleccionar los n usuarios con más check-ins con un heap acotado (sin ordenar todos)
     with open(archivo_salida, "w") as s:
-        for i in range(min(n, len(usuarios_ordenados))):
-            usuario, count = usuarios_ordenados[i]
-            s.write(f"{usuario} {count}\n")
\ No newline at end of file
+        escribir_top(s, contador, n)